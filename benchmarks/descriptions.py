@@ -0,0 +1,79 @@
+"""Adventure Game 1: Benchmark of the memory saved by compressed descriptions against their access latency.
+
+The pack is loaded twice, keeping its texts in memory as is and compressed by World.compress_texts, and
+the memory each world holds once loaded is measured with tracemalloc. The latency of fetching every
+location description is then measured for each store, and for compressed descriptions both when every
+fetch decompresses and when the descriptions are already in the decompression cache.
+
+Run from the root of the repository with:
+
+    python -m benchmarks.descriptions [--data <data directory>] [--rounds <number of rounds>]
+"""
+from __future__ import annotations
+import gc
+import time
+import tracemalloc
+from argparse import ArgumentParser
+
+from src.descriptions import DescriptionStore
+from src.game_data import World
+from src.packs import DEFAULT_DATA_DIRECTORY, load_directory
+
+
+def loaded_size(directory: str, compress: bool) -> tuple[World, int]:
+    """Return the world of the pack in directory, along with the number of bytes it holds once loaded.
+    """
+    # The pack is loaded once beforehand, so that the modules imported while loading it are not counted.
+    load_directory(directory)
+    gc.collect()
+    tracemalloc.start()
+    world = load_directory(directory).world
+    if compress:
+        world.compress_texts()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return world, size
+
+
+def fetch_latency(store: DescriptionStore, keys: list[int], rounds: int) -> float:
+    """Return the average number of seconds store takes to fetch a description, over rounds fetches of keys.
+    """
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for key in keys:
+            store.fetch(key)
+    return (time.perf_counter() - start) / (rounds * len(keys))
+
+
+def description_keys(world: World) -> list[int]:
+    """Return the keys of the long descriptions of every location of world.
+    """
+    return [location.descriptor.long_key for location in world.locations.values()]
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description="Measure the memory saved by compressed descriptions and their latency.")
+    parser.add_argument('--data', default=DEFAULT_DATA_DIRECTORY, help="the data directory to benchmark")
+    parser.add_argument('--rounds', type=int, default=200, help="the number of times every description is fetched")
+    arguments = parser.parse_args()
+
+    plain_world, plain_size = loaded_size(arguments.data, compress=False)
+    compressed_world, compressed_size = loaded_size(arguments.data, compress=True)
+    store = compressed_world.descriptions
+    keys = description_keys(compressed_world)
+
+    print(f"in memory        {plain_size / 1024:10.1f} KiB")
+    print(f"compressed       {compressed_size / 1024:10.1f} KiB   "
+          f"({(plain_size - compressed_size) / 1024:.1f} KiB saved, dictionary {len(store.dictionary)} bytes)")
+
+    plain_latency = fetch_latency(plain_world.descriptions, description_keys(plain_world), arguments.rounds)
+    store.cache.capacity = 0
+    store.cache.clear()
+    cold_latency = fetch_latency(store, keys, arguments.rounds)
+    store.cache.capacity = len(keys)
+    warm_latency = fetch_latency(store, keys, arguments.rounds)
+
+    print(f"fetch in memory  {plain_latency * 1e6:10.3f} us")
+    print(f"fetch cold       {cold_latency * 1e6:10.3f} us   (decompressing every fetch)")
+    print(f"fetch cached     {warm_latency * 1e6:10.3f} us   (every description in the cache)")
@@ -0,0 +1,191 @@
+"""Adventure Game 1: Load generator measuring the latency of turns under many concurrent sessions.
+
+A pack is loaded once, and the given number of sessions play it concurrently in a SessionManager, driven by
+a pool of threads. Every turn plays one command through the same dispatch as the main loop of the game,
+including the execution of actions and the background actions run on arrival, so a turn measures what a
+player waits for, including waiting for the other sessions sharing the world. Sessions whose game is over
+start a new game.
+
+Commands are either read from a script, one per line, which every session plays from the start and loops
+over, or drawn at random from the commands the pack understands: moving in any direction, the built-in
+verbs, grabbing and dropping any item, and the name of any action. Prompts of actions are answered by the
+next command of the session. Game output is discarded. Every session plays on a Console of its own (see
+src.actions.context), so the threads never share the standard streams.
+
+The report gives the throughput of turns, the 50th, 95th and 99th percentiles of turn latency, and the
+memory held by each session kept in memory, counting the objects it owns but not the world it shares.
+
+Run from the root of the repository with:
+
+    python -m benchmarks.load [--data <pack>] [--sessions <number>] [--turns <turns per session>]
+        [--threads <number>] [--script <commands file>] [--max-sessions <number kept in memory>]
+"""
+from __future__ import annotations
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from argparse import ArgumentParser
+from typing import Iterator, Optional, TextIO
+
+from src.actions.context import Console
+from src.direction import Direction
+from src.game_data import Item, Location
+from src.packs import DEFAULT_DATA_DIRECTORY, Pack, load_pack
+from src.sessions import Session, SessionManager
+
+BUILT_IN_COMMANDS = ['look', 'inventory', 'score', 'steps', 'inspect', 'menu']
+
+
+def session_console(commands: Iterator[str], output: TextIO) -> Console:
+    """Return the console of a session answering the prompts of actions with its next command, and printing the
+    game to output.
+    """
+    return Console(output=output, reader=lambda _question: next(commands))
+
+
+def scripted_commands(script: list[str]) -> Iterator[str]:
+    """Return the commands of script, looping over them forever.
+    """
+    while True:
+        yield from script
+
+
+def random_commands(pack: Pack, seed: int) -> Iterator[str]:
+    """Return commands drawn forever from the commands pack understands, half of them moves.
+    """
+    generator = random.Random(seed)
+    moves = [f'go {direction}' for direction in Direction]
+    others = BUILT_IN_COMMANDS + [
+        action.name.lower() for location in pack.world.locations.values() for action in location.actions
+    ]
+    for location in pack.world.locations.values():
+        for item in location.items:
+            others += [f'grab {item.key}', f'drop {item.key}']
+    while True:
+        yield generator.choice(moves if generator.random() < 0.5 else others)
+
+
+def session_size(session: Session) -> int:
+    """Return the number of bytes of the objects owned by session, leaving out the locations, items and
+    directions it shares with the world.
+    """
+    seen = set()
+    pending = [session]
+    size = 0
+    while len(pending) != 0:
+        value = pending.pop()
+        if id(value) in seen or isinstance(value, (Location, Item, Direction, str, bool, type(None))):
+            continue
+        seen.add(id(value))
+        size += sys.getsizeof(value)
+        if isinstance(value, dict):
+            pending.extend(value.keys())
+            pending.extend(value.values())
+        elif isinstance(value, (list, tuple, set, frozenset)):
+            pending.extend(value)
+        else:
+            pending.extend(getattr(value, slot) for cls in type(value).__mro__
+                           for slot in getattr(cls, '__slots__', ()) if hasattr(value, slot))
+    return size
+
+
+def drive(
+        manager: SessionManager,
+        session_ids: list[int],
+        commands: dict[int, Iterator[str]],
+        consoles: dict[int, Console],
+        turns: int,
+        latencies: list[float]
+) -> None:
+    """Play turns commands in each of the given sessions, one session after the other, recording the
+    latency of every turn in latencies.
+    """
+    recorded = []
+    for _ in range(turns):
+        for session_id in session_ids:
+            command = next(commands[session_id]).strip().lower()
+            start = time.perf_counter()
+            manager.command(session_id, command, consoles[session_id])
+            recorded.append(time.perf_counter() - start)
+            if manager.finished(session_id):
+                manager.end(session_id)
+                manager.create(session_id, consoles[session_id])
+    latencies.extend(recorded)
+
+
+def run(
+        pack: Pack,
+        sessions: int,
+        turns: int,
+        threads: int,
+        script: Optional[list[str]],
+        max_sessions: int,
+        seed: int
+) -> None:
+    """Play turns commands in each of sessions sessions of pack with the given number of threads, and print
+    the report.
+    """
+    latencies = []
+    with tempfile.TemporaryDirectory() as directory, open(os.devnull, 'w') as null:
+        manager = SessionManager(pack, directory, max_sessions)
+        commands = {
+            session_id: scripted_commands(script) if script is not None else random_commands(pack, seed + session_id)
+            for session_id in range(sessions)
+        }
+        consoles = {session_id: session_console(commands[session_id], null) for session_id in range(sessions)}
+        for session_id in range(sessions):
+            manager.create(session_id, consoles[session_id])
+
+        workers = [
+            threading.Thread(target=drive, args=(manager, list(range(i, sessions, threads)), commands, consoles, turns,
+                                                 latencies))
+            for i in range(threads)
+        ]
+        start = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - start
+
+        sizes = [session_size(session) for session in manager.resident_sessions()]
+        hit_rate, rehydration = manager.hit_rate(), manager.mean_rehydration_latency()
+
+    percentiles = statistics.quantiles(latencies, n=100)
+    print(f"{sessions} sessions, {threads} threads, {len(latencies)} turns in {elapsed:.2f} s")
+    print(f"throughput      {len(latencies) / elapsed:10.1f} turns/s")
+    print(f"latency p50     {percentiles[49] * 1e6:10.1f} us")
+    print(f"latency p95     {percentiles[94] * 1e6:10.1f} us")
+    print(f"latency p99     {percentiles[98] * 1e6:10.1f} us")
+    print(f"session memory  {statistics.mean(sizes) / 1024:10.2f} KiB   (mean of {len(sizes)} sessions in memory)")
+    print(f"session hits    {hit_rate * 100:10.1f} %    (rehydration {rehydration * 1e6:.1f} us on average)")
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description="Measure the latency of turns under many concurrent sessions.")
+    parser.add_argument('--data', default=DEFAULT_DATA_DIRECTORY, help="the pack to play")
+    parser.add_argument('--sessions', type=int, default=100, help="the number of concurrent sessions")
+    parser.add_argument('--turns', type=int, default=100, help="the number of commands played by each session")
+    parser.add_argument('--threads', type=int, default=8, help="the number of threads driving the sessions")
+    parser.add_argument('--script', help="a file of commands played by every session, instead of random commands")
+    parser.add_argument('--max-sessions', type=int, help="the number of sessions kept in memory (default: all)")
+    parser.add_argument('--seed', type=int, default=0, help="the seed of the random commands")
+    arguments = parser.parse_args()
+
+    script_commands = None
+    if arguments.script is not None:
+        with open(arguments.script, 'r') as script_file:
+            script_commands = [line.strip() for line in script_file if line.strip() != '']
+    run(
+        load_pack(arguments.data),
+        arguments.sessions,
+        arguments.turns,
+        min(arguments.threads, arguments.sessions),
+        script_commands,
+        arguments.max_sessions if arguments.max_sessions is not None else arguments.sessions,
+        arguments.seed
+    )
@@ -0,0 +1,165 @@
+"""Adventure Game 1: Report of the memory a loaded pack holds, split by component.
+
+The pack is loaded through prepare_world while tracemalloc traces allocations, which gives the total memory
+the loaded world retains. That total is then split by walking the object graph of the world, attributing
+every object to the first component that reaches it, in this order: the map grid, the items, the description
+store, the locations, the actions of the locations, the background actions and the triggered actions. Objects
+shared by the whole interpreter, such as small integers, directions and classes, are not counted, and whatever
+tracemalloc counted but no component reached, such as the variable table, is reported as other. The pack is
+loaded once before it is traced, so that the modules it imports are not counted.
+
+Locations are measured without their actions, items and descriptions, which are counted in their own
+components, and actions are measured with their instruction lists. The heaviest locations and actions are
+listed as well. Regional worlds only count the locations of the tiles loaded around the start, and the cells
+of their map, kept in those tiles, are counted as other.
+
+The report is JSON with sorted keys, so that reports of different releases of a pack can be diffed. Run from the
+root of the repository with:
+
+    python -m benchmarks.memory [--data <pack>] [--top <number>] [--output <report file>]
+"""
+from __future__ import annotations
+import gc
+import json
+import sys
+import tracemalloc
+from argparse import ArgumentParser
+from enum import Enum
+from types import FunctionType, ModuleType
+from typing import Any, Optional
+
+from src.actions.action import Action
+from src.adventure import pack_name, prepare_world
+from src.descriptions import DescriptionStore
+from src.game_data import Item, Location, World
+from src.packs import DEFAULT_DATA_DIRECTORY
+from src.regions import RegionalWorld
+
+DEFAULT_TOP = 10
+
+# Objects of these types are never counted, since they are shared by the whole interpreter.
+_SHARED_TYPES = (type, ModuleType, FunctionType, Enum, bool, type(None))
+
+# Objects of these types are only counted by the component they belong to, never when reached from another.
+_COMPONENT_TYPES = (World, Location, Action, Item, DescriptionStore)
+
+
+def graph_size(root: Any, seen: set[int]) -> int:
+    """Return the number of bytes of root and of the objects it reaches that are not in seen, adding them to
+    seen. The objects of other components reached from root are not counted.
+    """
+    size = 0
+    pending = [root]
+    while len(pending) != 0:
+        value = pending.pop()
+        if id(value) in seen or isinstance(value, _SHARED_TYPES) or _is_small_int(value) or \
+                (value is not root and isinstance(value, _COMPONENT_TYPES)):
+            continue
+        seen.add(id(value))
+        size += sys.getsizeof(value)
+        if isinstance(value, dict):
+            pending.extend(value.keys())
+            pending.extend(value.values())
+        elif isinstance(value, (list, tuple, set, frozenset)):
+            pending.extend(value)
+        else:
+            if hasattr(value, '__dict__'):
+                pending.append(vars(value))
+            pending.extend(getattr(value, slot) for cls in type(value).__mro__
+                           for slot in getattr(cls, '__slots__', ()) if hasattr(value, slot))
+    return size
+
+
+def _is_small_int(value: Any) -> bool:
+    """Return whether value is an integer cached by the interpreter.
+    """
+    return type(value) is int and -5 <= value <= 256
+
+
+def retained_size(source: str) -> tuple[World, int]:
+    """Return the world of the pack at source, loaded through prepare_world, along with the number of bytes it
+    retains once loaded.
+    """
+    # The pack is loaded once beforehand, so that the modules imported while loading it are not counted.
+    prepare_world(source)
+    gc.collect()
+    tracemalloc.start()
+    world, _, _ = prepare_world(source)
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return world, size
+
+
+def report(source: str, top: int) -> dict[str, Any]:
+    """Return the memory report of the pack at source, listing the top heaviest locations and actions.
+    """
+    world, total = retained_size(source)
+    seen = {id(world)}
+    locations = sorted(world.locations.values(), key=lambda location: location.descriptor.location_id)
+    items = {id(item): item for location in locations for item in location.items}
+    for action in world.all_actions():
+        for instruction in action.instructions:
+            if isinstance(instruction.link, Item):
+                items[id(instruction.link)] = instruction.link
+
+    components = {
+        'map': 0 if isinstance(world, RegionalWorld) else graph_size(world.map, seen),
+        'items': sum(graph_size(item, seen) for item in items.values()),
+        'descriptions': graph_size(world.descriptions, seen)
+    }
+    location_sizes = [(location, graph_size(location, seen)) for location in locations]
+    action_sizes = [(action, graph_size(action, seen)) for location in locations for action in location.actions]
+    components['locations'] = sum(size for _, size in location_sizes)
+    components['actions'] = sum(size for _, size in action_sizes)
+    components['background_actions'] = sum(graph_size(action, seen) for action in world.background_actions)
+    components['triggered_actions'] = graph_size(world.triggers, seen) + \
+        sum(graph_size(action, seen) for action in world.triggers.actions())
+    components['other'] = max(total - sum(components.values()), 0)
+
+    location_sizes.sort(key=lambda pair: (-pair[1], pair[0].descriptor.location_id))
+    action_sizes.sort(key=lambda pair: (-pair[1], pair[0].action_location_id, pair[0].name))
+    return {
+        'pack': pack_name(source),
+        'python': '.'.join(str(part) for part in sys.version_info[:3]),
+        'total_bytes': total,
+        'components': components,
+        'counts': {
+            'locations': len(locations),
+            'items': len(items),
+            'actions': len(action_sizes),
+            'instructions': sum(len(action.instructions) for action in world.all_actions()),
+            'background_actions': len(world.background_actions),
+            'triggered_actions': len(world.triggers.actions())
+        },
+        'heaviest_locations': [
+            {'location_id': location.descriptor.location_id, 'bytes': size, 'actions': len(location.actions)}
+            for location, size in location_sizes[:top]
+        ],
+        'heaviest_actions': [
+            {'name': action.name, 'location_id': action.action_location_id, 'bytes': size,
+             'instructions': len(action.instructions)}
+            for action, size in action_sizes[:top]
+        ]
+    }
+
+
+def write_report(data: dict[str, Any], output: Optional[str]) -> None:
+    """Write data as JSON to the file at output, or to the standard output if it is None.
+    """
+    text = json.dumps(data, indent=2, sort_keys=True) + '\n'
+    if output is None:
+        sys.stdout.write(text)
+    else:
+        with open(output, 'w') as report_file:
+            report_file.write(text)
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description="Report the memory a loaded pack holds, split by component, as JSON.")
+    parser.add_argument('--data', default=DEFAULT_DATA_DIRECTORY, help="the pack to measure")
+    parser.add_argument('--top', type=int, default=DEFAULT_TOP, help="the number of heaviest locations and actions")
+    parser.add_argument('--output', help="the file the report is written to (default: the standard output)")
+    arguments = parser.parse_args()
+
+    write_report(report(arguments.data, arguments.top), arguments.output)
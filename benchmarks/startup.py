@@ -0,0 +1,63 @@
+"""Adventure Game 1: Benchmark of the time a new game process takes to show its first prompt.
+
+Each run spawns a fresh interpreter playing the given pack, and measures the time until the
+"Enter action:" prompt is written, which covers interpreter start, imports and loading the pack.
+The pack is measured both as a data directory and as a compiled bundle.
+
+Run from the root of the repository with:
+
+    python -m benchmarks.startup [--data <data directory>] [--runs <number of runs>]
+"""
+from __future__ import annotations
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from argparse import ArgumentParser
+
+from src.packs import DEFAULT_DATA_DIRECTORY, compile_bundle
+
+PROMPT = b"Enter action:"
+
+
+def time_to_first_prompt(source: str) -> float:
+    """Return the number of seconds a new game process playing source takes to show its first prompt.
+    """
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'src.adventure', '--data', source],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+    )
+    output = b''
+    while PROMPT not in output:
+        chunk = process.stdout.read1(4096)
+        if chunk == b'':
+            raise RuntimeError(f"The game exited before its first prompt: {output.decode(errors='replace')}")
+        output += chunk
+    elapsed = time.perf_counter() - start
+    process.kill()
+    process.wait()
+    return elapsed
+
+
+def report(label: str, source: str, runs: int) -> None:
+    """Print the median and best time to first prompt of source over the given number of runs.
+    """
+    timings = [time_to_first_prompt(source) for _ in range(runs)]
+    print(f"{label:<16} median {statistics.median(timings) * 1000:8.2f} ms   "
+          f"best {min(timings) * 1000:8.2f} ms   ({runs} runs)")
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description="Measure the time to first prompt of the game.")
+    parser.add_argument('--data', default=DEFAULT_DATA_DIRECTORY, help="the data directory to benchmark")
+    parser.add_argument('--runs', type=int, default=20, help="the number of processes spawned per measurement")
+    arguments = parser.parse_args()
+
+    report("data directory", arguments.data, arguments.runs)
+    with tempfile.TemporaryDirectory() as directory:
+        bundle_path = os.path.join(directory, 'pack.bundle')
+        compile_bundle(arguments.data, bundle_path)
+        report("compiled bundle", bundle_path, arguments.runs)
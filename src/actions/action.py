@@ -1,10 +1,18 @@
 """Adventure Game 1: The file exporting Action, which manages puzzles and custom instructions.
 
-Note that due to cyclic imports, we had to import the entire model for type hints.
+Note that due to cyclic imports, the modules only needed for type hints are imported when type checking.
 """
 from __future__ import annotations
+import sys
+from typing import TYPE_CHECKING
 
-import src.actions
+from src import events, metrics
+from src.actions.excondition import ExecutionCondition
+from src.actions.instruction import Instruction, JUMP, RETURN
+
+if TYPE_CHECKING:
+    from src.actions.context import Context
+    from src.actions.triggers import EventKey
 
 
 class Action:
@@ -16,16 +24,17 @@ class Action:
     - name: The name of the action, which is what the player will type into the console.
     - instructions: The list of instructions the action is composed of.
     """
+    __slots__ = ('name', 'instructions')
     name: str
-    instructions: list[src.actions.instruction.Instruction]
+    instructions: list[Instruction]
 
-    def __init__(self, name: str, instructions: list[src.actions.instruction.Instruction]) -> None:
-        """Create an Action.
+    def __init__(self, name: str, instructions: list[Instruction]) -> None:
+        """Create an Action. The name is interned, since it is compared against every player command.
         """
-        self.name = name
+        self.name = sys.intern(name)
         self.instructions = instructions
 
-    def execute(self, context: src.actions.context.Context, shallow: bool) -> bool:
+    def execute(self, context: Context, shallow: bool) -> bool:
         """Execute the action with the given arguments, returning whether the execution succeeded.
         Shallow executions are run every time an action is available to the user. They help alert the
         user with their options, such as the description of the action.
@@ -34,19 +43,33 @@ class Action:
 
     def _execute_given(
             self,
-            execution_condition: src.actions.excondition.ExecutionCondition,
-            context: src.actions.context.Context
+            execution_condition: ExecutionCondition,
+            context: Context
     ) -> bool:
         """Executes instructions given the execution condition, returning whether they succeeded.
+
+        The conditions of if blocks never fail: when they do not hold, execution jumps to their target,
+        which the parser has already computed. See ActionScriptParser.
         """
+        instructions = self.instructions
         i = 0
-        while i < len(self.instructions):
-            instruction = self.instructions[i]
+        while i < len(instructions):
+            instruction = instructions[i]
             if instruction.execution_condition == execution_condition:
+                if instruction.operation == JUMP:
+                    i = instruction.target
+                    continue
+                if instruction.operation == RETURN:
+                    return True
+
                 success = instruction.unchecked_execute(context)
-                if not success:
+                if instruction.target >= 0:
+                    if success == instruction.negate:
+                        i = instruction.target
+                        continue
+                elif not success:
                     SingleAction._execute_while_fail(
-                        self.instructions[i + 1:], context
+                        instructions[i + 1:], context
                     )
                     return False
             i += 1
@@ -54,8 +77,8 @@ class Action:
 
     @staticmethod
     def _execute_while_fail(
-            instructions: list[src.actions.instruction.Instruction],
-            context: src.actions.context.Context
+            instructions: list[Instruction],
+            context: Context
     ) -> None:
         """Execute all instructions with # execution type sequentially, until all # instructions are done.
         """
@@ -65,7 +88,7 @@ class Action:
         i = 0
         # while <there are instructions> and <instruction is fail>
         while i < len(instructions) \
-                and instructions[i].execution_condition == src.actions.excondition.ExecutionCondition.FAIL:
+                and instructions[i].execution_condition == ExecutionCondition.FAIL:
             instructions[i].unchecked_execute(context)
             i += 1
 
@@ -79,20 +102,53 @@ class Action:
 class BackgroundAction(Action):
     """This class inherits Action, allowing the action to run in the background. These types of
     actions execute whenever user changes a location, and they execute each single time."""
+    __slots__ = ()
 
-    def __init__(self, name: str, instructions: list[src.actions.instruction.Instruction]) -> None:
+    def __init__(self, name: str, instructions: list[Instruction]) -> None:
         """Initialize a BackgroundAction
         """
         super().__init__(name, instructions)
 
-    def execute(self, context: src.actions.context.Context, _shallow: bool) -> bool:
+    def execute(self, context: Context, _shallow: bool) -> bool:
         # In this context, whether it is shallow or not does not matter, since
         # this is a background action. The player does not have to be alerted
         # of this.
-        return self._execute_given(
-            execution_condition=src.actions.excondition.ExecutionCondition.ONCE,
+        success = self._execute_given(
+            execution_condition=ExecutionCondition.ONCE,
             context=context
         )
+        events.emit('action', action=self.name, background=True, success=success)
+        if metrics.engine is not None:
+            metrics.engine.action_executed('background', success)
+        return success
+
+
+class TriggeredAction(Action):
+    """This class inherits Action, allowing the action to run in the background whenever one of the
+    events it subscribes to happens, rather than whenever the user changes a location. They are
+    executed by the TriggerIndex of the world. See src.actions.triggers.
+
+    Instance Attributes:
+        - triggers: The keys of the events the action subscribes to.
+    """
+    __slots__ = ('triggers',)
+    triggers: list[EventKey]
+
+    def __init__(self, name: str, instructions: list[Instruction], triggers: list[EventKey]) -> None:
+        """Initialize a TriggeredAction
+        """
+        super().__init__(name, instructions)
+        self.triggers = triggers
+
+    def execute(self, context: Context, _shallow: bool) -> bool:
+        success = self._execute_given(
+            execution_condition=ExecutionCondition.ONCE,
+            context=context
+        )
+        events.emit('action', action=self.name, triggered=True, success=success)
+        if metrics.engine is not None:
+            metrics.engine.action_executed('triggered', success)
+        return success
 
 
 class SingleAction(Action):
@@ -103,6 +159,7 @@ class SingleAction(Action):
         - action_location_id: The location (ID) of the action.
         - completed: Whether the action has successfully run before.
     """
+    __slots__ = ('action_location_id', 'completed')
     action_location_id: int
     completed: bool
 
@@ -110,7 +167,7 @@ class SingleAction(Action):
             self,
             name: str,
             action_location_id: int,
-            instructions: list[src.actions.instruction.Instruction]
+            instructions: list[Instruction]
     ) -> None:
         """Initialize an Action.
         """
@@ -118,7 +175,7 @@ class SingleAction(Action):
         self.action_location_id = action_location_id
         self.completed = False
 
-    def execute(self, context: src.actions.context.Context, shallow: bool) -> bool:
+    def execute(self, context: Context, shallow: bool) -> bool:
         """Execute the action with the given arguments, returning whether the execution succeeded.
         Shallow executions are run every time an action is available to the user. They help alert the
         user with their options, such as the description of the action.
@@ -127,25 +184,36 @@ class SingleAction(Action):
         # If it's a shallow execute but the action is not completed, execute the `-` calls.
         if shallow and not self.completed:
             return self._execute_given(
-                execution_condition=src.actions.excondition.ExecutionCondition.ACTION_NOT_COMPLETED,
+                execution_condition=ExecutionCondition.ACTION_NOT_COMPLETED,
                 context=context
             )
         elif not shallow and self.completed:
-            return self._execute_given(
-                execution_condition=src.actions.excondition.ExecutionCondition.ACTION_COMPLETED,
+            success = self._execute_given(
+                execution_condition=ExecutionCondition.ACTION_COMPLETED,
                 context=context
             )
+            events.emit('action', action=self.name, location=self.action_location_id,
+                        repeated=True, success=success)
+            if metrics.engine is not None:
+                metrics.engine.action_executed('single', success)
+            return success
         # We cannot refactor to else statement, since we would have to create another
         # case where `if shallow_execute and self.completed`, but we want to ignore that
         # case.
         elif not shallow and not self.completed:  # ONCE
             success = self._execute_given(
-                execution_condition=src.actions.excondition.ExecutionCondition.ONCE,
+                execution_condition=ExecutionCondition.ONCE,
                 context=context
             )
 
             if success:
                 self.completed = True
+                context.world.state_hash.add('completed', self.action_location_id, self.name.lower())
+                context.world.changed.add(self.action_location_id)
+            events.emit('action', action=self.name, location=self.action_location_id,
+                        repeated=False, success=success)
+            if metrics.engine is not None:
+                metrics.engine.action_executed('single', success)
             return success
         else:
             return True
@@ -163,5 +231,6 @@ if __name__ == '__main__':
 
     python_ta.check_all(config={
         'max-line-length': 120,
-        'extra-imports': ["src.actions"]
+        'extra-imports': ["src.events", "src.metrics", "src.actions.excondition", "src.actions.context",
+                          "src.actions.instruction", "src.actions.triggers"]
     })
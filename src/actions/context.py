@@ -1,12 +1,46 @@
 """Adventure Game 1: The Context common export, used to pass data between the game and the instructions.
-Due to cyclic imports, we must import src.game_data directly.
+Due to cyclic imports, src.game_data is only imported when type checking.
+
+The game is shown, and questions are asked, through the Console of the context rather than through the
+standard streams, so that players sharing a process, such as the sessions of a SessionManager played from
+several threads, each see their own game.
 """
 from __future__ import annotations
-from dataclasses import dataclass
-import src.game_data
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Callable, Optional, TextIO
+
+if TYPE_CHECKING:
+    from src.actions.action import TriggeredAction
+    from src.game_data import World, Player, Location
+
+
+@dataclass(slots=True, frozen=True)
+class Console:
+    """Where the game is shown to a player, and where the player answers the questions of actions.
+
+    Instance Attributes:
+        - output: The stream the game is printed to, or None for the standard output.
+        - reader: The function asking the player a question and returning the answer, or None for input.
+    """
+    output: Optional[TextIO] = None
+    reader: Optional[Callable[[str], str]] = None
+
+    def show(self, *values: object) -> None:
+        """Print values to the player, as print does.
+        """
+        print(*values, file=self.output)
+
+    def ask(self, question: str) -> str:
+        """Ask the player question, as input does, and return the answer.
+        """
+        return input(question) if self.reader is None else self.reader(question)
 
 
-@dataclass
+# The console of the player of the terminal.
+STANDARD_CONSOLE = Console()
+
+
+@dataclass(slots=True)
 class Context:
     """Context dataclass is used to minimize the number of function arguments while passing data
     between the game state and the instructions.
@@ -15,11 +49,23 @@ class Context:
         - world: The game's world state.
         - player: The player of the game.
         - location: The player's current location.
-        - global_store: An arbitrary mapping which can be used to pass data between actions.
+        - console: Where the game is shown to the player.
+        - running: The triggered actions being executed for the player, which the events they cause do not
+          execute again. See src.actions.triggers.
+        - global_store: The values of the world variables, which can be used to pass data between actions
+          and players. See src.actions.variables.
     """
-    world: src.game_data.World
-    player: src.game_data.Player
-    location: src.game_data.Location
+    world: World
+    player: Player
+    location: Location
+    console: Console = STANDARD_CONSOLE
+    running: set[TriggeredAction] = field(default_factory=set)
+
+    @property
+    def global_store(self) -> list[int]:
+        """The values of the world variables, indexed by slot.
+        """
+        return self.world.global_store
 
 
 if __name__ == '__main__':
@@ -27,5 +73,6 @@ if __name__ == '__main__':
 
     python_ta.check_all(config={
         'max-line-length': 120,
-        'extra-imports': ["src.game_data"]
+        'extra-imports': ["src.actions.action", "src.game_data"],
+        'allowed-io': ['Console.show', 'Console.ask']
     })
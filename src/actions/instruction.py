@@ -2,13 +2,31 @@
 """
 from __future__ import annotations
 from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Optional
 
-from src.direction import Direction
+from src import events
 from src.actions.excondition import ExecutionCondition
-import src.actions
+from src.actions.variables import VariableSlot
+from src.actions.triggers import ITEM_ACQUIRED, ITEM_DROPPED
 
+if TYPE_CHECKING:
+    from src.actions.context import Context
 
-@dataclass
+
+# The operations whose first argument is the name of a variable.
+VARIABLE_OPERATIONS = frozenset({'set_var', 'add_var', 'var_equals', 'var_at_least', 'var_less_than'})
+
+# The control flow operations, which are executed by Action rather than by the instruction itself.
+# JUMP continues execution at the target instruction, and RETURN ends the execution successfully.
+JUMP = 'jump'
+RETURN = 'return'
+
+# Prints the text stored in the description store of the world under the key given as its only argument.
+# The texts of print instructions are moved there by World.compress_texts.
+PRINT_TEXT = 'print_text'
+
+
+@dataclass(slots=True)
 class Instruction:
     """The smallest unit of execution in ActionScript actions.
 
@@ -16,12 +34,26 @@ class Instruction:
         - operation: A valid operation string caught by any branch in the `unchecked_execute` method.
         - execution_condition: A valid execution condition.
         - arguments: The list of arguments passed to the operation.
+        - slot: The slot of the variable named by the first argument of variable operations, and None otherwise.
+        - target: For jumps, the index of the instruction executed next. For the conditions of if blocks, the
+          index of the instruction executed next when the condition does not hold. Otherwise, -1.
+        - negate: Whether the condition of an if block is negated, as in "if not".
+        - link: What the arguments of the instruction refer to, resolved once the world is loaded, or None if
+          they refer to nothing. See src.actions.linker.
+
+    Representation Invariants:
+        - (self.operation in VARIABLE_OPERATIONS) == (self.slot is not None)
+        - self.operation != JUMP or self.target >= 0
     """
     operation: str
     execution_condition: ExecutionCondition
     arguments: list[str | int]
+    slot: Optional[VariableSlot] = None
+    target: int = -1
+    negate: bool = False
+    link: Any = None
 
-    def unchecked_execute(self, context: src.actions.context.Context) -> bool:
+    def unchecked_execute(self, context: Context) -> bool:
         """Execute the instruction without checking the execution condition, returning whether it has succeeded.
 
         Any instruction cannot be executed with respects to its execution condition, given that each instruction would
@@ -32,70 +64,125 @@ class Instruction:
         match self.operation:
             # print("...")
             case 'print':
-                print(*self.arguments)
+                context.console.show(*self.arguments)
+                return True
+
+            case 'print_text':
+                context.console.show(context.world.descriptions.fetch(self.arguments[0]))
                 return True
 
             # add_points(10)
             case 'add_points':
+                points = context.player.points
                 context.player.points += self.arguments[0]
+                events.emit('points', change=self.arguments[0], points=context.player.points)
+                context.world.triggers.points_changed(context, points)
                 return True
 
             # take_points(10)
             case 'take_points':
-                context.player.points = max(0, context.player.points - self.arguments[0])
+                points = context.player.points
+                context.player.points = max(0, points - self.arguments[0])
+                events.emit('points', change=context.player.points - points, points=context.player.points)
                 return True
 
             # has_item("T-Card")
+            # The link is the key of the item.
             case 'has_item':
-                return any(self.arguments[0].lower() == repr(inv_item) for inv_item in context.player.inventory)
+                return any(inv_item.key == self.link for inv_item in context.player.inventory)
 
             # add_item("T-Card")
+            # The link is the item added, optionally located by a second argument.
             case 'add_item':
-                if len(self.arguments) == 2:
-                    lid = self.arguments[1]
-                    location_id = None if lid < 0 else lid
-                    context.player.create_add_item(
-                        name=self.arguments[0],
-                        location_id=location_id
-                    )
-                else:
-                    context.player.create_add_item(
-                        name=self.arguments[0],
-                        location_id=None
-                    )
-
+                item = self.link
+                context.player.add_item(item)
+                events.emit('item', item=item.name, added=True)
+                context.world.triggers.fire(context, ITEM_ACQUIRED, item.key)
                 return True
 
             # take_item("T-Card")
+            # The link is the key of the item.
             case 'take_item':
                 for item in context.player.inventory:
-                    if repr(item) == self.arguments[0].lower():
-                        context.player.inventory.remove(item)
+                    if item.key == self.link:
+                        context.player.remove_item(item)
+                        events.emit('item', item=item.name, added=False)
+                        context.world.triggers.fire(context, ITEM_DROPPED, item.key)
                         return True
                 return False
 
             # prompt("Bumbly")
+            # The link is the set of the accepted answers, in lowercase.
             case 'prompt':
-                result = input("> ")
-                return any(result.lower() == arg.lower() for arg in self.arguments)
+                return context.console.ask("> ").lower() in self.link
 
             # unlock_direction_at_point(14, "WEST")
+            # The link is the location id and the direction.
             case 'unlock_direction_at_point':
-                loc = context.world.locations[self.arguments[0]]
-                loc.allowed_movements.add(
-                    Direction.from_str(self.arguments[1])
-                )
+                location_id, direction = self.link
+                context.world.unlock(context.world.location_by_id(location_id), direction)
+                events.emit('unlock', location=location_id, direction=str(direction))
                 return True
 
             # win()
             case 'win':
                 context.player.victory = True
+                events.emit('victory', steps=context.player.steps, points=context.player.points)
                 return True
 
             # steps_less_than(20)
             case 'steps_less_than':
                 return context.player.steps < self.arguments[0]
 
+            # set_var("coins", 3)
+            case 'set_var':
+                self._assign(context, self.arguments[1])
+                return True
+
+            # add_var("global.bell_rings", 1)
+            case 'add_var':
+                self._assign(context, self._variables(context)[self.slot.index] + self.arguments[1])
+                return True
+
+            # var_equals("coins", 3)
+            case 'var_equals':
+                return self._variables(context)[self.slot.index] == self.arguments[1]
+
+            # var_at_least("coins", 3)
+            case 'var_at_least':
+                return self._variables(context)[self.slot.index] >= self.arguments[1]
+
+            # var_less_than("coins", 3)
+            case 'var_less_than':
+                return self._variables(context)[self.slot.index] < self.arguments[1]
+
+    def _variables(self, context: Context) -> list[int]:
+        """Return the store holding the variable of this instruction, making sure it has room for its slot.
+        Stores grow lazily, since variables may be added after players were created, by reloading the world.
+        """
+        store = context.global_store if self.slot.is_global else context.player.variables
+        if len(store) <= self.slot.index:
+            store.extend([0] * (self.slot.index + 1 - len(store)))
+        return store
+
+    def _assign(self, context: Context, value: int) -> None:
+        """Set the variable of this instruction to value, updating the fingerprint of its store: the world for
+        world variables, and the player otherwise. Variables equal to 0, their initial value, are not facts of
+        the fingerprint, so that variables never set and variables set back to 0 are fingerprinted alike.
+        """
+        store = self._variables(context)
+        old = store[self.slot.index]
+        if old != value:
+            if self.slot.is_global:
+                state_hash, fact = context.world.state_hash, 'global'
+            else:
+                state_hash, fact = context.player.state_hash, 'variable'
+            if old != 0:
+                state_hash.remove(fact, self.slot.index, old)
+            if value != 0:
+                state_hash.add(fact, self.slot.index, value)
+            store[self.slot.index] = value
+
     def __str__(self) -> str:
         return self.__repr__()
 
@@ -106,9 +193,13 @@ class Instruction:
         >>> str(inst)
         '+print("2^2", "=", 4)'
         """
-        return f"{self.execution_condition}{self.operation}({', '.join(
-            f'"{arg}"' if isinstance(arg, str) else str(arg) for arg in self.arguments
-        )})"
+        if self.operation == JUMP:
+            return f"{self.execution_condition}jump({self.target})"
+        arguments = ', '.join(f'"{arg}"' if isinstance(arg, str) else str(arg) for arg in self.arguments)
+        call = f"{self.operation}({arguments})"
+        if self.target >= 0:
+            return f"{self.execution_condition}if {'not ' if self.negate else ''}{call} else jump({self.target})"
+        return f"{self.execution_condition}{call}"
 
 
 if __name__ == '__main__':
@@ -116,6 +207,6 @@ if __name__ == '__main__':
 
     python_ta.check_all(config={
         'max-line-length': 120,
-        'extra-imports': ['src.direction', 'src.actions.excondition', 'src.actions'],
-        'allowed-io': ['Instruction.unchecked_execute']
+        'extra-imports': ['src.events', 'src.actions.excondition', 'src.actions.context',
+                          'src.actions.variables', 'src.actions.triggers'],
     })
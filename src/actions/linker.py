@@ -0,0 +1,117 @@
+"""Adventure Game 1: Linking the instructions of ActionScript actions to the world they are loaded into.
+
+Instructions refer to the world through their arguments: location ids, direction names and item names,
+written as text in the actions file. Once the locations and items of a world are known, link_actions resolves
+every such reference once, and keeps the result in Instruction.link: directions are resolved to Direction,
+item names to the key of the item, or to the shared item itself for add_item, and location ids are checked
+against the locations of the world. Locations are kept as ids rather than Location objects, since regional
+worlds load and evict their locations (see src.regions). Executing an instruction then never parses or
+normalizes its arguments.
+
+Every reference that cannot be resolved, including the arguments of triggers, is reported at once by a
+LinkError when the world is loaded, rather than when a player first runs the instruction.
+"""
+from __future__ import annotations
+import sys
+from typing import TYPE_CHECKING, Callable, Container, Iterable, Optional
+
+from src.direction import Direction
+from src.errors import InvalidDirection, LinkError
+from src.actions.action import TriggeredAction
+from src.actions.triggers import ITEM_ACQUIRED, ITEM_DROPPED, LOCATION_ENTERED
+
+if TYPE_CHECKING:
+    from src.actions.action import Action
+    from src.actions.instruction import Instruction
+    from src.game_data import Item
+
+
+def link_actions(actions: list[Action], location_ids: Container[int], items: Iterable[Item]) -> None:
+    """Resolve the references of the instructions and triggers of actions to the locations with the given ids,
+    and to the given items along with the items added by the actions themselves. Raise LinkError listing every
+    reference that cannot be resolved.
+    """
+    # Imported here, since src.game_data itself imports this module.
+    from src.game_data import Item
+
+    item_keys = {item.key for item in items}
+    for action in actions:
+        for instruction in action.instructions:
+            if instruction.operation == 'add_item' and _is_text(instruction.arguments, 0):
+                item_keys.add(instruction.arguments[0].lower())
+
+    unresolved = []
+    for action in actions:
+        for instruction in action.instructions:
+            problem = _link(instruction, location_ids, item_keys, Item.intern)
+            if problem is not None:
+                unresolved.append(f"{action!r}: {problem} in {instruction!r}")
+        if isinstance(action, TriggeredAction):
+            for event, argument in action.triggers:
+                if event in (ITEM_ACQUIRED, ITEM_DROPPED) and argument not in item_keys:
+                    unresolved.append(f"{action!r}: unknown item \"{argument}\" in @{event}")
+                elif event == LOCATION_ENTERED and argument not in location_ids:
+                    unresolved.append(f"{action!r}: unknown location {argument} in @{event}")
+
+    if len(unresolved) != 0:
+        raise LinkError(f"{len(unresolved)} unresolved references:\n" + '\n'.join(unresolved))
+
+
+def _link(
+        instruction: Instruction,
+        location_ids: Container[int],
+        item_keys: set[str],
+        intern_item: Callable[[str, Optional[int]], Item]
+) -> Optional[str]:
+    """Set the link of instruction, returning why it cannot be linked, or None if it was linked. Items are
+    created through intern_item, which is Item.intern.
+    """
+    arguments = instruction.arguments
+    match instruction.operation:
+        case 'has_item' | 'take_item':
+            if not _is_text(arguments, 0):
+                return "expected an item name"
+            key = arguments[0].lower()
+            if key not in item_keys:
+                return f"unknown item \"{arguments[0]}\""
+            instruction.link = sys.intern(key)
+
+        case 'add_item':
+            if not _is_text(arguments, 0):
+                return "expected an item name"
+            location_id = arguments[1] if len(arguments) == 2 else -1
+            if not isinstance(location_id, int):
+                return "expected a location id"
+            if location_id >= 0 and location_id not in location_ids:
+                return f"unknown location {location_id}"
+            instruction.link = intern_item(arguments[0], None if location_id < 0 else location_id)
+
+        case 'prompt':
+            instruction.link = frozenset(str(argument).lower() for argument in arguments)
+
+        case 'unlock_direction_at_point':
+            if len(arguments) != 2 or not isinstance(arguments[0], int) or not _is_text(arguments, 1):
+                return "expected a location id and a direction"
+            if arguments[0] not in location_ids:
+                return f"unknown location {arguments[0]}"
+            try:
+                instruction.link = (arguments[0], Direction.from_str(arguments[1]))
+            except InvalidDirection:
+                return f"unknown direction \"{arguments[1]}\""
+    return None
+
+
+def _is_text(arguments: list[str | int], index: int) -> bool:
+    """Return whether arguments has a string at index.
+    """
+    return len(arguments) > index and isinstance(arguments[index], str)
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={
+        'max-line-length': 120,
+        'extra-imports': ['sys', 'src.direction', 'src.errors', 'src.actions.action', 'src.actions.instruction',
+                          'src.actions.triggers', 'src.game_data'],
+    })
@@ -3,10 +3,24 @@
 Here, we have avoided to build a full lexer. Although we have started by implementing
 a lexer first, we have simplified ActionScript using execution types ($, #, +, -), which
 has allowed us to build a simple parser directly and skip the lexing process.
+
+Structured control flow (if, else, end and return) is compiled away into a flat list of
+instructions: an if becomes its condition, jumping past its branch when the condition does not
+hold, and an else becomes a jump past the else branch. The jump targets are computed here, so
+executing an action never has to scan for the end of a branch.
+
+The else and end of an if must have the same execution condition as the if, and # lines, which only run
+after a failure, one after the other, cannot hold control flow.
 """
 from __future__ import annotations
+import sys
+from typing import Optional
+
+from src.errors import ActionScriptSyntaxError
 from src.actions.excondition import ExecutionCondition
-from src.actions.instruction import Instruction
+from src.actions.instruction import Instruction, VARIABLE_OPERATIONS, JUMP, RETURN
+from src.actions.triggers import EventKey, TRIGGER_EVENTS
+from src.actions.variables import VariableTable
 
 
 class ActionScriptParser:
@@ -14,30 +28,103 @@ class ActionScriptParser:
 
     Instance Attributes:
         - lines: The list of functions being called.
+        - variables: The variable table of the world, which assigns slots to the variables used by the lines.
     """
     lines: list[str]
+    variables: VariableTable
 
-    def __init__(self, lines: list[str]) -> None:
+    def __init__(self, lines: list[str], variables: VariableTable) -> None:
         """Initialize a parser.
         """
         self.lines = lines
+        self.variables = variables
 
     def compile(self) -> list[Instruction]:
         """Compile and return a list of instructions.
         """
         instructions = []
+        # The if instruction of every open block, along with the jump compiled from its else, if any.
+        open_blocks: list[tuple[Instruction, Optional[Instruction]]] = []
         for line in self.lines:
             line = line.strip()
-            if line != '':
+            if line != '' and not line.startswith('@'):
                 execution_condition_chr = line[0]
                 execution_condition = ExecutionCondition.from_str(execution_condition_chr)
+                statement = line[1:].strip()
+                keyword, _, condition = statement.partition(' ')
+                if execution_condition == ExecutionCondition.FAIL and \
+                        (keyword == 'if' or statement in {'else', 'end', 'return', 'return()'}):
+                    raise ActionScriptSyntaxError(f"Control flow cannot run on failure: {line}")
+
+                if keyword == 'if':
+                    negate = condition.startswith('not ')
+                    instruction = self._compile_instruction(
+                        condition[4:] if negate else condition, execution_condition
+                    )
+                    # The target is known once the branch is closed.
+                    instruction.target = len(instructions)
+                    instruction.negate = negate
+                    instructions.append(instruction)
+                    open_blocks.append((instruction, None))
+
+                elif statement == 'else':
+                    if len(open_blocks) == 0 or open_blocks[-1][1] is not None:
+                        raise ActionScriptSyntaxError(f"Unexpected else: {line}")
+                    if open_blocks[-1][0].execution_condition != execution_condition:
+                        raise ActionScriptSyntaxError(f"Else does not match the condition of its if: {line}")
+                    jump = Instruction(operation=JUMP, execution_condition=execution_condition, arguments=[])
+                    instructions.append(jump)
+                    branch, _ = open_blocks.pop()
+                    branch.target = len(instructions)
+                    open_blocks.append((branch, jump))
+
+                elif statement == 'end':
+                    if len(open_blocks) == 0:
+                        raise ActionScriptSyntaxError(f"Unexpected end: {line}")
+                    if open_blocks[-1][0].execution_condition != execution_condition:
+                        raise ActionScriptSyntaxError(f"End does not match the condition of its if: {line}")
+                    branch, jump = open_blocks.pop()
+                    (branch if jump is None else jump).target = len(instructions)
+
+                elif statement in {'return', 'return()'}:
+                    instructions.append(Instruction(operation=RETURN, execution_condition=execution_condition,
+                                                    arguments=[]))
 
-                operation, arguments = ActionScriptParser._parse_instruction(line[1:])
-                instructions.append(Instruction(
-                    operation=operation, execution_condition=execution_condition, arguments=arguments
-                ))
+                else:
+                    instructions.append(self._compile_instruction(statement, execution_condition))
+
+        if len(open_blocks) != 0:
+            raise ActionScriptSyntaxError(f"Missing end for: {open_blocks[-1][0]!r}")
         return instructions
 
+    def parse_triggers(self) -> list[EventKey]:
+        """Return the keys of the events declared by the lines starting with @, such as @item_acquired("Hammer").
+        """
+        triggers = []
+        for line in self.lines:
+            line = line.strip()
+            if line.startswith('@'):
+                event, arguments = ActionScriptParser._parse_instruction(line[1:])
+                if event not in TRIGGER_EVENTS or len(arguments) != 1:
+                    raise ActionScriptSyntaxError(f"Unknown trigger: {line}")
+                argument = arguments[0].lower() if isinstance(arguments[0], str) else arguments[0]
+                triggers.append((sys.intern(event), argument))
+        return triggers
+
+    def _compile_instruction(self, statement: str, execution_condition: ExecutionCondition) -> Instruction:
+        """Compile a single operation call, such as has_item("T-Card"), into an instruction.
+        """
+        operation, arguments = ActionScriptParser._parse_instruction(statement)
+        slot = None
+        if operation in VARIABLE_OPERATIONS:
+            if len(arguments) != 2 or not isinstance(arguments[0], str) or not isinstance(arguments[1], int):
+                raise ActionScriptSyntaxError(f"Expected a variable name and an integer: {statement}")
+            # Variable names are resolved to their slots once, here, rather than on every execution.
+            slot = self.variables.resolve(arguments[0])
+        return Instruction(
+            operation=sys.intern(operation), execution_condition=execution_condition, arguments=arguments, slot=slot
+        )
+
     @staticmethod
     def _parse_instruction(line: str) -> tuple[str, list[str | int]]:
         args_start_inclusive = line.find('(') + 1
@@ -78,5 +165,6 @@ if __name__ == '__main__':
 
     python_ta.check_all(config={
         'max-line-length': 120,
-        'extra-imports': ['src.actions.instruction', 'src.actions.excondition'],
+        'extra-imports': ['src.errors', 'src.actions.instruction', 'src.actions.triggers', 'src.actions.excondition',
+                          'src.actions.variables'],
     })
@@ -0,0 +1,117 @@
+"""Adventure Game 1: The index of triggered actions, which run only when the events they subscribe to happen.
+
+A background action declares the events it reacts to with lines starting with @, for instance:
+
+    Curse of the Hammer -1
+    @item_acquired("Hammer")
+    $take_points(5)
+    END
+
+The engine reports events to the TriggerIndex of the world, which looks up the subscribed actions by event
+key. Reactive content therefore costs nothing until its events happen, unlike background actions, which are
+all executed every time the player moves.
+"""
+from __future__ import annotations
+from bisect import bisect_right, insort
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from src.actions.action import TriggeredAction
+    from src.actions.context import Context
+
+# The events actions may subscribe to, with their argument.
+ITEM_ACQUIRED = 'item_acquired'  # The name of the item added to the inventory of the player.
+ITEM_DROPPED = 'item_dropped'  # The name of the item leaving the inventory of the player, by any means.
+LOCATION_ENTERED = 'location_entered'  # The id of the location the player has moved to, once it is shown.
+POINTS_REACHED = 'points_reached'  # A number of points the points of the player have risen to or past.
+STEPS_REACHED = 'steps_reached'  # The number of steps the player has just taken.
+TRIGGER_EVENTS = frozenset({ITEM_ACQUIRED, ITEM_DROPPED, LOCATION_ENTERED, POINTS_REACHED, STEPS_REACHED})
+
+# An event key is an event with its argument. Item names are lowercase.
+EventKey = tuple[str, str | int]
+
+
+class TriggerIndex:
+    """An index from event keys to the triggered actions subscribed to them.
+
+    Representation Invariants:
+        - self._thresholds == sorted({argument for event, argument in self._subscriptions
+                                      if event == POINTS_REACHED})
+    """
+    _subscriptions: dict[EventKey, list[TriggeredAction]]
+    _thresholds: list[int]
+
+    def __init__(self, actions: list[TriggeredAction]) -> None:
+        """Initialize an index of the given actions.
+        """
+        self._subscriptions = {}
+        self._thresholds = []
+        for action in actions:
+            self.add(action)
+
+    def add(self, action: TriggeredAction) -> None:
+        """Subscribe action to each of its triggers.
+        """
+        for key in action.triggers:
+            subscribers = self._subscriptions.setdefault(key, [])
+            if len(subscribers) == 0 and key[0] == POINTS_REACHED:
+                insort(self._thresholds, key[1])
+            subscribers.append(action)
+
+    def remove(self, action: TriggeredAction) -> None:
+        """Unsubscribe action from each of its triggers.
+        """
+        for key in action.triggers:
+            subscribers = self._subscriptions.get(key, [])
+            if action in subscribers:
+                subscribers.remove(action)
+            if len(subscribers) == 0 and key in self._subscriptions:
+                del self._subscriptions[key]
+                if key[0] == POINTS_REACHED:
+                    self._thresholds.remove(key[1])
+
+    def fire(self, context: Context, event: str, argument: str | int) -> None:
+        """Execute the actions subscribed to event with the given argument.
+
+        An action is never executed again by the events it causes itself, so that an action cannot
+        trigger itself indefinitely. The actions being executed are kept in context, so that players sharing
+        the world never skip the actions triggered for one another.
+        """
+        subscribers = self._subscriptions.get((event, argument))
+        if subscribers is None:
+            return
+        for action in list(subscribers):
+            if action not in context.running:
+                context.running.add(action)
+                try:
+                    action.execute(context, _shallow=False)
+                finally:
+                    context.running.discard(action)
+
+    def points_changed(self, context: Context, before: int) -> None:
+        """Fire the points thresholds crossed by the player, whose points were previously before.
+        """
+        after = context.player.points
+        if after <= before or len(self._thresholds) == 0:
+            return
+        thresholds = self._thresholds
+        for threshold in thresholds[bisect_right(thresholds, before):bisect_right(thresholds, after)]:
+            self.fire(context, POINTS_REACHED, threshold)
+
+    def actions(self) -> list[TriggeredAction]:
+        """Return every indexed action, once each.
+        """
+        return list({id(action): action for subscribers in self._subscriptions.values()
+                     for action in subscribers}.values())
+
+    def __len__(self) -> int:
+        return len(self._subscriptions)
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={
+        'max-line-length': 120,
+        'extra-imports': ['bisect', 'src.actions.action', 'src.actions.context'],
+    })
@@ -0,0 +1,84 @@
+"""Adventure Game 1: The variable table of ActionScript, resolving variable names to storage slots.
+
+ActionScript variables hold integers, and are either scoped to a player or shared by the whole world,
+in which case their name starts with "global.". Names are resolved to integer slots once, when the
+actions are compiled, and the values live in flat lists indexed by slot: Player.variables for player
+variables, and World.global_store for world variables. Every variable starts at 0.
+"""
+from __future__ import annotations
+from dataclasses import dataclass
+
+# The prefix of the names of variables shared by the whole world.
+GLOBAL_PREFIX = 'global.'
+
+
+@dataclass(slots=True, frozen=True)
+class VariableSlot:
+    """The storage slot of a variable.
+
+    Instance Attributes:
+        - is_global: Whether the variable is shared by the whole world, rather than scoped to a player.
+        - index: The index of the value of the variable in its store.
+
+    Representation Invariants:
+        - self.index >= 0
+    """
+    is_global: bool
+    index: int
+
+
+class VariableTable:
+    """A table assigning slots to the variables of a world, in the order they are first used.
+
+    Instance Attributes:
+        - player_names: The names of the player variables, indexed by slot.
+        - global_names: The names of the world variables, indexed by slot.
+    """
+    player_names: list[str]
+    global_names: list[str]
+    _slots: dict[str, VariableSlot]
+
+    def __init__(self) -> None:
+        """Initialize a table without any variables.
+        """
+        self.player_names = []
+        self.global_names = []
+        self._slots = {}
+
+    def resolve(self, name: str) -> VariableSlot:
+        """Return the slot of the variable with the given name, assigning it a new slot on first use.
+        Variable names are case-insensitive.
+        """
+        name = name.lower()
+        slot = self._slots.get(name)
+        if slot is None:
+            names = self.global_names if name.startswith(GLOBAL_PREFIX) else self.player_names
+            slot = VariableSlot(is_global=names is self.global_names, index=len(names))
+            names.append(name)
+            self._slots[name] = slot
+        return slot
+
+    def copy(self) -> VariableTable:
+        """Return a table assigning the same slots as this one, which can assign new slots without changing
+        this table.
+        """
+        table = VariableTable()
+        table.player_names = self.player_names.copy()
+        table.global_names = self.global_names.copy()
+        table._slots = self._slots.copy()
+        return table
+
+    def update(self, other: VariableTable) -> None:
+        """Assign slots to the variables of other missing from this table, in the order other assigned them.
+        If other is a copy of this table, the variables are assigned the same slots as in other.
+        """
+        for name in other.player_names + other.global_names:
+            self.resolve(name)
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={
+        'max-line-length': 120,
+    })
@@ -19,205 +19,399 @@ This file is Copyright (c) 2024 CSC111 Teaching Team
 """
 from __future__ import annotations
 
+import os
 import sys
+import time
+from argparse import ArgumentParser
 from typing import Optional
 
-from src.actions.context import Context
+from src import events, metrics
+from src.actions.action import Action
+from src.actions.context import STANDARD_CONSOLE, Console, Context
+from src.actions.triggers import ITEM_ACQUIRED, ITEM_DROPPED, LOCATION_ENTERED, STEPS_REACHED
+from src.batch import BATCH_SEPARATOR, play_batch, split_batch
+from src.commands import CommandTable
+from src.descriptions import DescriptionStore, MappedDescriptions, DEFAULT_CACHE_SIZE
 from src.direction import Direction
 from src.game_data import World, Player, Location
+from src.packs import DEFAULT_DATA_DIRECTORY, ACTIONS_FILE, ITEMS_FILE, LOCATIONS_FILE, load_pack
+from src.regions import DEFAULT_RADIUS, DEFAULT_MAX_TILES
 
 DEFAULT_MENU = ['go <direction>', 'look', 'inventory', 'score', 'steps', 'quit', 'inspect', 'grab', 'drop']
 
 
 # Note: You may add helper functions, classes, etc. here as needed
-def prepare_world() -> tuple[World, Player, Location]:
+def prepare_world(
+        source: str = DEFAULT_DATA_DIRECTORY,
+        descriptions: Optional[DescriptionStore] = None,
+        radius: int = DEFAULT_RADIUS,
+        max_tiles: int = DEFAULT_MAX_TILES,
+        workers: int = 1
+) -> tuple[World, Player, Location]:
     """
-    Returns an instance of World, Player and starting Location by
-    loading files from the assets folder.
-
-    defaults.txt is a file containing only one single line, in the format:
-        <initial starting location id> <maximum permitted steps>
+    Returns an instance of World, Player and starting Location by loading the
+    pack at source, which is either a data directory, a compiled bundle, a
+    region file or a content archive (see src.packs). The location descriptions are kept in
+    descriptions, or in memory if it is None. radius and max_tiles configure
+    the loading of the tiles of region files, and workers is the number of
+    processes parsing data directories and content archives.
     """
-    with open("../gamedata/map.txt", "r") as world_map, \
-            open("../gamedata/locations.txt", "r") as locations, \
-            open("../gamedata/items.txt", "r") as items, \
-            open("../gamedata/actions.txt", "r") as actions, \
-            open("../gamedata/defaults.txt", "r") as defaults:
-        starting_location_id_str, max_steps_str = defaults.readline().split(' ')
-
-        wrld = World(world_map, locations, items, actions)
-        x, y = wrld.get_location_position(
-            location_id=int(starting_location_id_str),
-            world_map=wrld.map
-        )
-        plyr = Player(x=x, y=y, max_steps=int(max_steps_str))
-        loc = wrld.get_location(x, y)
+    pack = load_pack(source, descriptions, radius, max_tiles, workers)
+    wrld = pack.world
+    x, y = wrld.find_location(pack.starting_location_id)
+    plyr = Player(x=x, y=y, max_steps=pack.max_steps)
+    loc = wrld.get_location(x, y)
 
-        return wrld, plyr, loc
+    return wrld, plyr, loc
 
 
-def handle_menu(loc: Location) -> None:
+def handle_menu(_arguments: str, context: Context) -> None:
     """Helper function to handle the menu call in the main loop.
     """
-    print("Menu Options:")
-    for option in DEFAULT_MENU + [str(act) for act in loc.actions if not act.completed]:
-        print('\t-', option)
+    context.console.show("Menu Options:")
+    for option in DEFAULT_MENU + [str(act) for act in context.location.actions if not act.completed]:
+        context.console.show('\t-', option)
 
 
-def handle_inspect(loc: Location) -> None:
+def handle_inspect(_arguments: str, context: Context) -> None:
     """Helper function to handle the inspect call in the main loop.
     """
+    loc = context.location
     if len(loc.items) == 0:
-        print("You couldn't find any items here.")
+        context.console.show("You couldn't find any items here.")
     else:
         items_and_counts = {itm: loc.items.count(itm) for itm in loc.items}
-        print("You have seen the following items:")
+        context.console.show("You have seen the following items:")
         for item, count in items_and_counts.items():
-            print(f"×{count} {item}")
+            context.console.show(f"×{count} {item}")
 
 
-def handle_grab(choice: str, p: Player, loc: Location) -> None:
+def handle_grab(item_string: str, context: Context) -> None:
     """Helper function to handle the grab call in the main loop.
     """
-    item_string = choice[5:].lower()
-    item = next((itm for itm in loc.items if repr(itm) == item_string), None)
+    p, loc = context.player, context.location
+    item = next((itm for itm in loc.items if itm.key == item_string), None)
     if item is not None:  # or just not None, but this is more readable
-        print(f"You have picked up {item}.")
-        loc.items.remove(item)
-        p.inventory.append(item)
+        context.console.show(f"You have picked up {item}.")
+        context.world.remove_item(loc, item)
+        p.add_item(item)
         p.steps += 1
+        events.emit('grab', item=item.name, location=loc.descriptor.location_id)
+        context.world.triggers.fire(context, ITEM_ACQUIRED, item.key)
+        context.world.triggers.fire(context, STEPS_REACHED, p.steps)
     else:
-        print("You couldn't find that item.")
+        context.console.show("You couldn't find that item.")
 
 
-def handle_drop(choice: str, p: Player, loc: Location) -> None:
+def handle_drop(item_string: str, context: Context) -> None:
     """Helper function to handle the drop call in the main loop.
     """
-    item_string = choice[5:].lower()
-    item = next((itm for itm in p.inventory if repr(itm) == item_string), None)
+    p, loc = context.player, context.location
+    item = next((itm for itm in p.inventory if itm.key == item_string), None)
     if item is not None:
-        print(f"You dropped your {item}.")
-        p.inventory.remove(item)
-        loc.items.append(item)
+        context.console.show(f"You dropped your {item}.")
+        p.remove_item(item)
+        context.world.add_item(loc, item)
         p.steps += 1
+        events.emit('drop', item=item.name, location=loc.descriptor.location_id)
+        context.world.triggers.fire(context, ITEM_DROPPED, item.key)
+        context.world.triggers.fire(context, STEPS_REACHED, p.steps)
     else:
-        print("You couldn't find that item in your inventory.")
+        context.console.show("You couldn't find that item in your inventory.")
 
 
-def handle_go(direction: Direction, p: Player, wrld: World, loc: Location) -> Optional[Location]:
+def handle_go(direction_string: str, context: Context) -> Optional[Location]:
     """Helper function to handle the go call in the mail loop.
     """
+    direction = Direction.resolve(direction_string)
+    if direction is None:
+        context.console.show(f"'{direction_string}' doesn't seem like a valid direction.")
+        return None
+
+    p, loc = context.player, context.location
     if direction in loc.allowed_movements:
         x_offset, y_offset = direction.offset()
         p.x, p.y = p.x + x_offset, p.y + y_offset
         p.steps += 1
-        return wrld.get_location(p.x, p.y)
+        new_loc = context.world.get_location(p.x, p.y)
+        events.emit('move', direction=str(direction), start=loc.descriptor.location_id,
+                    end=new_loc.descriptor.location_id if new_loc is not None else None)
+        if new_loc is not None:
+            new_context = Context(world=context.world, player=p, location=new_loc, console=context.console,
+                                  running=context.running)
+            context.world.triggers.fire(new_context, STEPS_REACHED, p.steps)
+        return new_loc
     else:
-        print('That direction is blocked.')
+        context.console.show('That direction is blocked.')
+        events.emit('move', direction=str(direction), start=loc.descriptor.location_id, blocked=True)
         return None
 
 
-def handle_inventory(p: Player) -> None:
+def handle_inventory(_arguments: str, context: Context) -> None:
     """Helper function to handle inventory call in the main loop.
     """
+    p = context.player
     inventory_string = [str(itm) for itm in p.inventory]
     items_and_counts = {itm: inventory_string.count(itm) for itm in inventory_string}
     if len(p.inventory) == 0:
-        print('You have no items in your inventory.')
+        context.console.show('You have no items in your inventory.')
     else:
-        print('You have the following items in your inventory:')
+        context.console.show('You have the following items in your inventory:')
         for item, count in items_and_counts.items():
-            print(f'×{count} {item}')
+            context.console.show(f'×{count} {item}')
 
 
-def handle_simple_commands(choice: str, p: Player, loc: Location) -> None:
-    """A wrapped handler to reduce function complexity that computes
-    various actions.
+def handle_look(_arguments: str, context: Context) -> None:
+    """Helper function to handle the look call in the main loop.
     """
-    if choice == 'look':
-        print(loc.descriptor.long_description)
+    context.console.show(context.location.descriptor.long_description)
 
-    elif choice == 'inventory':
-        handle_inventory(p)
 
-    elif choice == 'score':
-        print(f'Your score is {p.points}!')
+def handle_score(_arguments: str, context: Context) -> None:
+    """Helper function to handle the score call in the main loop.
+    """
+    context.console.show(f'Your score is {context.player.points}!')
+
+
+def handle_steps(_arguments: str, context: Context) -> None:
+    """Helper function to handle the steps call in the main loop.
+    """
+    context.console.show(f'You have {context.player.steps}/{context.player.max_steps} steps')
+
+
+def handle_quit(_arguments: str, context: Context) -> None:
+    """Helper function to handle the quit call in the main loop.
+    """
+    context.console.show("Bye!")
+    sys.exit(0)
+
+
+def handle_action(act: Action, context: Context) -> Optional[Location]:
+    """Helper function to run an action of the current location, named by the player, in the main loop.
+    """
+    _ = act.execute(context=context, shallow=False)
+    context.player.steps += 1
+    context.world.triggers.fire(context, STEPS_REACHED, context.player.steps)
+
+    if context.player.victory:
+        return context.location
+    return None
 
-    elif choice == 'steps':
-        print(f'You have {p.steps}/{p.max_steps} steps')
 
-    elif choice == 'quit':
-        print("Bye!")
-        sys.exit(0)
+COMMANDS = CommandTable(action_handler=handle_action)
+COMMANDS.register(handle_menu, 'menu', '[menu]', 'help')
+COMMANDS.register(handle_inspect, 'inspect')
+COMMANDS.register(handle_grab, 'grab', takes_arguments=True)
+COMMANDS.register(handle_drop, 'drop', takes_arguments=True)
+COMMANDS.register(handle_go, 'go', takes_arguments=True)
+COMMANDS.register(handle_look, 'look')
+COMMANDS.register(handle_inventory, 'inventory')
+COMMANDS.register(handle_score, 'score')
+COMMANDS.register(handle_steps, 'steps')
+COMMANDS.register(handle_quit, 'quit')
 
 
-def main_loop(loc: Location, p: Player) -> Optional[Location]:
-    """The main function that runs the adventure game, asking for choices.
+def main_loop(loc: Location, p: Player, wrld: World) -> Optional[Location]:
+    """The main function that runs the adventure game, asking for choices, which may be a batch of
+    commands separated by semicolons (see src.batch). The new location is shown if the player has moved.
     Return the new location if the location has changed, None otherwise.
     This function should be called inside a while loop.
     """
     choice = input("\nEnter action: ").strip().lower()
+    if BATCH_SEPARATOR not in choice:
+        return play_turn(choice, loc, p, wrld)
 
-    if choice in {'menu', '[menu]', 'help'}:
-        handle_menu(loc)
+    location = loc
 
-    elif choice == 'inspect':
-        handle_inspect(loc)
+    def play(command: str, console: Console) -> Optional[Location]:
+        nonlocal location
+        new_location = play_turn(command, location, p, wrld, console)
+        location = location if new_location is None else new_location
+        return new_location
 
-    elif choice.startswith('grab'):
-        handle_grab(choice, p, loc)
+    play_batch(split_batch(choice), play, lambda: game_over(p), sys.stdout)
+    return location if location is not loc else None
 
-    elif choice.startswith('drop'):
-        handle_drop(choice, p, loc)
 
-    elif choice.startswith('go'):
-        direction_string = choice[3:]
+def play_turn(
+        choice: str, loc: Location, p: Player, wrld: World, console: Console = STANDARD_CONSOLE
+) -> Optional[Location]:
+    """Run the command typed by p at loc as play_command does, then show the new location as arrive does if
+    p has moved and the game is not over, and fire the location_entered event once it is shown. Return the new
+    location if the location has changed, None otherwise.
+    """
+    start = time.perf_counter()
+    new_location = play_command(choice, loc, p, wrld, console)
+    if new_location is not None and not game_over(p):
+        arrive(new_location, p, wrld, console)
+        if new_location is not loc:
+            wrld.triggers.fire(Context(world=wrld, player=p, location=new_location, console=console),
+                               LOCATION_ENTERED, new_location.descriptor.location_id)
+    if metrics.engine is not None:
+        metrics.engine.turn_seconds.observe(time.perf_counter() - start)
+    return new_location
+
+
+def game_over(p: Player) -> bool:
+    """Return whether the game of p is over, because p has won or has no steps left.
+    """
+    return p.victory or p.steps >= p.max_steps
 
-        if direction_string.lower() not in {'east', 'west', 'north', 'south'}:
-            print(f"'{direction_string}' doesn't seem like a valid direction.")
-            return None
 
-        direction = Direction.from_str(direction_string)
-        return handle_go(direction, p, world, loc)
+def game_ending(p: Player) -> str:
+    """Return the message shown to p once the game is over.
+    """
+    if p.victory:
+        return f'You won in {p.steps} moves! Your score was a whopping {p.points}!'
+    return 'You have missed your exam!'
 
-    elif choice in {'look', 'inventory', 'score', 'quit', 'steps'}:
-        handle_simple_commands(choice, p, loc)
-    else:
-        act = loc.get_action_by_string(choice)
 
-        if act is None:
-            print('Unknown command!')
-            return None
+def play_command(
+        choice: str, loc: Location, p: Player, wrld: World, console: Console = STANDARD_CONSOLE
+) -> Optional[Location]:
+    """Run the command typed by p at loc, where choice is already stripped and lowercase, showing its output
+    on console. Return the new location if the location has changed, None otherwise.
+    """
+    events.emit('command', command=choice, steps=p.steps)
+    context = Context(world=wrld, player=p, location=loc, console=console)
+    return COMMANDS.dispatch(choice, context)
 
-        _ = act.execute(context=Context(world=world, player=p, location=loc), shallow=False)
-        p.steps += 1
 
-        if p.victory:
-            return loc
-    return None
+def arrive(loc: Location, p: Player, wrld: World, console: Console = STANDARD_CONSOLE) -> None:
+    """Show loc to p on console, as p has just arrived there, then run the background actions and the shallow
+    executions of the actions of loc.
+    """
+    points_before_visit = p.points
+    wrld.visit(loc, p, console)
+    context = Context(world=wrld, player=p, location=loc, console=console)
+    wrld.triggers.points_changed(context, points_before_visit)
 
+    start = time.perf_counter()
+    for action in wrld.background_actions:
+        action.execute(context=context, _shallow=True)
+    if metrics.engine is not None:
+        metrics.engine.background_seconds.observe(time.perf_counter() - start)
 
-if __name__ == "__main__":
-    world, player, location = prepare_world()
+    for action in loc.actions:
+        action.execute(context=context, shallow=True)
 
-    while not player.victory and player.steps < player.max_steps:
-        location.visit(player)
 
-        for action in world.background_actions:
-            success = action.execute(context=Context(world=world, player=player, location=location), _shallow=True)
+def pack_name(source: str) -> str:
+    """Return the name of the pack at source, which is the name of its data directory or file, without
+    its extension.
+    """
+    return os.path.splitext(os.path.basename(os.path.normpath(source)))[0]
 
-        for action in location.actions:
-            action.execute(context=Context(world=world, player=player, location=location), shallow=True)
 
-        while True:
-            new_location = main_loop(location, player)
-            if player.steps >= player.max_steps:
-                break
-            if new_location is not None:
-                location = new_location
-                break
+def build_argument_parser() -> ArgumentParser:
+    """Return the command line argument parser of the game.
+    """
+    parser = ArgumentParser(description="Play the text adventure game.")
+    parser.add_argument(
+        '--data', default=DEFAULT_DATA_DIRECTORY,
+        help="the data directory, compiled bundle, region file or content archive of the game to play "
+             "(default: the bundled gamedata)"
+    )
+    parser.add_argument(
+        '--lazy-descriptions', action='store_true',
+        help="keep location descriptions in a bundle file on disk, loading them on first access"
+    )
+    parser.add_argument(
+        '--description-cache', type=int, default=DEFAULT_CACHE_SIZE,
+        help="the number of descriptions kept in memory when using --lazy-descriptions or --compress-descriptions"
+    )
+    parser.add_argument(
+        '--compress-descriptions', action='store_true',
+        help="keep location descriptions and printed messages compressed in memory, decompressing them when shown"
+    )
+    parser.add_argument(
+        '--region-radius', type=int, default=DEFAULT_RADIUS,
+        help="the number of tiles around the player loaded ahead of time when playing a region file"
+    )
+    parser.add_argument(
+        '--region-tiles', type=int, default=DEFAULT_MAX_TILES,
+        help="the maximum number of tiles kept loaded when playing a region file"
+    )
+    parser.add_argument(
+        '--parse-workers', type=int, default=1,
+        help="the number of processes parsing the locations and actions of a data directory or content archive"
+    )
+    parser.add_argument(
+        '--event-log', metavar='PATH',
+        help="append a newline-delimited JSON record of every gameplay event to the file at PATH"
+    )
+    parser.add_argument(
+        '--results', metavar='PATH',
+        help="record the result of the game in the results file at PATH, for the leaderboards (see src.results)"
+    )
+    parser.add_argument(
+        '--metrics-port', type=int, metavar='PORT',
+        help="serve the metrics of the engine in the Prometheus text format at http://127.0.0.1:PORT/metrics"
+    )
+    parser.add_argument(
+        '--watch', action='store_true',
+        help="reload the locations and actions whenever their files change, keeping the game state"
+    )
+    return parser
 
-    if player.victory:
-        print(f'You won in {player.steps} moves! Your score was a whopping {player.points}!')
-    else:
-        print('You have missed your exam!')
+
+if __name__ == "__main__":
+    argument_parser = build_argument_parser()
+    arguments = argument_parser.parse_args()
+    if arguments.watch and not os.path.isdir(arguments.data):
+        argument_parser.error("--watch requires a data directory")
+    if arguments.lazy_descriptions and arguments.compress_descriptions:
+        argument_parser.error("--lazy-descriptions and --compress-descriptions cannot be combined")
+
+    if arguments.metrics_port is not None:
+        metrics.serve(metrics.enable().registry, arguments.metrics_port)
+
+    world, player, location = prepare_world(
+        source=arguments.data,
+        descriptions=MappedDescriptions(cache_size=arguments.description_cache)
+        if arguments.lazy_descriptions else None,
+        radius=arguments.region_radius,
+        max_tiles=arguments.region_tiles,
+        workers=arguments.parse_workers
+    )
+    if arguments.compress_descriptions:
+        world.compress_texts(arguments.description_cache)
+
+    if arguments.event_log is not None:
+        events.open_log(arguments.event_log)
+
+    reloader = None
+    if arguments.watch:
+        # Only imported when watching, to keep the start of the game fast.
+        from src.reload import WorldReloader
+        reloader = WorldReloader(
+            world,
+            os.path.join(arguments.data, LOCATIONS_FILE),
+            os.path.join(arguments.data, ACTIONS_FILE),
+            os.path.join(arguments.data, ITEMS_FILE)
+        )
+
+    started = time.monotonic()
+    arrive(location, player, world)
+    while not game_over(player):
+        if reloader is not None:
+            reloader.poll()
+        new_location = main_loop(location, player, world)
+        if new_location is not None:
+            location = new_location
+
+    events.emit('game_over', victory=player.victory, steps=player.steps, points=player.points)
+    if arguments.results is not None:
+        # Only imported when recording results, to keep the start of the game fast.
+        from src.results import ResultStore, RunResult
+        results = ResultStore(arguments.results)
+        results.record(RunResult(
+            pack=pack_name(arguments.data),
+            steps=player.steps,
+            points=player.points,
+            victory=player.victory,
+            duration=time.monotonic() - started,
+            finished_at=time.time()
+        ))
+        results.close()
+    print(game_ending(player))
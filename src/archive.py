@@ -0,0 +1,202 @@
+"""Adventure Game 1: Content archives, holding every file of a pack in a single indexed file.
+
+Unlike a data directory, whose files must be read and split end to end to find any one location or action,
+a content archive stores every location and action segment separately, and ends with a header holding the
+offset of each segment, keyed by location id and by action name and location id. Any one segment is read
+with a single seek, and segments may be compressed with zlib. The map, items and defaults are stored whole.
+Background actions may share a name, so the actions are listed in the order of the actions file, and several
+may have the same key.
+
+The segments are stored as text, exactly as they appear in the data directory, so an archive can be read
+without this engine: it starts with the 8 bytes ADVARCH1, and ends with the 8 byte little-endian offset of
+its header, which is a UTF-8 JSON object.
+
+Pack a data directory into an archive with:
+
+    python -m src.archive <data directory> <archive path> [--compress]
+"""
+from __future__ import annotations
+import json
+import os
+import struct
+import zlib
+from typing import BinaryIO
+
+from src.errors import MapSyntaxError
+
+# The sections holding the map, items and defaults of a pack.
+MAP_SECTION = 'map'
+ITEMS_SECTION = 'items'
+DEFAULTS_SECTION = 'defaults'
+
+# Archives start with this, and end with the offset of their header.
+_MAGIC = b'ADVARCH1'
+_FOOTER = struct.Struct('<Q')
+
+# Actions are identified by their lowercase name and location id, which is -1 for background actions.
+ActionKey = tuple[str, int]
+
+# The offset and length of a stored segment or section.
+Span = tuple[int, int]
+
+
+class ContentArchive:
+    """An open content archive, reading its segments on demand.
+
+    Instance Attributes:
+        - path: The path of the archive.
+        - compressed: Whether the segments and sections of the archive are compressed with zlib.
+    """
+    path: str
+    compressed: bool
+    _file: BinaryIO
+    _sections: dict[str, Span]
+    _locations: dict[int, Span]
+    _actions: list[tuple[ActionKey, Span]]
+    _action_spans: dict[ActionKey, list[Span]]
+
+    def __init__(self, path: str) -> None:
+        """Open the archive at path, reading its header.
+        """
+        self.path = path
+        self._file = open(path, 'rb')
+        if self._file.read(len(_MAGIC)) != _MAGIC:
+            self._file.close()
+            raise ValueError(f"{path} is not a content archive")
+        self._file.seek(-_FOOTER.size, os.SEEK_END)
+        end = self._file.tell()
+        (header_offset,) = _FOOTER.unpack(self._file.read(_FOOTER.size))
+        self._file.seek(header_offset)
+        header = json.loads(self._file.read(end - header_offset).decode('utf-8'))
+
+        self.compressed = header['compression'] == 'zlib'
+        self._sections = {name: (offset, length) for name, (offset, length) in header['sections'].items()}
+        self._locations = {location_id: (offset, length) for location_id, offset, length in header['locations']}
+        self._actions = [
+            ((name.lower(), location_id), (offset, length)) for name, location_id, offset, length in header['actions']
+        ]
+        self._action_spans = {}
+        for key, span in self._actions:
+            self._action_spans.setdefault(key, []).append(span)
+
+    def location_ids(self) -> list[int]:
+        """Return the ids of the locations in the archive, in the order of the locations file.
+        """
+        return list(self._locations)
+
+    def action_keys(self) -> list[ActionKey]:
+        """Return the key of every action in the archive, in the order of the actions file. Actions sharing a
+        name and location share their key.
+        """
+        return [key for key, _ in self._actions]
+
+    def read_location(self, location_id: int) -> list[str]:
+        """Return the segment of the location with the given id. Raise KeyError if there is no such location.
+        """
+        return self._read(self._locations[location_id]).split('\n')
+
+    def read_actions(self, name: str, location_id: int) -> list[list[str]]:
+        """Return the segments of the actions with the given name, in any case, at the location with the given
+        id, in the order of the actions file. Raise KeyError if there is no such action.
+        """
+        return [self._read(span).split('\n') for span in self._action_spans[(name.lower(), location_id)]]
+
+    def read_all_actions(self) -> list[list[str]]:
+        """Return the segment of every action in the archive, in the order of the actions file.
+        """
+        return [self._read(span).split('\n') for _, span in self._actions]
+
+    def read_section(self, name: str) -> str:
+        """Return the text of the section with the given name.
+        """
+        return self._read(self._sections[name])
+
+    def close(self) -> None:
+        """Close the archive.
+        """
+        self._file.close()
+
+    def __enter__(self) -> ContentArchive:
+        return self
+
+    def __exit__(self, *_exc_info: object) -> None:
+        self.close()
+
+    def _read(self, span: Span) -> str:
+        """Return the text stored at the given span.
+        """
+        offset, length = span
+        self._file.seek(offset)
+        data = self._file.read(length)
+        if self.compressed:
+            data = zlib.decompress(data)
+        return data.decode('utf-8')
+
+
+def pack_directory(directory: str, path: str, compress: bool = False) -> int:
+    """Store the pack in the given data directory as a content archive at path, compressing every segment
+    and section with zlib if compress is True. Return the number of segments stored.
+    """
+    # Imported here, since src.packs itself imports this module.
+    from src.packs import MAP_FILE, LOCATIONS_FILE, ITEMS_FILE, ACTIONS_FILE, DEFAULTS_FILE
+    from src.game_data import World
+
+    def read(file_name: str) -> str:
+        with open(os.path.join(directory, file_name), 'r') as data:
+            return data.read()
+
+    def read_segments(file_name: str) -> list[list[str]]:
+        with open(os.path.join(directory, file_name), 'r') as data:
+            return World.split_segments(data)
+
+    with open(path, 'wb') as archive:
+        def write(text: str) -> list[int]:
+            data = text.encode('utf-8')
+            if compress:
+                data = zlib.compress(data, 9)
+            offset = archive.tell()
+            archive.write(data)
+            return [offset, len(data)]
+
+        archive.write(_MAGIC)
+        header = {
+            'compression': 'zlib' if compress else None,
+            'sections': {
+                MAP_SECTION: write(read(MAP_FILE)),
+                ITEMS_SECTION: write(read(ITEMS_FILE)),
+                DEFAULTS_SECTION: write(read(DEFAULTS_FILE)),
+            },
+            'locations': [],
+            'actions': [],
+        }
+        for segment in read_segments(LOCATIONS_FILE):
+            header['locations'].append([_location_id(segment[0]), *write('\n'.join(segment))])
+        for segment in read_segments(ACTIONS_FILE):
+            name, _, location_id = segment[0].rpartition(' ')
+            header['actions'].append([name, int(location_id), *write('\n'.join(segment))])
+
+        header_offset = archive.tell()
+        archive.write(json.dumps(header, separators=(',', ':')).encode('utf-8'))
+        archive.write(_FOOTER.pack(header_offset))
+    return len(header['locations']) + len(header['actions'])
+
+
+def _location_id(header: str) -> int:
+    """Return the id of the location declared by the first line of a location segment.
+    """
+    must_be_location, _, location_id = header.partition(' ')
+    if must_be_location != "LOCATION":
+        raise MapSyntaxError("Location declarations must start with LOCATION")
+    return int(location_id)
+
+
+if __name__ == '__main__':
+    from argparse import ArgumentParser
+
+    argument_parser = ArgumentParser(description="Pack a data directory into a content archive.")
+    argument_parser.add_argument('directory', help="the data directory of the pack")
+    argument_parser.add_argument('path', help="the path of the archive to write")
+    argument_parser.add_argument('--compress', action='store_true', help="compress every segment with zlib")
+    arguments = argument_parser.parse_args()
+    segments = pack_directory(arguments.directory, arguments.path, arguments.compress)
+    print(f"Packed {segments} segments into {arguments.path}.")
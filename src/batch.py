@@ -0,0 +1,130 @@
+"""Adventure Game 1: Playing a batch of commands in one pass, such as "go east; grab hammer; swipe card".
+
+Clients far from the game pay a round trip for every command they send. A batch lets them send several
+commands at once, separated by semicolons: the commands are played one after the other, and the output of
+the whole batch is written at once when it ends, along with the result of every command played.
+
+A batch stops early once the game is over, since later commands could not be played, and after a command
+whose action asked the player a question with prompt, since later commands were written without knowing
+it. The output played so far is written before the question is answered, so the player can read it.
+
+Commands are played on a Console of their own (see src.actions.context), which collects their output, so that
+batches played at the same time from several threads never see each other's output or answers.
+"""
+from __future__ import annotations
+import io
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Callable, Optional, TextIO
+
+from src.actions.context import Console
+
+if TYPE_CHECKING:
+    from src.game_data import Location
+
+BATCH_SEPARATOR = ';'
+
+
+@dataclass(slots=True, frozen=True)
+class CommandResult:
+    """The result of a command played in a batch.
+
+    Instance Attributes:
+        - command: The command played.
+        - output: What the command printed, including the location shown if the player moved.
+        - location_id: The id of the location the player moved to, or None if the player did not move.
+        - prompted: Whether an action of the command asked the player a question.
+        - finished: Whether the game was over once the command was played.
+    """
+    command: str
+    output: str
+    location_id: Optional[int]
+    prompted: bool
+    finished: bool
+
+
+class _PromptWatcher:
+    """The questions asked by a batch, which notes when a command asks a question, and writes the output of the
+    batch so far before reading the answer.
+    """
+    prompted: bool
+    _read_answer: Callable[[], str]
+    _buffer: io.StringIO
+    _out: Optional[TextIO]
+    _written: int
+
+    def __init__(self, read_answer: Callable[[], str], buffer: io.StringIO, out: Optional[TextIO]) -> None:
+        """Initialize the watcher of a batch whose output is collected in buffer and written to out, reading
+        the answers of the player with read_answer.
+        """
+        self.prompted = False
+        self._read_answer = read_answer
+        self._buffer = buffer
+        self._out = out
+        self._written = 0
+
+    def ask(self, question: str) -> str:
+        """Write the output of the batch not yet written, followed by question, then read the answer of the
+        player.
+        """
+        self.prompted = True
+        self._buffer.write(question)
+        self.flush_to_out()
+        return self._read_answer()
+
+    def flush_to_out(self) -> None:
+        """Write the output of the batch not yet written.
+        """
+        if self._out is not None:
+            text = self._buffer.getvalue()
+            self._out.write(text[self._written:])
+            self._out.flush()
+            self._written = len(text)
+
+
+def split_batch(text: str) -> list[str]:
+    """Return the commands of a batch, without the empty ones.
+    """
+    return [command.strip() for command in text.split(BATCH_SEPARATOR) if command.strip() != '']
+
+
+def play_batch(
+        commands: list[str],
+        play: Callable[[str, Console], Optional[Location]],
+        finished: Callable[[], bool],
+        out: Optional[TextIO] = None,
+        read_answer: Callable[[], str] = input
+) -> list[CommandResult]:
+    """Play commands in order with play, which plays a command on the given console, showing the new location
+    if the player moved, and returns the new location if it has changed. Stop early once finished returns True,
+    or after a command asked the player a question, whose answer is read with read_answer. Write the output of
+    the batch to out at once, if it is given, and return the result of every command played.
+    """
+    results = []
+    buffer = io.StringIO()
+    watcher = _PromptWatcher(read_answer, buffer, out)
+    console = Console(output=buffer, reader=watcher.ask)
+    try:
+        for command in commands:
+            start = buffer.tell()
+            new_location = play(command, console)
+            results.append(CommandResult(
+                command=command,
+                output=buffer.getvalue()[start:],
+                location_id=None if new_location is None else new_location.descriptor.location_id,
+                prompted=watcher.prompted,
+                finished=finished()
+            ))
+            if watcher.prompted or results[-1].finished:
+                break
+    finally:
+        watcher.flush_to_out()
+    return results
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={
+        'max-line-length': 120,
+        'extra-imports': ['io', 'src.actions.context', 'src.game_data'],
+    })
@@ -0,0 +1,117 @@
+"""Adventure Game 1: The command table used by the main loop to route player input to its handlers.
+
+Built-in verbs are registered once, together with their aliases, and player input is resolved with a
+dictionary lookup on its first word, falling back to the action table of the player's location. Neither
+lookup gets slower as more commands are registered.
+"""
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from src import metrics
+from src.actions.action import Action
+from src.actions.context import Context
+from src.game_data import Location
+from src.prefix_table import PrefixTable
+
+# The shortest prefix of the name of an action completed to that action, so that a single letter typed by
+# mistake does not run an action, which may cost a step.
+MIN_ACTION_PREFIX = 3
+
+# A handler receives the arguments typed after the verb, and returns the new location of the player,
+# if the player has moved.
+CommandHandler = Callable[[str, Context], Optional[Location]]
+ActionHandler = Callable[[Action, Context], Optional[Location]]
+
+
+@dataclass(slots=True, frozen=True)
+class Command:
+    """A built-in command registered in a CommandTable.
+
+    Instance Attributes:
+        - name: The first name the command was registered with, which names it in metrics.
+        - handler: The function run when the command is typed.
+        - takes_arguments: Whether the command accepts arguments after its verb. Input starting with the verb
+          of a command without arguments, such as "look around", may instead name an action of the location.
+    """
+    name: str
+    handler: CommandHandler
+    takes_arguments: bool
+
+
+class CommandTable:
+    """A registry of the built-in commands of the game.
+
+    Player input is resolved, in order, to a built-in verb, an action of the player's location, a built-in
+    verb starting with the first word of the input, and finally an action starting with the input. Prefixes
+    are only accepted when they are unambiguous. Actions are only completed from prefixes of at least
+    MIN_ACTION_PREFIX characters, and never when the first word of the input starts several verbs.
+
+    Instance Attributes:
+        - action_handler: The handler running an action of the player's location named by the input.
+    """
+    action_handler: ActionHandler
+    _verbs: PrefixTable
+
+    def __init__(self, action_handler: ActionHandler) -> None:
+        """Initialize a command table without any built-in commands.
+        """
+        self.action_handler = action_handler
+        self._verbs = PrefixTable()
+
+    def register(self, handler: CommandHandler, *names: str, takes_arguments: bool = False) -> None:
+        """Register handler as the command run by each verb in names, so that aliases share one command.
+        """
+        command = Command(name=names[0], handler=handler, takes_arguments=takes_arguments)
+        for name in names:
+            self._verbs.add(name, command)
+
+    def dispatch(self, choice: str, context: Context) -> Optional[Location]:
+        """Run the command typed by the player, where choice is already stripped and lowercase.
+        Return the new location of the player if it has changed, and None otherwise.
+        """
+        verb, _, arguments = choice.partition(' ')
+        arguments = arguments.strip()
+
+        command = self._verbs.get(verb)
+        if command is not None and (command.takes_arguments or arguments == ''):
+            _count(command.name)
+            return command.handler(arguments, context)
+
+        action_table = context.location.action_table
+        action = action_table.get(choice)
+        if action is not None:
+            _count('action')
+            return self.action_handler(action, context)
+
+        command = self._verbs.complete(verb)
+        if command is not None and (command.takes_arguments or arguments == ''):
+            _count(command.name)
+            return command.handler(arguments, context)
+
+        ambiguous = command is None and self._verbs.has_prefix(verb)
+        action = None if ambiguous or len(choice) < MIN_ACTION_PREFIX else action_table.complete(choice)
+        if action is not None:
+            _count('action')
+            return self.action_handler(action, context)
+
+        _count('unknown')
+        context.console.show('Unknown command!')
+        return None
+
+
+def _count(name: str) -> None:
+    """Count a command with the given name in the metrics of the engine, if they are enabled.
+    """
+    if metrics.engine is not None:
+        metrics.engine.commands.labels(name).inc()
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={
+        'max-line-length': 120,
+        'extra-imports': ['src.metrics', 'src.actions.action', 'src.actions.context', 'src.game_data',
+                          'src.prefix_table'],
+    })
@@ -0,0 +1,243 @@
+"""Adventure Game 1: Storage for the location descriptions of a world.
+
+Descriptions are the bulk of a world's text, yet a player only ever reads a handful of them. Locations
+therefore keep integer keys into a DescriptionStore instead of the strings themselves. The default store
+simply keeps every string in memory, while MappedDescriptions writes them to a bundle file on disk and
+reads them back by offset through mmap, keeping only recently shown text in a bounded cache.
+
+MappedDescriptions still receives every text as a string while the pack is parsed, since segments are split
+into stripped lines before they are parsed, and no byte offsets into the source files survive that. It
+therefore does not speed up loading nor lower the peak memory of a load: it lowers the memory a world retains
+once loaded, which is what every long-running process holding a world pays for.
+
+CompressedDescriptions keeps every description in memory, but compressed with zlib using a preset dictionary
+trained on the texts of the pack, since descriptions are repetitive prose. Only recently shown text is kept
+decompressed, so a few microseconds of decompression buy a much smaller world.
+"""
+from __future__ import annotations
+import mmap
+import zlib
+from array import array
+from collections import Counter
+from itertools import islice
+from typing import BinaryIO, Iterable, Optional
+
+from src.lru import LRUCache
+
+DEFAULT_CACHE_SIZE = 64
+
+# zlib only looks back 32 KiB, so larger dictionaries are never used.
+MAX_DICTIONARY_SIZE = 32768
+DEFAULT_DICTIONARY_SIZE = 16384
+
+# The lengths, in words, of the phrases considered for compression dictionaries, and the number of texts
+# dictionaries are trained on.
+_PHRASE_LENGTHS = range(2, 9)
+_TRAINING_TEXTS = 4096
+
+
+class DescriptionStore:
+    """An append-only collection of description texts, addressed by the integer key returned when
+    the text is added.
+    """
+
+    def add(self, text: str) -> int:
+        """Store text and return the key used to fetch it.
+        """
+        raise NotImplementedError
+
+    def fetch(self, key: int) -> str:
+        """Return the text stored under key.
+        """
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """Release any resources held by the store.
+        """
+
+
+class InMemoryDescriptions(DescriptionStore):
+    """A store keeping every description in memory, which is the default for small worlds.
+
+    Instance Attributes:
+        - texts: The stored descriptions, indexed by their key.
+    """
+    texts: list[str]
+
+    def __init__(self) -> None:
+        """Initialize an empty in-memory store.
+        """
+        self.texts = []
+
+    def add(self, text: str) -> int:
+        self.texts.append(text)
+        return len(self.texts) - 1
+
+    def fetch(self, key: int) -> str:
+        return self.texts[key]
+
+
+class MappedDescriptions(DescriptionStore):
+    """A store writing descriptions to a bundle file, and loading them on first access by their
+    byte offsets through a read-only memory map.
+
+    Instance Attributes:
+        - cache: The cache of recently fetched descriptions.
+
+    Representation Invariants:
+        - len(self._spans) % 2 == 0
+    """
+    cache: LRUCache
+    _bundle: BinaryIO
+    _spans: array
+    _size: int
+    _map: Optional[mmap.mmap]
+
+    def __init__(self, path: Optional[str] = None, cache_size: int = DEFAULT_CACHE_SIZE) -> None:
+        """Initialize an empty store writing to the bundle file at path. If path is None, an anonymous
+        temporary file is used, which is removed once the store is closed.
+        """
+        # tempfile is slow to import, and only needed by lazy stores.
+        import tempfile
+
+        self.cache = LRUCache(cache_size)
+        self._bundle = tempfile.TemporaryFile() if path is None else open(path, 'w+b')
+        self._spans = array('Q')
+        self._size = 0
+        self._map = None
+
+    def add(self, text: str) -> int:
+        encoded = text.encode('utf-8')
+        self._bundle.write(encoded)
+        self._spans.append(self._size)
+        self._size += len(encoded)
+        self._spans.append(self._size)
+        return len(self._spans) // 2 - 1
+
+    def fetch(self, key: int) -> str:
+        text = self.cache.get(key)
+        if text is None:
+            start, end = self._spans[2 * key], self._spans[2 * key + 1]
+            text = self._view()[start:end].decode('utf-8')
+            self.cache.put(key, text)
+        return text
+
+    def close(self) -> None:
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._bundle.close()
+
+    def _view(self) -> mmap.mmap | bytes:
+        """Return a memory map covering every description added so far, remapping the bundle
+        if descriptions were added since the last mapping.
+        """
+        if self._size == 0:
+            # Empty files cannot be mapped.
+            return b''
+        if self._map is None or len(self._map) < self._size:
+            self._bundle.flush()
+            if self._map is not None:
+                self._map.close()
+            self._map = mmap.mmap(self._bundle.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._map
+
+
+class CompressedDescriptions(DescriptionStore):
+    """A store keeping every description in memory as raw deflate data compressed with a preset dictionary,
+    and decompressing descriptions on access.
+
+    Instance Attributes:
+        - dictionary: The preset dictionary the descriptions are compressed with. See train_dictionary.
+        - cache: The cache of recently fetched descriptions.
+
+    Representation Invariants:
+        - len(self.dictionary) <= MAX_DICTIONARY_SIZE
+        - len(self._offsets) >= 1
+    """
+    dictionary: bytes
+    cache: LRUCache
+    _data: bytearray
+    _offsets: array
+
+    def __init__(self, dictionary: bytes = b'', cache_size: int = DEFAULT_CACHE_SIZE) -> None:
+        """Initialize an empty store compressing with the given preset dictionary.
+        """
+        self.dictionary = dictionary[-MAX_DICTIONARY_SIZE:]
+        self.cache = LRUCache(cache_size)
+        self._data = bytearray()
+        self._offsets = array('Q', [0])
+
+    @classmethod
+    def trained_on(
+            cls,
+            texts: Iterable[str],
+            dictionary_size: int = DEFAULT_DICTIONARY_SIZE,
+            cache_size: int = DEFAULT_CACHE_SIZE
+    ) -> CompressedDescriptions:
+        """Return an empty store whose dictionary is trained on the given texts.
+        """
+        return cls(train_dictionary(texts, dictionary_size), cache_size)
+
+    def add(self, text: str) -> int:
+        compressor = zlib.compressobj(9, zlib.DEFLATED, -zlib.MAX_WBITS, zdict=self.dictionary)
+        self._data += compressor.compress(text.encode('utf-8')) + compressor.flush()
+        self._offsets.append(len(self._data))
+        return len(self._offsets) - 2
+
+    def fetch(self, key: int) -> str:
+        text = self.cache.get(key)
+        if text is None:
+            decompressor = zlib.decompressobj(-zlib.MAX_WBITS, zdict=self.dictionary)
+            compressed = memoryview(self._data)[self._offsets[key]:self._offsets[key + 1]]
+            text = decompressor.decompress(compressed).decode('utf-8')
+            self.cache.put(key, text)
+        return text
+
+    def compressed_size(self) -> int:
+        """Return the number of bytes taken by the compressed descriptions and the dictionary.
+        """
+        return len(self._data) + len(self.dictionary) + self._offsets.itemsize * len(self._offsets)
+
+
+def train_dictionary(texts: Iterable[str], size: int = DEFAULT_DICTIONARY_SIZE) -> bytes:
+    """Return a zlib preset dictionary of at most size bytes, made of the phrases repeated most across the
+    first few thousand texts.
+
+    Phrases are runs of whole words. Each is scored by the bytes it would save, which is its length times the
+    number of times it is repeated, and the best phrases are placed last, since zlib encodes matches closer to
+    the end of the dictionary more cheaply. The dictionary never exceeds an eighth of the texts, so that it
+    does not outweigh the space it saves on small packs.
+    """
+    counts = Counter()
+    total = 0
+    for text in islice(texts, _TRAINING_TEXTS):
+        total += len(text)
+        words = text.split()
+        for length in _PHRASE_LENGTHS:
+            for i in range(len(words) - length + 1):
+                counts[' '.join(words[i:i + length])] += 1
+
+    size = min(size, MAX_DICTIONARY_SIZE, total // 8)
+    scored = sorted(
+        ((len(phrase) * (count - 1), phrase) for phrase, count in counts.items() if count > 1),
+        reverse=True
+    )
+    chosen = []
+    used = 0
+    for _, phrase in scored:
+        # Phrases contained in a better phrase are already covered by it.
+        if used + len(phrase) + 1 > size or any(phrase in better for better in chosen[-64:]):
+            continue
+        chosen.append(phrase)
+        used += len(phrase) + 1
+    return ' '.join(reversed(chosen)).encode('utf-8')[-size:] if size > 0 else b''
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={
+        'max-line-length': 120,
+        'extra-imports': ['mmap', 'tempfile', 'zlib', 'array', 'collections', 'itertools', 'src.lru'],
+    })
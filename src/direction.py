@@ -3,8 +3,10 @@
 
 from __future__ import annotations
 from enum import Enum, auto
+from typing import Optional
 
 from src.errors import InvalidDirection
+from src.prefix_table import PrefixTable
 
 
 class Direction(Enum):
@@ -48,16 +50,27 @@ class Direction(Enum):
     def from_str(text: str) -> Direction:
         """Convert a given direction string into the enum representation.
         """
-        match text.lower():
-            case "north":
-                return Direction.NORTH
-            case "east":
-                return Direction.EAST
-            case "south":
-                return Direction.SOUTH
-            case "west":
-                return Direction.WEST
-        raise InvalidDirection(f"Invalid direction: {text}")
+        direction = _NAMES.get(text.lower())
+        if direction is None:
+            raise InvalidDirection(f"Invalid direction: {text}")
+        return direction
+
+    @staticmethod
+    def resolve(text: str) -> Optional[Direction]:
+        """Convert a direction typed by the player into the enum representation, returning None if
+        text is not a valid direction. Unlike from_str, this accepts the aliases n, e, s and w, as well
+        as any prefix of a direction, such as "ea".
+        """
+        return _DIRECTIONS.resolve(text.lower())
+
+
+# Every direction by its name, as written in data files.
+_NAMES = {str(direction): direction for direction in Direction}
+
+# Every direction by its name and its single letter alias, as typed by players.
+_DIRECTIONS = PrefixTable(
+    _NAMES | {"n": Direction.NORTH, "e": Direction.EAST, "s": Direction.SOUTH, "w": Direction.WEST}
+)
 
 
 if __name__ == '__main__':
@@ -65,5 +78,5 @@ if __name__ == '__main__':
 
     python_ta.check_all(config={
         'max-line-length': 120,
-        'extra-imports': ['src.errors', 'enum'],
+        'extra-imports': ['src.errors', 'src.prefix_table', 'enum'],
     })
@@ -24,6 +24,18 @@ class UnknownExecutionCondition(Exception):
     """
 
 
+class ActionScriptSyntaxError(Exception):
+    """Error raised when the control flow of an ActionScript action is malformed, such as
+    an else or end without a matching if, or an if without an end.
+    """
+
+
+class LinkError(Exception):
+    """Error raised when ActionScript instructions refer to locations, directions or items that do not
+    exist in the world they are loaded into.
+    """
+
+
 if __name__ == '__main__':
     import python_ta
 
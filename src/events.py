@@ -0,0 +1,239 @@
+"""Adventure Game 1: The structured gameplay event log.
+
+The engine reports what happens in a game (commands, moves, actions, points and item changes) by calling
+emit, which does nothing unless an event log was opened with open_log. Events are handed to a background
+writer thread through a bounded queue, and written as batches of newline-delimited JSON records, so the
+game loop never waits on the disk. If the writer falls behind and the queue fills up, the game either waits
+for room (the default, so that no event is lost) or drops the event, counting it in EventLog.dropped. Waiting
+is bounded by PUT_TIMEOUT, so a writer stuck on the disk never hangs the game.
+
+Errors writing the file, or events whose fields cannot be serialized, are counted in EventLog.failed, and the
+last one is kept in EventLog.error: the writer keeps draining the queue, so the game never stops on the log.
+Closing the log waits at most CLOSE_TIMEOUT seconds for the writer, and counts the events it did not write as
+dropped.
+
+The writer thread does not survive os.fork, so a forked process, such as a worker of src.supervisor, opens a log
+of its own appending to the same file. Each batch is appended with a single write, so the records of several
+processes never interleave.
+
+Each record holds the time of the event in seconds since the epoch as "t", its kind as "event", and the
+fields given to emit.
+"""
+from __future__ import annotations
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+from typing import Any, BinaryIO, Optional
+
+DEFAULT_MAX_PENDING = 8192
+DEFAULT_BATCH_SIZE = 512
+
+# The number of seconds emit waits for room in a full queue before dropping the event.
+PUT_TIMEOUT = 1.0
+
+# The number of seconds close waits for the writer thread to write the queued events.
+CLOSE_TIMEOUT = 5.0
+
+# Put on the queue to stop the writer thread.
+_STOP = None
+
+
+class EventLog:
+    """A log writing events to a file from a background thread.
+
+    Instance Attributes:
+        - path: The path of the file the events are appended to.
+        - batch_size: The maximum number of events written to the file at once.
+        - block_when_full: Whether emit waits for room when the queue is full, rather than dropping the event.
+        - written: The number of events written so far.
+        - dropped: The number of events dropped because the queue was full, or the writer thread had stopped.
+        - failed: The number of events that could not be serialized or written to the file.
+        - error: The last error serializing or writing an event, if any.
+
+    Representation Invariants:
+        - self.batch_size > 0
+    """
+    path: str
+    batch_size: int
+    block_when_full: bool
+    written: int
+    dropped: int
+    failed: int
+    error: Optional[Exception]
+    _queue: queue.Queue
+    _file: BinaryIO
+    _thread: threading.Thread
+    _lock: threading.Lock
+
+    def __init__(
+            self,
+            path: str,
+            max_pending: int = DEFAULT_MAX_PENDING,
+            batch_size: int = DEFAULT_BATCH_SIZE,
+            block_when_full: bool = True
+    ) -> None:
+        """Open the file at path for appending, and start the writer thread. At most max_pending events
+        wait in the queue to be written.
+        """
+        self.path = path
+        self.batch_size = batch_size
+        self.block_when_full = block_when_full
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.error = None
+        self._queue = queue.Queue(max_pending)
+        # Unbuffered, so that every batch is appended with a single write.
+        self._file = open(path, 'ab', buffering=0)
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._write_batches, name='event-log', daemon=True)
+        self._thread.start()
+
+    def emit(self, kind: str, fields: dict[str, Any]) -> None:
+        """Queue an event of the given kind with its fields, which must be serializable to JSON.
+        """
+        record = (time.time(), kind, fields)
+        try:
+            if self.block_when_full and self._thread.is_alive():
+                self._queue.put(record, timeout=PUT_TIMEOUT)
+            else:
+                self._queue.put_nowait(record)
+        except queue.Full:
+            self._drop(1)
+
+    def close(self) -> None:
+        """Write every queued event, then stop the writer thread and close the file. Events the writer does
+        not write within CLOSE_TIMEOUT seconds are counted as dropped.
+        """
+        if self._thread.is_alive():
+            try:
+                self._queue.put(_STOP, timeout=CLOSE_TIMEOUT)
+            except queue.Full:
+                self._drop(self._discard_pending())
+                try:
+                    self._queue.put_nowait(_STOP)
+                except queue.Full:
+                    pass
+            self._thread.join(CLOSE_TIMEOUT)
+        self._drop(self._discard_pending())
+        # A writer stuck writing keeps the file.
+        if not self._thread.is_alive():
+            self._file.close()
+
+    def reopened(self) -> EventLog:
+        """Return a new log appending to the same file with the same options, such as the log of a process
+        forked while this log was open.
+        """
+        return EventLog(self.path, self._queue.maxsize, self.batch_size, self.block_when_full)
+
+    def _drop(self, events: int) -> None:
+        """Count events dropped without being written.
+        """
+        with self._lock:
+            self.dropped += events
+
+    def _discard_pending(self) -> int:
+        """Remove every event from the queue, returning their number.
+        """
+        discarded = 0
+        while True:
+            try:
+                record = self._queue.get_nowait()
+            except queue.Empty:
+                return discarded
+            if record is not _STOP:
+                discarded += 1
+
+    def _write_batches(self) -> None:
+        """Write the queued events in batches until the log is closed. This runs in the writer thread.
+        """
+        pending = self._queue
+        while True:
+            batch = [pending.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(pending.get_nowait())
+                except queue.Empty:
+                    break
+
+            stopping = _STOP in batch
+            lines = []
+            for record in batch:
+                if record is not _STOP:
+                    timestamp, kind, fields = record
+                    try:
+                        lines.append(json.dumps({'t': round(timestamp, 6), 'event': kind, **fields},
+                                                separators=(',', ':')))
+                    except (TypeError, ValueError) as error:
+                        self._fail(error, 1)
+            if lines:
+                try:
+                    self._file.write(('\n'.join(lines) + '\n').encode('utf-8'))
+                    self.written += len(lines)
+                except OSError as error:
+                    self._fail(error, len(lines))
+            if stopping:
+                return
+
+    def _fail(self, error: Exception, events: int) -> None:
+        """Count events that could not be logged because of error.
+        """
+        self.failed += events
+        self.error = error
+
+
+# The log events are emitted to, if any.
+_log: Optional[EventLog] = None
+
+
+def open_log(path: str, **options: Any) -> EventLog:
+    """Start logging events to the file at path, with the options accepted by EventLog, replacing any
+    previously opened log. The log is closed when the interpreter exits.
+    """
+    global _log
+    close_log()
+    _log = EventLog(path, **options)
+    atexit.register(close_log)
+    return _log
+
+
+def close_log() -> None:
+    """Stop logging events, writing every event still queued.
+    """
+    global _log
+    if _log is not None:
+        log, _log = _log, None
+        log.close()
+
+
+def _reopen_log() -> None:
+    """Replace the log inherited by a forked process, whose writer thread did not survive the fork, with a log
+    of its own.
+    """
+    global _log
+    if _log is not None:
+        _log = _log.reopened()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reopen_log)
+
+
+def emit(kind: str, **fields: Any) -> None:
+    """Log an event of the given kind with its fields, if an event log is open.
+    """
+    if _log is not None:
+        _log.emit(kind, fields)
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={
+        'max-line-length': 120,
+        'extra-imports': ['atexit', 'json', 'os', 'queue', 'threading', 'time'],
+        'allowed-io': ['EventLog.__init__']
+    })
@@ -0,0 +1,74 @@
+"""Adventure Game 1: Incremental fingerprints of the mutable state of a game.
+
+A fingerprint is a 64-bit hash of the facts that hold in a game state, such as "the player is at x = 3" or
+"the Hammer lies at location 5". Each fact has a pseudo-random 64-bit key, and the fingerprint is the sum of
+the keys of every fact that holds, modulo 2 ** 64, in the manner of Zobrist hashing. The code changing the
+state adds and removes the keys of the facts it changes, so the fingerprint is kept up to date in constant
+time, and never has to be computed by walking the whole world. Sums are used rather than exclusive ors, so
+that facts holding more than once, such as two Hammers in an inventory, are counted.
+
+Keys are derived from the facts with BLAKE2, so that equal states have equal fingerprints in every process.
+"""
+from __future__ import annotations
+import hashlib
+from functools import lru_cache
+
+_MASK = (1 << 64) - 1
+
+
+@lru_cache(maxsize=65536)
+def fact_key(*fact: object) -> int:
+    """Return the 64-bit key of a fact, given as a tuple of strings, integers and other values whose repr
+    does not depend on the process, such as ('visited', 5).
+    """
+    return int.from_bytes(hashlib.blake2b(repr(fact).encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+class StateHash:
+    """A fingerprint of a set of facts, updated as facts start and stop holding.
+
+    Instance Attributes:
+        - value: The fingerprint of the facts that currently hold.
+
+    Representation Invariants:
+        - 0 <= self.value < 2 ** 64
+    """
+    __slots__ = ('value',)
+    value: int
+
+    def __init__(self, value: int = 0) -> None:
+        """Initialize the fingerprint of a set of facts, empty by default.
+        """
+        self.value = value
+
+    def add(self, *fact: object) -> None:
+        """Record that fact now holds.
+        """
+        self.value = (self.value + fact_key(*fact)) & _MASK
+
+    def remove(self, *fact: object) -> None:
+        """Record that fact, which held, no longer holds.
+        """
+        self.value = (self.value - fact_key(*fact)) & _MASK
+
+    def replace(self, name: str, old: object, new: object) -> None:
+        """Record that the value of the attribute with the given name changed from old to new.
+        """
+        if old != new:
+            self.value = (self.value - fact_key(name, old) + fact_key(name, new)) & _MASK
+
+
+def combine(*fingerprints: int) -> int:
+    """Return the fingerprint of the union of the facts of the given fingerprints, which must be disjoint,
+    such as the facts of a world and of a player.
+    """
+    return sum(fingerprints) & _MASK
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={
+        'max-line-length': 120,
+        'extra-imports': ['hashlib', 'functools'],
+    })
@@ -19,56 +19,103 @@ please consult our Course Syllabus.
 This file is Copyright (c) 2024 CSC111 Teaching Team
 """
 from __future__ import annotations
+import sys
 from typing import Optional, TextIO
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from weakref import WeakValueDictionary
 
 # from python_ta.contracts import check_contracts
 
-from src.errors import LocationError, MapSyntaxError
-from src.actions.action import Action, SingleAction, BackgroundAction
-from src.actions.parser import ActionScriptParser
+from src import events
+from src.errors import LocationError, MapSyntaxError, ActionScriptSyntaxError
+from src.descriptions import DescriptionStore, InMemoryDescriptions, CompressedDescriptions, DEFAULT_CACHE_SIZE
+from src.fingerprint import StateHash, combine
+from src.prefix_table import PrefixTable
+from src.actions.action import Action, SingleAction, BackgroundAction, TriggeredAction
+from src.actions.context import STANDARD_CONSOLE, Console
+from src.actions.instruction import PRINT_TEXT
+from src.actions.linker import link_actions
+from src.actions.triggers import TriggerIndex
+from src.actions.variables import VariableTable
 from src.direction import Direction
 
 
+# A parsed location segment, before it is linked to its items and actions: the id, position and points of
+# the location, its allowed movements, and its short and long descriptions.
+LocationRecord = tuple[int, tuple[int, int], int, set[Direction], str, str]
+
+
 class Item:
     """An item in our text adventure game world.
 
+    Items are never mutated, so items sharing the same name and location are shared
+    through a flyweight registry; use Item.intern rather than the constructor. The registry
+    only holds items as long as something else does, such as the world of a loaded pack.
+
     Instance Attributes:
         - name: The name of the item, which must be unique.
         - location_id: The location of the item. If the item is awarded via an action, this is None.
+        - key: The lowercase name of the item, interned, which identifies the item. See __repr__.
 
     Representation Invariants:
         - self.name != ''
         - self.location_id >= 0
+        - self.key == self.name.lower()
     """
+    __slots__ = ('name', 'location_id', 'key', '__weakref__')
     name: str
     location_id: Optional[int]
+    key: str
 
     # The only thing you must NOT change is the name of this class: Item.
     # All item objects in your game MUST be represented as an instance of this class.
     def __init__(self, name: str, location_id: Optional[int]) -> None:
         """Initialize a new item.
         """
-        self.name = name
+        self.name = sys.intern(name)
         self.location_id = location_id
+        self.key = sys.intern(name.lower())
+
+    @staticmethod
+    def intern(name: str, location_id: Optional[int]) -> Item:
+        """Return the shared item with the given name and location, creating it on first use.
+        """
+        key = (name, location_id)
+        item = _ITEM_REGISTRY.get(key)
+        if item is None:
+            item = _ITEM_REGISTRY.setdefault(key, Item(name=name, location_id=location_id))
+        return item
 
     def __str__(self) -> str:
         return self.name
 
     def __repr__(self) -> str:
         # The lowercase name of an item is the official representation (the id) of the item.
-        return self.name.lower()
+        return self.key
+
+    def __reduce__(self) -> tuple:
+        # Unpickled items are shared through the registry as well.
+        return Item.intern, (self.name, self.location_id)
 
 
-@dataclass
+# The flyweight registry of items, keyed by their name and location id. See Item.intern. Items are held weakly,
+# so that the items of a pack evicted from a PackRegistry are freed along with its world.
+_ITEM_REGISTRY: WeakValueDictionary[tuple[str, Optional[int]], Item] = WeakValueDictionary()
+
+
+@dataclass(slots=True)
 class LocationDescriptor:
     """A dataclass describing the position and description of a location.
 
+    The descriptions themselves are kept in the world's DescriptionStore, and are fetched through it
+    whenever short_description or long_description is read.
+
     Instance Attributes:
         - position: The position tuple of this location on the world map.
         - location_id: The unique number of the location.
-        - short_description: The short description of this location.
-        - long_description: The long description of this location.
+        - store: The store holding the descriptions of this location.
+        - short_key: The key of the short description in the store.
+        - long_key: The key of the long description in the store.
 
     Representation Invariants:
         - self.position[0] >= 0 and self.position[1] >= 0
@@ -78,13 +125,26 @@ class LocationDescriptor:
     """
     position: tuple[int, int]
     location_id: int
-    short_description: str
-    long_description: str
+    store: DescriptionStore = field(repr=False)
+    short_key: int
+    long_key: int
+
+    @property
+    def short_description(self) -> str:
+        """The short description of this location.
+        """
+        return self.store.fetch(self.short_key)
+
+    @property
+    def long_description(self) -> str:
+        """The long description of this location.
+        """
+        return self.store.fetch(self.long_key)
 
 
 # The only thing you must NOT change is the name of this class: Location.
 # All locations in your game MUST be represented as an instance of this class.
-@dataclass
+@dataclass(slots=True)
 class Location:
     """A location in our text adventure game world.
 
@@ -95,6 +155,7 @@ class Location:
         - points: The number of points received from visiting this location.
         - items: The list of available items for pickup in this location.
         - already_visited: Whether this location was visited before.
+        - action_table: The table resolving action names, in lowercase, to the actions of this location.
 
     Representation Invariants:
         - self.position[0] >= 0 and self.position[1] >= 0
@@ -105,6 +166,15 @@ class Location:
     points: int
     items: list[Item]
     already_visited: bool
+    action_table: PrefixTable = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        self.index_actions()
+
+    def index_actions(self) -> None:
+        """Rebuild the action table of this location. This must be called whenever self.actions changes.
+        """
+        self.action_table = PrefixTable({action.name.lower(): action for action in self.actions})
 
     def available_actions(self) -> list[Action]:
         """
@@ -114,29 +184,33 @@ class Location:
         """
         return self.actions
 
-    def visit(self, player: Player) -> None:
-        """Increment player's points and add points for visiting the location.
+    def visit(self, player: Player, console: Console = STANDARD_CONSOLE) -> None:
+        """Show the location to player on console, and add points for visiting the location.
         """
         if self.already_visited:
-            print(self.descriptor.short_description)
+            console.show(self.descriptor.short_description)
         else:
-            print(self.descriptor.long_description)
+            console.show(self.descriptor.long_description)
             player.points += self.points
             self.already_visited = True
+            if self.points != 0:
+                events.emit('points', change=self.points, points=player.points, location=self.descriptor.location_id)
 
     def get_action_by_string(self, action_string: str) -> Optional[Action]:
-        """Return the
+        """Return the action of this location named action_string, or whose name starts with action_string
+        if no other action of this location does. Return None if there is no such action.
         """
-        for action in self.available_actions():
-            if repr(action) == f"{action_string.lower()}:{self.descriptor.location_id}":
-                return action
-        return None
+        return self.action_table.resolve(action_string.lower())
 
 
 class Player:
     """
     A Player in the text adventure game.
 
+    The fingerprint of the state of the player is kept up to date as its position, steps, points, victory,
+    inventory and variables change. The inventory must therefore only be changed through add_item and remove_item,
+    and the variables through the set_var and add_var instructions.
+
     Instance Attributes:
         - x: The x position of the player.
         - y: The y position of the player.
@@ -145,37 +219,103 @@ class Player:
         - victory: Whether the player has won the game.
         - steps: Total steps the player has taken. This excludes "view" actions, such as inventory or inspect.
         - points: The total number of points the player has currently got.
+        - variables: The values of the ActionScript variables scoped to this player, indexed by slot.
+        - state_hash: The fingerprint of the state of the player. See src.fingerprint.
 
     Representation Invariants:
         - self.x >= 0 and self.y >= 0
         - self.steps >= 0
         - self.max_steps >= 0
     """
-    x: int
-    y: int
+    __slots__ = ('_x', '_y', 'max_steps', 'inventory', '_victory', '_steps', '_points', 'variables', 'state_hash')
     max_steps: int
     inventory: list[Item]
-    victory: bool
-    steps: int
-    points: int
+    variables: list[int]
+    state_hash: StateHash
 
     def __init__(self, x: int, y: int, max_steps: int) -> None:
         """
         Initializes a new Player at position (x, y).
         """
-        self.x = x
-        self.y = y
+        self._x = x
+        self._y = y
         self.max_steps = max_steps
         self.inventory = []
-        self.victory = False
-        self.steps = 0
-        self.points = 0
+        self._victory = False
+        self._steps = 0
+        self._points = 0
+        self.variables = []
+        self.state_hash = StateHash()
+        for name in ('x', 'y', 'victory', 'steps', 'points'):
+            self.state_hash.add(name, getattr(self, name))
+
+    @property
+    def x(self) -> int:
+        return self._x
+
+    @x.setter
+    def x(self, value: int) -> None:
+        self.state_hash.replace('x', self._x, value)
+        self._x = value
+
+    @property
+    def y(self) -> int:
+        return self._y
+
+    @y.setter
+    def y(self, value: int) -> None:
+        self.state_hash.replace('y', self._y, value)
+        self._y = value
+
+    @property
+    def victory(self) -> bool:
+        return self._victory
+
+    @victory.setter
+    def victory(self, value: bool) -> None:
+        self.state_hash.replace('victory', self._victory, value)
+        self._victory = value
+
+    @property
+    def steps(self) -> int:
+        return self._steps
+
+    @steps.setter
+    def steps(self, value: int) -> None:
+        self.state_hash.replace('steps', self._steps, value)
+        self._steps = value
+
+    @property
+    def points(self) -> int:
+        return self._points
+
+    @points.setter
+    def points(self, value: int) -> None:
+        self.state_hash.replace('points', self._points, value)
+        self._points = value
+
+    def add_item(self, item: Item) -> None:
+        """Add item to the inventory of the player.
+        """
+        self.inventory.append(item)
+        self.state_hash.add('holds', item.name, item.location_id)
+
+    def remove_item(self, item: Item) -> None:
+        """Remove item, which must be held by the player, from the inventory of the player.
+        """
+        self.inventory.remove(item)
+        self.state_hash.remove('holds', item.name, item.location_id)
 
     def create_add_item(self, name: str, location_id: Optional[int]) -> None:
-        """Create and add an item to the inventory of the player.
+        """Add the item with the given name and location to the inventory of the player.
+        The item is shared with every other holder of an item of the same name and location.
         """
-        item = Item(name=name, location_id=location_id)
-        self.inventory.append(item)
+        self.add_item(Item.intern(name=name, location_id=location_id))
+
+    def fingerprint(self) -> int:
+        """Return the 64-bit fingerprint of the state of the player, which is equal for players in equal states.
+        """
+        return self.state_hash.value
 
 
 class World:
@@ -185,6 +325,16 @@ class World:
         - locations: A mapping from the unique location number to the location class.
         - map: A nested list representation of this world's map.
         - background_actions: A list of background actions that are executed when the player moves.
+        - triggers: The index of the triggered actions, which are executed when their events happen.
+        - descriptions: The store holding the descriptions of every location.
+        - variables: The table assigning slots to the ActionScript variables of this world.
+        - global_store: The values of the world variables, indexed by slot.
+        - state_hash: The fingerprint of the changes players made to the locations and actions of this world,
+          which is kept up to date as long as locations are visited with visit, items are moved with add_item
+          and remove_item, directions are unlocked with unlock and world variables are set by the set_var and
+          add_var instructions. See src.fingerprint.
+        - changed: The ids of the locations whose state players changed, through the same methods or by completing
+          their actions, since it was last cleared. See src.sessions.
 
     Representation Invariants:
         - all(i >= 0 for i in self.locations)
@@ -192,26 +342,165 @@ class World:
     locations: dict[int, Location]
     map: list[list[int]]
     background_actions: list[BackgroundAction]
+    triggers: TriggerIndex
+    descriptions: DescriptionStore
+    variables: VariableTable
+    global_store: list[int]
+    state_hash: StateHash
+    changed: set[int]
 
     def __init__(
             self,
             map_data: TextIO,
             location_data: TextIO,
             items_data: TextIO,
-            actions_data: TextIO
+            actions_data: TextIO,
+            descriptions: Optional[DescriptionStore] = None,
+            workers: int = 1
     ) -> None:
         """
         Initialize a new World for a text adventure game, based on the data in the given open files.
 
         - location_data: name of text file containing location data (format left up to you)
         - items_data: name of text file containing item data (format left up to you)
+        - descriptions: the store the location descriptions are kept in. If None, they are kept in memory.
+        - workers: the number of processes parsing the location and action segments. See src.parallel_loading.
+        """
+        self._populate(
+            map_data,
+            World.split_segments(location_data),
+            items_data,
+            World.split_segments(actions_data),
+            descriptions,
+            workers
+        )
+
+    @classmethod
+    def from_segments(
+            cls,
+            map_data: TextIO,
+            location_segments: list[list[str]],
+            items_data: TextIO,
+            action_segments: list[list[str]],
+            descriptions: Optional[DescriptionStore] = None,
+            workers: int = 1
+    ) -> World:
+        """Return a new World built from location and action segments that were already split, such as the
+        segments read from a content archive (see src.archive). The other arguments are as in __init__.
+        """
+        world = cls.__new__(cls)
+        world._populate(map_data, location_segments, items_data, action_segments, descriptions, workers)
+        return world
+
+    def _populate(
+            self,
+            map_data: TextIO,
+            location_segments: list[list[str]],
+            items_data: TextIO,
+            action_segments: list[list[str]],
+            descriptions: Optional[DescriptionStore],
+            workers: int
+    ) -> None:
+        """Load the map, items, actions and locations of this world, parsing the segments in workers processes.
         """
+        self.descriptions = InMemoryDescriptions() if descriptions is None else descriptions
+        self.variables = VariableTable()
+        self.global_store = []
+        self.state_hash = StateHash()
+        self.changed = set()
         world_map = self.load_map(map_data)
         items = self.load_items(items_data)
-        actions = self.load_actions(actions_data)
-        self.locations = self.load_locations(location_data, items, actions, world_map)
+        if workers > 1:
+            # Only imported when parsing in parallel, since it imports multiprocessing.
+            from src.parallel_loading import parse_segments
+            records, actions = parse_segments(location_segments, action_segments, world_map, self.variables, workers)
+        else:
+            records = None
+            actions = self.load_actions(action_segments, self.variables)
+        self.locations = self.load_locations(location_segments, items, actions, world_map, records)
+        link_actions(actions, self.locations, items)
         self.map = world_map
         self.background_actions = [action for action in actions if isinstance(action, BackgroundAction)]
+        self.triggers = TriggerIndex([action for action in actions if isinstance(action, TriggeredAction)])
+
+    def use_descriptions(self, descriptions: DescriptionStore) -> None:
+        """Move the descriptions of every location into the given store, which becomes the store of this world.
+        """
+        for location in self.locations.values():
+            descriptor = location.descriptor
+            short_description, long_description = descriptor.short_description, descriptor.long_description
+            descriptor.store = descriptions
+            descriptor.short_key = descriptions.add(short_description)
+            descriptor.long_key = descriptions.add(long_description)
+        self.descriptions = descriptions
+
+    def visit(self, location: Location, player: Player, console: Console = STANDARD_CONSOLE) -> None:
+        """Show location to player on console, as player has just arrived there, awarding its points on the first
+        visit.
+        """
+        if not location.already_visited:
+            self.state_hash.add('visited', location.descriptor.location_id)
+            self.changed.add(location.descriptor.location_id)
+        location.visit(player, console)
+
+    def add_item(self, location: Location, item: Item) -> None:
+        """Leave item at location.
+        """
+        location.items.append(item)
+        self.state_hash.add('lies', location.descriptor.location_id, item.name, item.location_id)
+        self.changed.add(location.descriptor.location_id)
+
+    def remove_item(self, location: Location, item: Item) -> None:
+        """Remove item, which must lie at location, from location.
+        """
+        location.items.remove(item)
+        self.state_hash.remove('lies', location.descriptor.location_id, item.name, item.location_id)
+        self.changed.add(location.descriptor.location_id)
+
+    def unlock(self, location: Location, direction: Direction) -> None:
+        """Allow players to move from location in the given direction.
+        """
+        if direction not in location.allowed_movements:
+            location.allowed_movements.add(direction)
+            self.state_hash.add('unlocked', location.descriptor.location_id, str(direction))
+            self.changed.add(location.descriptor.location_id)
+
+    def fingerprint(self, player: Optional[Player] = None) -> int:
+        """Return the 64-bit fingerprint of the changes players made to this world, along with the state of
+        player if it is given. Worlds loaded from the same pack, in equal states, have equal fingerprints.
+        """
+        if player is None:
+            return self.state_hash.value
+        return combine(self.state_hash.value, player.fingerprint())
+
+    def compress_texts(self, cache_size: int = DEFAULT_CACHE_SIZE) -> CompressedDescriptions:
+        """Move the descriptions of every location and the texts of every print instruction into a store
+        compressing them with a dictionary trained on them, which becomes the store of this world. At most
+        cache_size texts are kept decompressed. Return the new store.
+        """
+        messages = [
+            instruction for action in self.all_actions() for instruction in action.instructions
+            if instruction.operation == 'print'
+        ]
+        message_texts = [' '.join(str(argument) for argument in message.arguments) for message in messages]
+        descriptions = [
+            text for location in self.locations.values()
+            for text in (location.descriptor.short_description, location.descriptor.long_description)
+        ]
+
+        store = CompressedDescriptions.trained_on(descriptions + message_texts, cache_size=cache_size)
+        self.use_descriptions(store)
+        for message, text in zip(messages, message_texts):
+            message.operation = PRINT_TEXT
+            message.arguments = [store.add(text)]
+        return store
+
+    def all_actions(self) -> list[Action]:
+        """Return every action of this world, whether it belongs to a location, runs in the background or is
+        triggered by events.
+        """
+        actions = [action for location in self.locations.values() for action in location.actions]
+        return actions + self.background_actions + self.triggers.actions()
 
     # NOTE: The method below is REQUIRED. Complete it exactly as specified.
     # noinspection PyMethodMayBeStatic
@@ -248,6 +537,36 @@ class World:
             return None
         return self.locations[self.map[y][x]]
 
+    def location_by_id(self, location_id: int) -> Location:
+        """Return the location with the given id. Raise KeyError if there is no such location.
+        """
+        return self.locations[location_id]
+
+    def find_location(self, location_id: int) -> tuple[int, int]:
+        """Return the position of the location with the given id on the map of this world.
+        """
+        return World.get_location_position(location_id, self.map)
+
+    # ================================
+    # ======== Segment Parser ========
+    # ================================
+
+    @staticmethod
+    def split_segments(data: TextIO) -> list[list[str]]:
+        """Split the lines of data into segments, each segment being the stripped, non-empty lines
+        preceding an END line. END itself is not included in the segment.
+        """
+        segments = []
+        current_segment = []
+        for line in data.readlines():
+            line = line.strip()
+            if line == "END":
+                segments.append(current_segment)
+                current_segment = []
+            elif line != '':
+                current_segment.append(line)
+        return segments
+
     # =============================
     # ======== Item Parser ========
     # =============================
@@ -270,9 +589,9 @@ class World:
                 location_id = int(split[0])
                 name = ' '.join(split[1:])
                 if location_id != -1:
-                    items.append(Item(name=name, location_id=location_id))
+                    items.append(Item.intern(name=name, location_id=location_id))
                 else:
-                    items.append(Item(name=name, location_id=None))
+                    items.append(Item.intern(name=name, location_id=None))
         return items
 
     # ==================================
@@ -280,23 +599,14 @@ class World:
     # ==================================
 
     @staticmethod
-    def load_actions(actions_data: TextIO) -> list[Action]:
-        """Parse the actions_data file, returning a list of actions.
+    def load_actions(action_segments: list[list[str]], variables: VariableTable) -> list[Action]:
+        """Parse the segments of the actions file, returning a list of actions. The variables used by the actions
+        are assigned their slots in variables.
         """
-        actions = []
-        lines = actions_data.readlines()
-        current_segment = []
-        for line in lines:
-            line = line.strip()
-            if line == "END":
-                actions.append(World._parse_action_segment(current_segment))
-                current_segment = []
-            elif line != '':
-                current_segment.append(line)
-        return actions
+        return [World.parse_action_segment(segment, variables) for segment in action_segments]
 
     @staticmethod
-    def _parse_action_segment(segment: list[str]) -> Action:
+    def parse_action_segment(segment: list[str], variables: VariableTable) -> Action:
         """Parse an action segment and return it as an instance of Action.
 
         An action segment is any segment of actions.txt, from which the action can be constructed.
@@ -307,12 +617,25 @@ class World:
 
         where <ActionScript Code> may span across multiple lines, until END. If <Action Location ID> is
         -1, it means that the action is a background action. Note that END is not included in the action segment.
+        The variables used by the action are assigned their slots in variables.
+
+        Background actions declaring triggers (see src.actions.triggers) are triggered actions, which are only
+        executed when their events happen.
         """
+        # The parser is imported on first use, so that worlds loaded from compiled bundles never import it.
+        from src.actions.parser import ActionScriptParser
+
         split = segment[0].split(' ')
         action_location_id = int(split[-1])
         name = ' '.join(split[:-1])
-        instructions = ActionScriptParser(segment[1:]).compile()
-
+        parser = ActionScriptParser(segment[1:], variables)
+        instructions = parser.compile()
+        triggers = parser.parse_triggers()
+
+        if len(triggers) != 0:
+            if action_location_id != -1:
+                raise ActionScriptSyntaxError(f"Only background actions may declare triggers: {segment[0]}")
+            return TriggeredAction(name=name, instructions=instructions, triggers=triggers)
         if action_location_id == -1:
             return BackgroundAction(name=name, instructions=instructions)
         return SingleAction(name=name, action_location_id=action_location_id, instructions=instructions)
@@ -324,34 +647,54 @@ class World:
     # noinspection PyMethodMayBeStatic
     def load_locations(
             self,
-            location_data: TextIO,
+            location_segments: list[list[str]],
             items: list[Item],
             actions: list[Action],
-            world_map: list[list[int]]
+            world_map: list[list[int]],
+            records: Optional[list[LocationRecord]] = None
     ) -> dict[int, Location]:
-        """Return a mapping from location id to the location instance while reading and
-         building locations from the location data file.
+        """Return a mapping from location id to the location instance while building locations
+         from the segments of the location data file. If the segments were already parsed, records
+         holds their records, in order.
         """
+        # Items, actions and positions are grouped by location once, so that maps with many locations
+        # are not scanned again for every location.
+        positions = {
+            location_id: (x, y) for y, row in enumerate(world_map) for x, location_id in enumerate(row)
+            if location_id != -1
+        }
+        items_by_location = {}
+        for item in items:
+            items_by_location.setdefault(item.location_id, []).append(item)
+        actions_by_location = {}
+        for action in actions:
+            if isinstance(action, SingleAction):
+                actions_by_location.setdefault(action.action_location_id, []).append(action)
+
+        if records is None:
+            records = [World.parse_location_record(segment, world_map, positions) for segment in location_segments]
+
         locations = {}
-        lines = location_data.readlines()
-        current_segment = []
-        for line in lines:
-            line = line.strip()
-            if line == "END":
-                location = World._parse_location_segment(current_segment, items, actions, world_map)
-                # if location.descriptor.location_id != -1:
-                locations[location.descriptor.location_id] = location
-                current_segment = []
-            elif line != '':
-                current_segment.append(line)
+        for record in records:
+            location_id = record[0]
+            location = World.build_location(
+                record,
+                items_by_location.get(location_id, []),
+                actions_by_location.get(location_id, []),
+                self.descriptions
+            )
+            # if location.descriptor.location_id != -1:
+            locations[location.descriptor.location_id] = location
         return locations
 
     @staticmethod
-    def _parse_location_segment(
+    def parse_location_segment(
             segment: list[str],
             items: list[Item],
             actions: list[Action],
             world_map: list[list[int]],
+            descriptions: DescriptionStore,
+            positions: Optional[dict[int, tuple[int, int]]] = None
     ) -> Location:
         """Parse any location segment into a Location instance.
 
@@ -371,23 +714,60 @@ class World:
         directions, locking from one direction gives us more flexibility. Maps could be enhanced with certain
         blocks in which players are forced to move to a specific direction. To lock an entire room, one must either
         set it to -1 on the map, or lock other rooms leading there.
+
+        The short and long descriptions are added to descriptions, and the location only keeps their keys.
+        positions maps location ids to their position on world_map, which is searched if it is None.
+        """
+        return World.build_location(
+            World.parse_location_record(segment, world_map, positions),
+            items,
+            actions,
+            descriptions
+        )
+
+    @staticmethod
+    def parse_location_record(
+            segment: list[str],
+            world_map: list[list[int]],
+            positions: Optional[dict[int, tuple[int, int]]] = None
+    ) -> LocationRecord:
+        """Parse a location segment, as described by parse_location_segment, into a record holding everything
+        but the items and actions of the location.
         """
         must_be_location, location_id = segment[0].split(' ')
         if must_be_location != "LOCATION":
             raise MapSyntaxError("Location declarations must start with LOCATION")
 
         location_id = int(location_id)
-        position = World.get_location_position(location_id, world_map)
+        if positions is None:
+            position = World.get_location_position(location_id, world_map)
+        elif location_id in positions:
+            position = positions[location_id]
+        else:
+            raise LocationError("Unable to find location in map")
         allowed_movements = World._get_free_directions(position, world_map)
 
         points_received = int(segment[1])
         short_description, long_description = World._parse_middle_segment(segment[2:], allowed_movements)
+        return location_id, position, points_received, allowed_movements, short_description, long_description
 
+    @staticmethod
+    def build_location(
+            record: LocationRecord,
+            items: list[Item],
+            actions: list[Action],
+            descriptions: DescriptionStore
+    ) -> Location:
+        """Return the location of a parsed location record, with the items and actions of the given ones
+        belonging to it. Its descriptions are added to descriptions.
+        """
+        location_id, position, points_received, allowed_movements, short_description, long_description = record
         descriptor = LocationDescriptor(
             position=position,
             location_id=location_id,
-            short_description=short_description,
-            long_description=long_description
+            store=descriptions,
+            short_key=descriptions.add(short_description),
+            long_key=descriptions.add(long_description)
         )
 
         return Location(
@@ -465,6 +845,8 @@ if __name__ == '__main__':
 
     python_ta.check_all(config={
         'max-line-length': 120,
-        'extra-imports': ['src.errors', 'src.actions.action', 'src.actions.parser', 'src.direction', 'src.actions'],
-        'allowed-io': ['Location.visit']
+        'extra-imports': ['src.events', 'src.errors', 'src.fingerprint', 'src.actions.action',
+                          'src.actions.instruction', 'src.actions.triggers', 'src.actions.parser', 'src.direction',
+                          'src.actions.variables', 'src.actions.linker', 'src.descriptions', 'src.prefix_table',
+                          'src.actions.context', 'weakref'],
     })
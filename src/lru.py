@@ -0,0 +1,96 @@
+"""Adventure Game 1: A small bounded least-recently-used cache shared by the engine's lazy stores.
+"""
+from __future__ import annotations
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+
+class LRUCache:
+    """A mapping that holds at most `capacity` entries, discarding the least recently used entry
+    whenever a new entry would exceed the capacity.
+
+    Instance Attributes:
+        - capacity: The maximum number of entries kept in the cache.
+        - hits: The number of lookups that found their key.
+        - misses: The number of lookups that did not find their key.
+        - on_evict: A function called with the key and value of every entry discarded to make room, if any.
+
+    Representation Invariants:
+        - self.capacity >= 0
+        - len(self) <= self.capacity
+    """
+    capacity: int
+    hits: int
+    misses: int
+    on_evict: Optional[Callable[[Hashable, Any], None]]
+    _entries: OrderedDict[Hashable, Any]
+
+    def __init__(self, capacity: int, on_evict: Optional[Callable[[Hashable, Any], None]] = None) -> None:
+        """Initialize an empty cache holding at most capacity entries.
+        """
+        self.capacity = capacity
+        self.on_evict = on_evict
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def get(self, key: Hashable, default: Optional[Any] = None) -> Optional[Any]:
+        """Return the value stored for key, marking it as the most recently used, or default if it is absent.
+        """
+        entries = self._entries
+        if key in entries:
+            entries.move_to_end(key)
+            self.hits += 1
+            return entries[key]
+        self.misses += 1
+        return default
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """Store value for key as the most recently used entry, evicting the oldest entry if needed.
+        """
+        if self.capacity <= 0:
+            return
+        entries = self._entries
+        entries[key] = value
+        entries.move_to_end(key)
+        if len(entries) > self.capacity:
+            evicted_key, evicted = entries.popitem(last=False)
+            if self.on_evict is not None:
+                self.on_evict(evicted_key, evicted)
+
+    def peek(self, key: Hashable, default: Optional[Any] = None) -> Optional[Any]:
+        """Return the value stored for key, or default if it is absent, without marking it as used or counting
+        the lookup.
+        """
+        return self._entries.get(key, default)
+
+    def values(self) -> list[Any]:
+        """Return the values in the cache, from the least to the most recently used.
+        """
+        return list(self._entries.values())
+
+    def pop(self, key: Hashable, default: Optional[Any] = None) -> Optional[Any]:
+        """Remove the entry stored for key and return its value, or default if it is absent, without
+        calling on_evict.
+        """
+        return self._entries.pop(key, default)
+
+    def clear(self) -> None:
+        """Remove every entry from the cache.
+        """
+        self._entries.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={
+        'max-line-length': 120,
+        'extra-imports': ['collections'],
+    })
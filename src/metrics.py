@@ -0,0 +1,440 @@
+"""Adventure Game 1: Operational metrics of the engine, exposed in the Prometheus text format.
+
+A MetricsRegistry holds counters, gauges and histograms with fixed buckets, optionally split by labels.
+Counters and histograms accumulate into cells owned by the thread updating them, so that updates never take
+a lock and never race, and are only summed when the metrics are read. The cell of a thread is folded into a
+shared total once the thread exits, so short-lived threads do not grow the metrics. Gauges hold a single value.
+
+The engine reports its metrics to the EngineMetrics created by enable, and does nothing unless metrics were
+enabled, in the same way as the event log (see src.events): the turns played by the main loop and the
+commands they ran, the actions executed and whether they succeeded, the time spent running background
+actions on every arrival, and the worlds loaded. The metrics can be read in process with
+MetricsRegistry.snapshot, or scraped over HTTP from the server started by serve, at /metrics.
+"""
+from __future__ import annotations
+import threading
+import weakref
+from bisect import bisect_left
+from typing import TYPE_CHECKING, Any, Callable, Optional
+
+if TYPE_CHECKING:
+    from http.server import ThreadingHTTPServer
+    from src.game_data import World
+
+# The upper bounds of the buckets of latency histograms, in seconds.
+LATENCY_BUCKETS = (1e-6, 5e-6, 1e-5, 5e-5, 1e-4, 5e-4, 1e-3, 5e-3, 1e-2, 5e-2, 0.1, 0.5, 1.0, 5.0, 10.0)
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class _CellOwner:
+    """The token of the thread owning a cell, dropped along with the other thread-local data of the thread
+    when it exits.
+    """
+    __slots__ = ('__weakref__',)
+
+
+class _ThreadCells:
+    """Accumulators of a metric, one per live thread updating it, and the total of the threads that exited.
+    Each cell is only written by its own thread.
+    """
+    _size: int
+    _local: threading.local
+    _cells: list[list[float]]
+    _retired: list[float]
+    _lock: threading.Lock
+
+    def __init__(self, size: int) -> None:
+        """Initialize accumulators of size values, without any cell yet.
+        """
+        self._size = size
+        self._local = threading.local()
+        self._cells = []
+        self._retired = [0] * size
+        self._lock = threading.Lock()
+
+    def cell(self) -> list[float]:
+        """Return the cell of the calling thread, creating it on its first update.
+        """
+        try:
+            return self._local.cell
+        except AttributeError:
+            cell = [0] * self._size
+            owner = _CellOwner()
+            with self._lock:
+                self._cells.append(cell)
+            weakref.finalize(owner, self._retire, cell)
+            self._local.owner = owner
+            self._local.cell = cell
+            return cell
+
+    def totals(self) -> list[float]:
+        """Return the sums of the cells of every thread.
+        """
+        with self._lock:
+            return [self._retired[i] + sum(cell[i] for cell in self._cells) for i in range(self._size)]
+
+    def _retire(self, cell: list[float]) -> None:
+        """Fold the cell of a thread that exited into the total of the threads that exited.
+        """
+        with self._lock:
+            self._cells = [other for other in self._cells if other is not cell]
+            for i in range(self._size):
+                self._retired[i] += cell[i]
+
+
+class Counter:
+    """A value that only increases, such as the number of turns played.
+    """
+    __slots__ = ('_cells',)
+    _cells: _ThreadCells
+
+    def __init__(self) -> None:
+        """Initialize a counter at 0.
+        """
+        self._cells = _ThreadCells(1)
+
+    def inc(self, amount: float = 1) -> None:
+        """Increase the counter by amount, which must not be negative.
+        """
+        self._cells.cell()[0] += amount
+
+    def value(self) -> float:
+        """Return the value of the counter.
+        """
+        return self._cells.totals()[0]
+
+
+class Gauge:
+    """A value that may go up and down, such as the number of loaded worlds, either set directly or read
+    from a function whenever the metrics are read.
+    """
+    __slots__ = ('_value', '_function', '_lock')
+    _value: float
+    _function: Optional[Callable[[], float]]
+    _lock: threading.Lock
+
+    def __init__(self) -> None:
+        """Initialize a gauge at 0, set directly.
+        """
+        self._value = 0
+        self._function = None
+        self._lock = threading.Lock()
+
+    def set(self, value: float) -> None:
+        """Set the value of the gauge.
+        """
+        self._value = value
+
+    def inc(self, amount: float = 1) -> None:
+        """Increase the value of the gauge by amount, which may be negative.
+        """
+        with self._lock:
+            self._value += amount
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        """Read the value of the gauge from function whenever the metrics are read.
+        """
+        self._function = function
+
+    def value(self) -> float:
+        """Return the value of the gauge.
+        """
+        return self._function() if self._function is not None else self._value
+
+
+class Histogram:
+    """The distribution of observed values, such as latencies, counted in buckets with fixed upper bounds.
+    """
+    __slots__ = ('buckets', '_cells')
+    buckets: tuple[float, ...]
+    _cells: _ThreadCells
+
+    def __init__(self, buckets: tuple[float, ...]) -> None:
+        """Initialize a histogram without observations, counting values in buckets with the given upper bounds.
+        """
+        self.buckets = buckets
+        # A count for each bucket, one for values above every bucket, then the sum of the values.
+        self._cells = _ThreadCells(len(buckets) + 2)
+
+    def observe(self, value: float) -> None:
+        """Count value in the first bucket whose upper bound is at least value.
+        """
+        cell = self._cells.cell()
+        cell[bisect_left(self.buckets, value)] += 1
+        cell[-1] += value
+
+    def value(self) -> dict[str, Any]:
+        """Return the cumulative count of each bucket, by upper bound, along with the sum and number of the
+        observed values.
+        """
+        totals = self._cells.totals()
+        cumulative, count = [], 0
+        for bucket_count in totals[:-1]:
+            count += bucket_count
+            cumulative.append(count)
+        return {'buckets': list(self.buckets) + [float('inf')], 'counts': cumulative, 'sum': totals[-1],
+                'count': count}
+
+
+class MetricFamily:
+    """A metric split by labels, such as the number of commands by command. Every combination of label values
+    has its own metric.
+
+    Instance Attributes:
+        - name: The name of the metric.
+        - help: The description of the metric.
+        - kind: The Prometheus type of the metric, counter, gauge or histogram.
+        - label_names: The names of the labels of the metric, which may be empty.
+    """
+    name: str
+    help: str
+    kind: str
+    label_names: tuple[str, ...]
+    _create: Callable[[], Any]
+    _children: dict[tuple[str, ...], Any]
+    _lock: threading.Lock
+
+    def __init__(self, name: str, help_text: str, kind: str, label_names: tuple[str, ...],
+                 create: Callable[[], Any]) -> None:
+        """Initialize a family without any metric, creating the metric of new label values with create.
+        """
+        self.name = name
+        self.help = help_text
+        self.kind = kind
+        self.label_names = label_names
+        self._create = create
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values: str) -> Any:
+        """Return the metric of the given label values, in the order of label_names.
+        """
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.get(values)
+                if child is None:
+                    child = self._children[values] = self._create()
+        return child
+
+    def samples(self) -> list[tuple[dict[str, str], Any]]:
+        """Return the labels and value of every metric of the family.
+        """
+        with self._lock:
+            children = list(self._children.items())
+        return [(dict(zip(self.label_names, values)), child.value()) for values, child in children]
+
+
+class MetricsRegistry:
+    """The metrics of a process, by name.
+    """
+    _families: dict[str, MetricFamily]
+    _lock: threading.Lock
+
+    def __init__(self) -> None:
+        """Initialize a registry without any metric.
+        """
+        self._families = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, help_text: str, labels: tuple[str, ...] = ()) -> Any:
+        """Register a counter, returning it, or its family if it has labels.
+        """
+        return self._register(MetricFamily(name, help_text, 'counter', labels, Counter))
+
+    def gauge(self, name: str, help_text: str, labels: tuple[str, ...] = ()) -> Any:
+        """Register a gauge, returning it, or its family if it has labels.
+        """
+        return self._register(MetricFamily(name, help_text, 'gauge', labels, Gauge))
+
+    def histogram(self, name: str, help_text: str, buckets: tuple[float, ...] = LATENCY_BUCKETS,
+                  labels: tuple[str, ...] = ()) -> Any:
+        """Register a histogram with buckets of the given upper bounds, in increasing order, returning it, or
+        its family if it has labels.
+        """
+        return self._register(MetricFamily(name, help_text, 'histogram', labels, lambda: Histogram(buckets)))
+
+    def snapshot(self) -> dict[str, dict[str, Any]]:
+        """Return the current value of every metric, by name, as an object serializable to JSON.
+        Histogram buckets are keyed by their upper bound, the last being infinite.
+        """
+        with self._lock:
+            families = list(self._families.values())
+        return {
+            family.name: {
+                'type': family.kind,
+                'help': family.help,
+                'samples': [{'labels': labels, 'value': value} for labels, value in family.samples()],
+            }
+            for family in families
+        }
+
+    def to_prometheus(self) -> str:
+        """Return the current value of every metric in the Prometheus text exposition format.
+        """
+        lines = []
+        for name, family in self.snapshot().items():
+            lines.append(f"# HELP {name} {family['help']}")
+            lines.append(f"# TYPE {name} {family['type']}")
+            for sample in family['samples']:
+                labels, value = sample['labels'], sample['value']
+                if family['type'] != 'histogram':
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+                    continue
+                for bound, count in zip(value['buckets'], value['counts']):
+                    bucket_labels = {**labels, 'le': _format_value(bound)}
+                    lines.append(f"{name}_bucket{_format_labels(bucket_labels)} {_format_value(count)}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(value['sum'])}")
+                lines.append(f"{name}_count{_format_labels(labels)} {_format_value(value['count'])}")
+        return '\n'.join(lines) + '\n'
+
+    def _register(self, family: MetricFamily) -> Any:
+        """Register family, returning it, or its only metric if it has no labels.
+        Raise ValueError if a metric of the same name is registered.
+        """
+        with self._lock:
+            if family.name in self._families:
+                raise ValueError(f"Metric {family.name} is already registered")
+            self._families[family.name] = family
+        return family.labels() if len(family.label_names) == 0 else family
+
+
+class EngineMetrics:
+    """The metrics the engine reports to.
+
+    Instance Attributes:
+        - registry: The registry holding the metrics.
+        - commands: The number of commands played, by the built-in command they ran, "action" or "unknown".
+        - turn_seconds: The time taken by each turn played, from the command to the arrival at the new location.
+        - actions: The number of actions executed, by kind of action and outcome, success or failure.
+        - background_seconds: The time taken by the background actions run on each arrival at a location.
+        - world_loads: The number of worlds loaded, by format of pack.
+        - world_load_seconds: The time taken to load each world.
+        - worlds: The number of loaded worlds still in use.
+    """
+    registry: MetricsRegistry
+    commands: MetricFamily
+    turn_seconds: Histogram
+    actions: MetricFamily
+    background_seconds: Histogram
+    world_loads: MetricFamily
+    world_load_seconds: Histogram
+    worlds: Gauge
+    _live_worlds: weakref.WeakSet
+
+    def __init__(self, registry: MetricsRegistry) -> None:
+        """Initialize the metrics of the engine, registering them in registry.
+        """
+        self.registry = registry
+        self.commands = registry.counter(
+            'adventure_commands_total', "Commands played, by command.", labels=('command',))
+        self.turn_seconds = registry.histogram(
+            'adventure_turn_seconds', "Time taken by each turn played, including the arrival at the new location.")
+        self.actions = registry.counter(
+            'adventure_actions_total', "Actions executed, by kind and outcome.", labels=('kind', 'outcome'))
+        self.background_seconds = registry.histogram(
+            'adventure_background_seconds', "Time taken by the background actions run on each arrival.")
+        self.world_loads = registry.counter(
+            'adventure_world_loads_total', "Worlds loaded, by format of pack.", labels=('format',))
+        self.world_load_seconds = registry.histogram(
+            'adventure_world_load_seconds', "Time taken to load each world.")
+        self.worlds = registry.gauge('adventure_worlds', "Loaded worlds still in use.")
+        self._live_worlds = weakref.WeakSet()
+        self.worlds.set_function(lambda: len(self._live_worlds))
+
+    def action_executed(self, kind: str, success: bool) -> None:
+        """Count the execution of an action of the given kind.
+        """
+        self.actions.labels(kind, 'success' if success else 'failure').inc()
+
+    def world_loaded(self, world: World, pack_format: str, seconds: float) -> None:
+        """Count a world loaded from a pack of the given format in the given number of seconds.
+        """
+        self.world_loads.labels(pack_format).inc()
+        self.world_load_seconds.observe(seconds)
+        self._live_worlds.add(world)
+
+
+# The metrics the engine reports to, if metrics are enabled.
+engine: Optional[EngineMetrics] = None
+
+
+def enable(registry: Optional[MetricsRegistry] = None) -> EngineMetrics:
+    """Start reporting the metrics of the engine to registry, or to a new registry if it is None, unless
+    metrics are already enabled. Return the metrics of the engine.
+    """
+    global engine
+    if engine is None:
+        engine = EngineMetrics(registry if registry is not None else MetricsRegistry())
+    return engine
+
+
+def disable() -> None:
+    """Stop reporting the metrics of the engine.
+    """
+    global engine
+    engine = None
+
+
+def serve(registry: MetricsRegistry, port: int, host: str = '127.0.0.1') -> ThreadingHTTPServer:
+    """Serve the metrics of registry in the Prometheus text format at http://host:port/metrics from a
+    background thread, returning the server, which is stopped with its shutdown method.
+    """
+    # Imported here, since http.server is slow to import and only needed when the metrics are served.
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        """Answers requests for /metrics."""
+
+        def do_GET(self) -> None:
+            """Send the metrics, or a 404 for any other path.
+            """
+            if self.path.split('?')[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = registry.to_prometheus().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', PROMETHEUS_CONTENT_TYPE)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *_args: Any) -> None:
+            # Scrapes are not logged, since they would be printed amid the game.
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name='metrics', daemon=True).start()
+    return server
+
+
+def _format_labels(labels: dict[str, str]) -> str:
+    """Return labels as written after the name of a sample, escaping their values.
+    """
+    if len(labels) == 0:
+        return ''
+    pairs = []
+    for name, value in labels.items():
+        escaped = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append(f'{name}="{escaped}"')
+    return '{' + ','.join(pairs) + '}'
+
+
+def _format_value(value: float) -> str:
+    """Return value as written in the Prometheus text format.
+    """
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value)
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={
+        'max-line-length': 120,
+        'extra-imports': ['threading', 'weakref', 'bisect', 'http.server', 'src.game_data'],
+    })
@@ -0,0 +1,327 @@
+"""Adventure Game 1: Loading content packs, either from a data directory or from a compiled bundle.
+
+A data directory holds the text files of a game (map.txt, locations.txt, items.txt, actions.txt and
+defaults.txt), which are parsed on every start. A compiled bundle is a single file holding a pack that has
+already been parsed, so loading it skips parsing altogether and never imports the ActionScript parser.
+Content archives hold the unparsed segments of a pack in a single indexed file, from which any one location
+or action can be read without reading the rest (see src.archive). Packs with very large maps are built into
+region files instead, whose tiles are loaded as players come near
+them (see src.regions).
+
+Servers hosting many packs use a PackRegistry, which discovers the packs in a directory, loads them by name
+on first use, and keeps only the most recently used ones loaded. Data directories can be parsed concurrently
+in a pool of worker processes, each sending its pack back as a compiled bundle.
+
+Compile a data directory into a bundle with:
+
+    python -m src.packs <data directory> <bundle path>
+"""
+from __future__ import annotations
+import io
+import os
+import pickle
+import sys
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from src import metrics
+from src.archive import ContentArchive, MAP_SECTION, ITEMS_SECTION, DEFAULTS_SECTION
+from src.descriptions import DescriptionStore
+from src.game_data import World
+from src.lru import LRUCache
+from src.regions import DEFAULT_RADIUS, DEFAULT_MAX_TILES, RegionalWorld, read_defaults
+
+# The data directory shipped with the game.
+DEFAULT_DATA_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'gamedata')
+
+# The name of each file of a data directory.
+MAP_FILE = 'map.txt'
+LOCATIONS_FILE = 'locations.txt'
+ITEMS_FILE = 'items.txt'
+ACTIONS_FILE = 'actions.txt'
+DEFAULTS_FILE = 'defaults.txt'
+
+# The extensions of compiled bundles, region files and content archives discovered by a PackRegistry.
+BUNDLE_EXTENSION = '.bundle'
+REGIONS_EXTENSION = '.regions'
+ARCHIVE_EXTENSION = '.archive'
+
+
+@dataclass
+class Pack:
+    """A loaded content pack.
+
+    Instance Attributes:
+        - world: The world of the pack.
+        - starting_location_id: The location every player starts at.
+        - max_steps: The maximum number of steps a player may take.
+
+    Representation Invariants:
+        - self.starting_location_id in self.world.locations
+        - self.max_steps >= 0
+    """
+    world: World
+    starting_location_id: int
+    max_steps: int
+
+
+def load_pack(
+        source: str,
+        descriptions: Optional[DescriptionStore] = None,
+        radius: int = DEFAULT_RADIUS,
+        max_tiles: int = DEFAULT_MAX_TILES,
+        workers: int = 1
+) -> Pack:
+    """Load the pack at source, which is either a data directory, a compiled bundle, a region file or a
+    content archive.
+    The location descriptions are kept in descriptions, or in memory if it is None. Region files load
+    their descriptions along with their tiles, as described by load_regions. Data directories and content
+    archives are parsed in workers processes.
+    """
+    start = time.perf_counter()
+    if source.endswith(REGIONS_EXTENSION):
+        pack_format, pack = 'regions', load_regions(source, radius, max_tiles)
+    elif source.endswith(ARCHIVE_EXTENSION):
+        pack_format, pack = 'archive', load_archive(source, descriptions, workers)
+    elif os.path.isfile(source):
+        pack_format, pack = 'bundle', load_bundle(source)
+        if descriptions is not None:
+            pack.world.use_descriptions(descriptions)
+    else:
+        pack_format, pack = 'directory', load_directory(source, descriptions, workers)
+    if metrics.engine is not None:
+        metrics.engine.world_loaded(pack.world, pack_format, time.perf_counter() - start)
+    return pack
+
+
+def load_directory(directory: str, descriptions: Optional[DescriptionStore] = None, workers: int = 1) -> Pack:
+    """Load and parse the pack in the given data directory, parsing its segments in workers processes.
+
+    defaults.txt is a file containing only one single line, in the format:
+        <initial starting location id> <maximum permitted steps>
+    """
+    with open(os.path.join(directory, MAP_FILE), "r") as world_map, \
+            open(os.path.join(directory, LOCATIONS_FILE), "r") as locations, \
+            open(os.path.join(directory, ITEMS_FILE), "r") as items, \
+            open(os.path.join(directory, ACTIONS_FILE), "r") as actions, \
+            open(os.path.join(directory, DEFAULTS_FILE), "r") as defaults:
+        starting_location_id_str, max_steps_str = defaults.readline().split(' ')
+        world = World(world_map, locations, items, actions, descriptions, workers)
+        return Pack(world=world, starting_location_id=int(starting_location_id_str), max_steps=int(max_steps_str))
+
+
+def load_bundle(path: str) -> Pack:
+    """Load the compiled pack stored at path.
+    """
+    with open(path, 'rb') as bundle:
+        return pickle.load(bundle)
+
+
+def load_archive(path: str, descriptions: Optional[DescriptionStore] = None, workers: int = 1) -> Pack:
+    """Load and parse the pack in the content archive at path, parsing its segments in workers processes.
+    The location descriptions are kept in descriptions, or in memory if it is None.
+    """
+    with ContentArchive(path) as archive:
+        world = World.from_segments(
+            io.StringIO(archive.read_section(MAP_SECTION)),
+            [archive.read_location(location_id) for location_id in archive.location_ids()],
+            io.StringIO(archive.read_section(ITEMS_SECTION)),
+            archive.read_all_actions(),
+            descriptions,
+            workers
+        )
+        starting_location_id_str, max_steps_str = archive.read_section(DEFAULTS_SECTION).split(' ')
+    return Pack(world=world, starting_location_id=int(starting_location_id_str), max_steps=int(max_steps_str))
+
+
+def load_regions(path: str, radius: int = DEFAULT_RADIUS, max_tiles: int = DEFAULT_MAX_TILES) -> Pack:
+    """Load the pack in the region file at path, whose tiles are loaded once a player reaches a location
+    within radius tiles of them. At most max_tiles tiles are kept loaded.
+    """
+    starting_location_id, max_steps = read_defaults(path)
+    world = RegionalWorld(path, radius, max_tiles)
+    return Pack(world=world, starting_location_id=starting_location_id, max_steps=max_steps)
+
+
+def compile_bundle(directory: str, path: str) -> Pack:
+    """Parse the pack in the given data directory and store it as a compiled bundle at path.
+    The descriptions of a compiled bundle are always kept in memory once it is loaded.
+    """
+    pack = load_directory(directory)
+    with open(path, 'wb') as bundle:
+        pickle.dump(pack, bundle, protocol=pickle.HIGHEST_PROTOCOL)
+    return pack
+
+
+def _compile_to_bytes(directory: str) -> bytes:
+    """Parse the pack in the given data directory, returning it as the contents of a compiled bundle.
+    This runs in the worker processes of a PackRegistry.
+    """
+    return pickle.dumps(load_directory(directory), protocol=pickle.HIGHEST_PROTOCOL)
+
+
+class PackRegistry:
+    """A registry of the packs found in a directory, each being a data directory, a compiled bundle, a
+    region file or a content archive named after its directory or file name, without the extension.
+
+    Packs are loaded on first use, and at most capacity packs are kept loaded: loading another pack evicts
+    the least recently used one, which is loaded again the next time it is needed. Players keep playing
+    evicted packs, since their worlds stay alive for as long as they are referenced.
+
+    Instance Attributes:
+        - root: The directory the packs are discovered in.
+        - capacity: The maximum number of packs kept loaded.
+        - workers: The number of worker processes parsing packs in load_all, or None for one per core.
+        - descriptions: A function creating the description store of each loaded pack, or None to keep the
+          descriptions in memory.
+
+    Representation Invariants:
+        - self.capacity > 0
+    """
+    root: str
+    capacity: int
+    workers: Optional[int]
+    descriptions: Optional[Callable[[], DescriptionStore]]
+    _sources: dict[str, str]
+    _loaded: LRUCache
+    _loading: dict[str, Future]
+    _lock: threading.Lock
+
+    def __init__(
+            self,
+            root: str,
+            capacity: int = 8,
+            workers: Optional[int] = None,
+            descriptions: Optional[Callable[[], DescriptionStore]] = None
+    ) -> None:
+        """Initialize a registry of the packs in root, without loading any of them.
+        """
+        self.root = root
+        self.capacity = capacity
+        self.workers = workers
+        self.descriptions = descriptions
+        self._loaded = LRUCache(capacity)
+        self._loading = {}
+        self._lock = threading.Lock()
+        self._sources = {}
+        self.discover()
+
+    def discover(self) -> list[str]:
+        """Scan the root directory for packs, returning the names of every pack found.
+        """
+        sources = {}
+        for entry in sorted(os.scandir(self.root), key=lambda e: e.name):
+            if entry.is_dir() and os.path.isfile(os.path.join(entry.path, MAP_FILE)):
+                sources[entry.name] = entry.path
+            elif entry.is_file():
+                for extension in (BUNDLE_EXTENSION, REGIONS_EXTENSION, ARCHIVE_EXTENSION):
+                    if entry.name.endswith(extension):
+                        sources[entry.name[:-len(extension)]] = entry.path
+        with self._lock:
+            self._sources = sources
+        return list(sources)
+
+    def names(self) -> list[str]:
+        """Return the names of the discovered packs.
+        """
+        return list(self._sources)
+
+    def is_loaded(self, name: str) -> bool:
+        """Return whether the pack with the given name is currently loaded.
+        """
+        return name in self._loaded
+
+    def get(self, name: str) -> Pack:
+        """Return the pack with the given name, loading it if it is not loaded.
+        Raise KeyError if there is no such pack.
+
+        Packs are loaded outside the lock of the registry, so that loading a pack never delays getting the
+        packs already loaded. Threads getting a pack being loaded by another thread wait for that load.
+        """
+        with self._lock:
+            pack = self._loaded.get(name)
+            if pack is not None:
+                return pack
+            source = self._sources[name]
+            loading = self._loading.get(name)
+            if loading is None:
+                loading = self._loading[name] = Future()
+                loader = True
+            else:
+                loader = False
+        if loader:
+            descriptions = self.descriptions
+            self._finish(name, loading, lambda: load_pack(source, None if descriptions is None else descriptions()))
+        return loading.result()
+
+    def load_all(self, names: Optional[list[str]] = None) -> dict[str, Pack]:
+        """Load the packs with the given names, or every discovered pack if names is None, returning them by
+        name. Data directories are parsed concurrently in worker processes, and the other packs are read
+        while the workers parse. Packs already loaded are not loaded again, and packs being loaded by get are
+        waited for. Raise KeyError if there is no such pack.
+        """
+        names = self.names() if names is None else names
+        packs, waiting, loads = {}, {}, {}
+        with self._lock:
+            sources = {name: self._sources[name] for name in names}
+            for name in names:
+                pack = self._loaded.get(name)
+                if pack is not None:
+                    packs[name] = pack
+                elif name in self._loading:
+                    waiting[name] = self._loading[name]
+                else:
+                    waiting[name] = loads[name] = self._loading[name] = Future()
+
+        # Imported here, since multiprocessing is slow to import and only needed to load many packs at once.
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            start = time.perf_counter()
+            parsed = {
+                name: pool.submit(_compile_to_bytes, sources[name]) for name in loads if os.path.isdir(sources[name])
+            }
+            for name, loading in loads.items():
+                if name not in parsed:
+                    self._finish(name, loading, lambda source=sources[name]: self._prepare(load_pack(source)))
+            for name, future in parsed.items():
+                self._finish(name, loads[name], lambda data=future: self._prepare(pickle.loads(data.result())))
+                if metrics.engine is not None and loads[name].exception() is None:
+                    metrics.engine.world_loaded(loads[name].result().world, 'directory', time.perf_counter() - start)
+        return {name: packs[name] if name in packs else waiting[name].result() for name in names}
+
+    def _finish(self, name: str, loading: Future, load: Callable[[], Pack]) -> None:
+        """Load the pack with the given name with load, keeping it in the registry, then settle loading with
+        the pack, or with the error raised by load.
+        """
+        try:
+            pack = load()
+        except BaseException as error:
+            with self._lock:
+                del self._loading[name]
+            loading.set_exception(error)
+            return
+        with self._lock:
+            self._loaded.put(name, pack)
+            del self._loading[name]
+        loading.set_result(pack)
+
+    def _prepare(self, pack: Pack) -> Pack:
+        """Move the descriptions of a freshly loaded pack into its own store, if the registry is configured to.
+        """
+        if self.descriptions is not None:
+            pack.world.use_descriptions(self.descriptions())
+        return pack
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 3:
+        print("Usage: python -m src.packs <data directory> <bundle path>")
+        sys.exit(1)
+    # Compile through the imported module, so the bundle refers to src.packs.Pack rather than __main__.Pack.
+    from src.packs import compile_bundle as compile_pack
+    compiled = compile_pack(sys.argv[1], sys.argv[2])
+    print(f"Compiled {len(compiled.world.locations)} locations into {sys.argv[2]}.")
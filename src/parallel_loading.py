@@ -0,0 +1,100 @@
+"""Adventure Game 1: Parsing the location and action segments of a pack in parallel.
+
+Every location segment parses independently once the map is known, and every action segment parses
+independently of the others, except for the slots assigned to the variables it uses. The segments are split
+into contiguous chunks parsed in a pool of worker processes, each sent the map once. Workers return location
+records, which World.load_locations links to their items and actions in order, and actions whose variables
+were assigned slots by a table local to their chunk. Those slots are then reassigned by resolving the names
+of each chunk in order, which yields the slots the serial loader would have assigned, so the world is
+identical to a world loaded serially.
+"""
+from __future__ import annotations
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from src.actions.action import Action
+from src.actions.variables import VariableTable
+from src.game_data import World, LocationRecord
+
+# The number of chunks given to each worker, so that workers finishing early pick up remaining chunks.
+CHUNKS_PER_WORKER = 4
+
+# The map of the pack being loaded, and the position of every location on it, in worker processes.
+_world_map: Optional[list[list[int]]] = None
+_positions: Optional[dict[int, tuple[int, int]]] = None
+
+
+def parse_segments(
+        location_segments: list[list[str]],
+        action_segments: list[list[str]],
+        world_map: list[list[int]],
+        variables: VariableTable,
+        workers: int
+) -> tuple[list[LocationRecord], list[Action]]:
+    """Parse the given location and action segments in workers processes, returning the location records and
+    the actions, in the order of their segments. The variables used by the actions are assigned their slots
+    in variables.
+    """
+    with ProcessPoolExecutor(max_workers=workers, initializer=_receive_map, initargs=(world_map,)) as pool:
+        action_chunks = [pool.submit(_parse_actions, chunk) for chunk in _chunks(action_segments, workers)]
+        location_chunks = pool.map(_parse_locations, _chunks(location_segments, workers))
+
+        actions = []
+        for future in action_chunks:
+            chunk_actions, player_names, global_names = future.result()
+            player_slots = [variables.resolve(name) for name in player_names]
+            global_slots = [variables.resolve(name) for name in global_names]
+            for action in chunk_actions:
+                # Strings interned by the parser lose their identity on their way back from the workers.
+                action.name = sys.intern(action.name)
+                for instruction in action.instructions:
+                    instruction.operation = sys.intern(instruction.operation)
+                    if instruction.slot is not None:
+                        slots = global_slots if instruction.slot.is_global else player_slots
+                        instruction.slot = slots[instruction.slot.index]
+            actions.extend(chunk_actions)
+        records = [record for chunk in location_chunks for record in chunk]
+    return records, actions
+
+
+def _chunks(segments: list[list[str]], workers: int) -> list[list[list[str]]]:
+    """Split segments into contiguous chunks, about CHUNKS_PER_WORKER for each worker.
+    """
+    size = max(1, -(-len(segments) // (workers * CHUNKS_PER_WORKER)))
+    return [segments[i:i + size] for i in range(0, len(segments), size)]
+
+
+def _receive_map(world_map: list[list[int]]) -> None:
+    """Keep the map of the pack being loaded in a worker process.
+    """
+    global _world_map, _positions
+    _world_map = world_map
+    _positions = {
+        location_id: (x, y) for y, row in enumerate(world_map) for x, location_id in enumerate(row)
+        if location_id != -1
+    }
+
+
+def _parse_locations(segments: list[list[str]]) -> list[LocationRecord]:
+    """Parse a chunk of location segments. This runs in the worker processes.
+    """
+    return [World.parse_location_record(segment, _world_map, _positions) for segment in segments]
+
+
+def _parse_actions(segments: list[list[str]]) -> tuple[list[Action], list[str], list[str]]:
+    """Parse a chunk of action segments, returning the actions along with the names of the player and world
+    variables they use, indexed by the slots they were assigned. This runs in the worker processes.
+    """
+    variables = VariableTable()
+    actions = World.load_actions(segments, variables)
+    return actions, variables.player_names, variables.global_names
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={
+        'max-line-length': 120,
+        'extra-imports': ['sys', 'concurrent.futures', 'src.actions.action', 'src.actions.variables', 'src.game_data'],
+    })
@@ -0,0 +1,94 @@
+"""Adventure Game 1: A lookup table resolving words by exact match or by an unambiguous prefix.
+"""
+from __future__ import annotations
+from bisect import bisect_left, insort
+from typing import Any, Optional
+
+# A character sorting after any character that may appear in a key.
+_MAX_CHAR = chr(0x10FFFF)
+
+
+class PrefixTable:
+    """A mapping from string keys to values, where a value can also be found by any prefix of its key
+    that no other key with a different value shares. Several keys may map to the same value, which is
+    how aliases are represented.
+
+    Keys are kept in a dictionary for exact lookups and in a sorted list for prefix lookups, so that
+    both take a single dictionary access or binary search, no matter how many keys are added.
+
+    Representation Invariants:
+        - self._keys == sorted(self._exact)
+    """
+    _exact: dict[str, Any]
+    _keys: list[str]
+
+    def __init__(self, entries: Optional[dict[str, Any]] = None) -> None:
+        """Initialize a table holding the given entries.
+        """
+        self._exact = {}
+        self._keys = []
+        for key, value in (entries or {}).items():
+            self.add(key, value)
+
+    def add(self, key: str, value: Any) -> None:
+        """Map key to value, replacing any previous value of key.
+        """
+        if key not in self._exact:
+            insort(self._keys, key)
+        self._exact[key] = value
+
+    def remove(self, key: str) -> None:
+        """Remove key from the table, if it is present.
+        """
+        if key in self._exact:
+            del self._exact[key]
+            self._keys.pop(bisect_left(self._keys, key))
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the value of key, or None if key is not in the table.
+        """
+        return self._exact.get(key)
+
+    def complete(self, prefix: str) -> Optional[Any]:
+        """Return the value of the keys starting with prefix, or None if there is no such key, or if
+        they do not all have the same value.
+        """
+        if prefix == '':
+            return None
+        keys = self._keys
+        i = bisect_left(keys, prefix)
+        end = bisect_left(keys, prefix + _MAX_CHAR, i)
+        if i == end:
+            return None
+        value = self._exact[keys[i]]
+        for j in range(i + 1, end):
+            if self._exact[keys[j]] is not value:
+                return None
+        return value
+
+    def has_prefix(self, prefix: str) -> bool:
+        """Return whether any key starts with prefix.
+        """
+        i = bisect_left(self._keys, prefix)
+        return i < len(self._keys) and self._keys[i].startswith(prefix)
+
+    def resolve(self, text: str) -> Optional[Any]:
+        """Return the value of text, either as a key or as an unambiguous prefix of keys.
+        """
+        value = self._exact.get(text)
+        return value if value is not None else self.complete(text)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._exact
+
+    def __len__(self) -> int:
+        return len(self._exact)
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={
+        'max-line-length': 120,
+        'extra-imports': ['bisect'],
+    })
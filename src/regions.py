@@ -0,0 +1,400 @@
+"""Adventure Game 1: Worlds split into tiles of the map, loaded as the players come near them.
+
+A region file holds a pack whose map is split into square tiles of tile_size cells. Each tile stores its
+cells along with the locations on them, including their descriptions, items and actions, and an offset
+table at the end of the file locates every tile. A RegionalWorld keeps only the tiles within radius tiles
+of the locations players recently reached, so maps far larger than memory can be played.
+
+Tiles are kept in a bounded cache. When a tile is evicted, the state players changed on it (visited
+locations, items lying around, unlocked directions and completed actions) is appended to a state file on
+disk, and restored the next time the tile is loaded, so memory does not grow with the number of tiles players
+changed. World.get_location and World.location_by_id remain the only ways locations are reached, and load the
+tiles they need on demand; a regional world has no map attribute, since its cells are kept in the tiles.
+
+Build a region file from a data directory with:
+
+    python -m src.regions <data directory> <region file> [--tile-size <cells>]
+"""
+from __future__ import annotations
+import hashlib
+import pickle
+import struct
+import threading
+from array import array
+from bisect import bisect_left
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, BinaryIO, NoReturn, Optional
+
+from src.actions.action import BackgroundAction, TriggeredAction
+from src.actions.triggers import TriggerIndex
+from src.descriptions import InMemoryDescriptions
+from src.errors import LocationError
+from src.fingerprint import StateHash
+from src.game_data import World, Location, LocationDescriptor
+from src.lru import LRUCache
+
+if TYPE_CHECKING:
+    from src.descriptions import DescriptionStore
+
+DEFAULT_TILE_SIZE = 32
+DEFAULT_RADIUS = 1
+DEFAULT_MAX_TILES = 64
+
+# Region files start with this, and end with the offset of their header.
+_MAGIC = b'ADVREGN1'
+_FOOTER = struct.Struct('<Q')
+
+
+@dataclass(slots=True)
+class Tile:
+    """A loaded tile of a regional world.
+
+    Instance Attributes:
+        - cells: The location ids of the cells of the tile, row by row, or None if every cell is -1.
+        - locations: The locations on the tile, by id.
+        - digest: The hash of the state of the locations when the tile was loaded.
+    """
+    cells: Optional[array]
+    locations: dict[int, Location]
+    digest: bytes
+
+
+class RegionalWorld(World):
+    """A world loading the tiles of its map from a region file as players come near them.
+
+    Only the locations of loaded tiles are in self.locations, and there is no self.map, since the cells of the
+    map are kept in the tiles. The descriptions of every location are kept in a store owned by its tile.
+
+    Instance Attributes:
+        - path: The path of the region file.
+        - radius: The number of tiles around the tile of a reached location that are loaded along with it.
+        - tile_size: The number of cells along each side of a tile.
+        - width: The number of columns of the map.
+        - height: The number of rows of the map.
+        - state_path: The path of the file the state of evicted tiles is saved to, or None for a temporary file.
+
+    Representation Invariants:
+        - self.radius >= 0
+        - self.tile_size > 0
+    """
+    path: str
+    radius: int
+    tile_size: int
+    width: int
+    height: int
+    state_path: Optional[str]
+    _file: BinaryIO
+    _tiles_x: int
+    _tiles_y: int
+    _offsets: array
+    _ids: array
+    _positions: array
+    _tiles: LRUCache
+    _state_file: Optional[BinaryIO]
+    _saved: array
+    _lock: threading.RLock
+
+    def __init__(
+            self,
+            path: str,
+            radius: int = DEFAULT_RADIUS,
+            max_tiles: int = DEFAULT_MAX_TILES,
+            state_path: Optional[str] = None
+    ) -> None:
+        """Open the region file at path, loading its header but none of its tiles. At most max_tiles tiles
+        are kept loaded, though never fewer than the tiles around a single location. The state of evicted
+        tiles is saved to the file at state_path, which is overwritten, or to a temporary file if it is None.
+        """
+        self.path = path
+        self.radius = radius
+        self.state_path = state_path
+        self._file = open(path, 'rb')
+        header = _read_header(self._file)
+
+        self.tile_size = header['tile_size']
+        self.width = header['width']
+        self.height = header['height']
+        self._tiles_x = header['tiles_x']
+        self._tiles_y = header['tiles_y']
+        self._offsets = header['offsets']
+        self._ids = header['ids']
+        self._positions = header['positions']
+
+        self.descriptions = InMemoryDescriptions()
+        self.variables = header['variables']
+        self.global_store = []
+        self.state_hash = StateHash()
+        self.changed = set()
+        self.locations = {}
+        actions = header['actions']
+        self.background_actions = [action for action in actions if isinstance(action, BackgroundAction)]
+        self.triggers = TriggerIndex([action for action in actions if isinstance(action, TriggeredAction)])
+
+        self._tiles = LRUCache(max(max_tiles, (2 * radius + 1) ** 2), on_evict=self._evict)
+        self._state_file = None
+        # The span of the saved state of every tile in the state file, which is empty if it was never saved.
+        self._saved = array('Q', bytes(16 * self._tiles_x * self._tiles_y))
+        self._lock = threading.RLock()
+
+    @property
+    def map(self) -> NoReturn:
+        """Regional worlds have no map, since its cells are kept in the tiles.
+        """
+        raise AttributeError("Regional worlds keep their map in tiles: use get_location, location_by_id and "
+                             "find_location instead")
+
+    def get_location(self, x: int, y: int) -> Optional[Location]:
+        """Return the location at (x, y) on the map, or None if there is none, loading its tile and the tiles
+        around it if they are not loaded.
+        """
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            return None
+        tile_x, tile_y = x // self.tile_size, y // self.tile_size
+        with self._lock:
+            for neighbour_y in range(tile_y - self.radius, tile_y + self.radius + 1):
+                for neighbour_x in range(tile_x - self.radius, tile_x + self.radius + 1):
+                    if (neighbour_x, neighbour_y) != (tile_x, tile_y):
+                        self._tile(neighbour_x, neighbour_y)
+            # The tile of the location is touched last, so it is the last to be evicted.
+            tile = self._tile(tile_x, tile_y)
+
+        if tile.cells is None:
+            return None
+        location_id = tile.cells[(y % self.tile_size) * self.tile_size + x % self.tile_size]
+        if location_id == -1:
+            return None
+        return tile.locations[location_id]
+
+    def location_by_id(self, location_id: int) -> Location:
+        """Return the location with the given id, loading its tile, without the tiles around it, if it is not
+        loaded. Raise LocationError if there is no such location.
+        """
+        x, y = self.find_location(location_id)
+        with self._lock:
+            tile = self._tile(x // self.tile_size, y // self.tile_size)
+        return tile.locations[location_id]
+
+    def find_location(self, location_id: int) -> tuple[int, int]:
+        i = bisect_left(self._ids, location_id)
+        if i == len(self._ids) or self._ids[i] != location_id:
+            raise LocationError("Unable to find location in map")
+        return self._positions[i] % self.width, self._positions[i] // self.width
+
+    def use_descriptions(self, descriptions: DescriptionStore) -> None:
+        """Make descriptions the store of this world, without moving the descriptions of its locations, which
+        are loaded and evicted with their tiles.
+        """
+        self.descriptions = descriptions
+
+    def loaded_tiles(self) -> int:
+        """Return the number of tiles currently loaded.
+        """
+        return len(self._tiles)
+
+    def close(self) -> None:
+        """Close the region file and the state file. No tile may be loaded afterwards.
+        """
+        self._file.close()
+        if self._state_file is not None:
+            self._state_file.close()
+
+    def _tile(self, tile_x: int, tile_y: int) -> Optional[Tile]:
+        """Return the tile at (tile_x, tile_y), loading it if it is not loaded, or None if it is off the map.
+        """
+        if not (0 <= tile_x < self._tiles_x and 0 <= tile_y < self._tiles_y):
+            return None
+        index = tile_y * self._tiles_x + tile_x
+        tile = self._tiles.get(index)
+        if tile is None:
+            tile = self._load(index)
+            self._tiles.put(index, tile)
+        return tile
+
+    def _load(self, index: int) -> Tile:
+        """Read the tile with the given index from the region file, restoring its saved state if any.
+        """
+        start, end = self._offsets[2 * index], self._offsets[2 * index + 1]
+        if start == end:
+            return Tile(cells=None, locations={}, digest=b'')
+
+        self._file.seek(start)
+        cells, records = pickle.loads(self._file.read(end - start))
+        store = InMemoryDescriptions()
+        locations = {}
+        for location_id, position, points, allowed_movements, short, long, items, actions in records:
+            descriptor = LocationDescriptor(
+                position=position,
+                location_id=location_id,
+                store=store,
+                short_key=store.add(short),
+                long_key=store.add(long)
+            )
+            locations[location_id] = Location(
+                descriptor=descriptor,
+                allowed_movements=allowed_movements,
+                actions=actions,
+                points=points,
+                items=items,
+                already_visited=False
+            )
+
+        saved_start, saved_end = self._saved[2 * index], self._saved[2 * index + 1]
+        if saved_start != saved_end:
+            self._state_file.seek(saved_start)
+            for state in pickle.loads(self._state_file.read(saved_end - saved_start)):
+                _restore(locations[state[0]], state)
+        self.locations.update(locations)
+        return Tile(cells=cells, locations=locations, digest=_digest(_states(locations)))
+
+    def _evict(self, index: int, tile: Tile) -> None:
+        """Save the state of an evicted tile to the state file if players changed it, and forget its locations.
+        """
+        states = _states(tile.locations)
+        if _digest(states) != tile.digest:
+            state_file = self._open_state_file()
+            state_file.seek(0, 2)
+            self._saved[2 * index] = state_file.tell()
+            state_file.write(states)
+            self._saved[2 * index + 1] = state_file.tell()
+        for location_id in tile.locations:
+            self.locations.pop(location_id, None)
+
+    def _open_state_file(self) -> BinaryIO:
+        """Return the state file, creating it when the first tile is saved.
+        """
+        if self._state_file is None:
+            if self.state_path is None:
+                # tempfile is slow to import, and only needed once players changed an evicted tile.
+                import tempfile
+                self._state_file = tempfile.TemporaryFile()
+            else:
+                self._state_file = open(self.state_path, 'w+b')
+        return self._state_file
+
+
+def build_regions(directory: str, path: str, tile_size: int = DEFAULT_TILE_SIZE) -> int:
+    """Parse the pack in the given data directory and store it as a region file at path, with square tiles
+    of tile_size cells. Return the number of tiles holding at least one location.
+    """
+    # Imported here, since src.packs itself imports this module.
+    from src.packs import load_directory
+
+    pack = load_directory(directory)
+    world = pack.world
+    height = len(world.map)
+    width = max(len(row) for row in world.map)
+    tiles_x, tiles_y = -(-width // tile_size), -(-height // tile_size)
+
+    offsets = array('Q')
+    stored = 0
+    with open(path, 'wb') as region_file:
+        region_file.write(_MAGIC)
+        for tile_y in range(tiles_y):
+            for tile_x in range(tiles_x):
+                cells = array('q', [-1] * (tile_size * tile_size))
+                records = []
+                for y in range(tile_y * tile_size, min((tile_y + 1) * tile_size, height)):
+                    row = world.map[y]
+                    for x in range(tile_x * tile_size, min((tile_x + 1) * tile_size, len(row))):
+                        if row[x] != -1:
+                            cells[(y % tile_size) * tile_size + x % tile_size] = row[x]
+                            records.append(_record(world.locations[row[x]]))
+
+                start = region_file.tell()
+                if len(records) != 0:
+                    region_file.write(pickle.dumps((cells, records), protocol=pickle.HIGHEST_PROTOCOL))
+                    stored += 1
+                offsets.extend((start, region_file.tell()))
+
+        ids = sorted(world.locations)
+        header = {
+            'tile_size': tile_size,
+            'width': width,
+            'height': height,
+            'tiles_x': tiles_x,
+            'tiles_y': tiles_y,
+            'offsets': offsets,
+            'ids': array('q', ids),
+            'positions': array('Q', (_position_index(world.locations[i], width) for i in ids)),
+            'variables': world.variables,
+            'actions': world.background_actions + world.triggers.actions(),
+            'starting_location_id': pack.starting_location_id,
+            'max_steps': pack.max_steps,
+        }
+        header_offset = region_file.tell()
+        region_file.write(pickle.dumps(header, protocol=pickle.HIGHEST_PROTOCOL))
+        region_file.write(_FOOTER.pack(header_offset))
+    return stored
+
+
+def read_defaults(path: str) -> tuple[int, int]:
+    """Return the starting location id and the maximum number of steps of the pack in the region file at path.
+    """
+    with open(path, 'rb') as region_file:
+        header = _read_header(region_file)
+    return header['starting_location_id'], header['max_steps']
+
+
+def _read_header(region_file: BinaryIO) -> dict:
+    """Return the header of an open region file.
+    """
+    if region_file.read(len(_MAGIC)) != _MAGIC:
+        raise ValueError(f"{region_file.name} is not a region file")
+    region_file.seek(-_FOOTER.size, 2)
+    end = region_file.tell()
+    (header_offset,) = _FOOTER.unpack(region_file.read(_FOOTER.size))
+    region_file.seek(header_offset)
+    return pickle.loads(region_file.read(end - header_offset))
+
+
+def _record(location: Location) -> tuple:
+    """Return the record of a location as stored in its tile.
+    """
+    descriptor = location.descriptor
+    return (descriptor.location_id, descriptor.position, location.points, location.allowed_movements,
+            descriptor.short_description, descriptor.long_description, location.items, location.actions)
+
+
+def _position_index(location: Location, width: int) -> int:
+    """Return the index of the cell of a location, counting row by row.
+    """
+    x, y = location.descriptor.position
+    return y * width + x
+
+
+def _states(locations: dict[int, Location]) -> bytes:
+    """Return the state players may change of the given locations, serialized: whether each location was
+    visited, its items, its allowed movements and whether each of its actions was completed.
+    """
+    return pickle.dumps([
+        (location_id, location.already_visited, location.items, location.allowed_movements,
+         [action.completed for action in location.actions])
+        for location_id, location in locations.items()
+    ], protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def _restore(location: Location, state: tuple) -> None:
+    """Restore the saved state of a freshly loaded location, as returned by _states.
+    """
+    _, location.already_visited, location.items, location.allowed_movements, completed = state
+    for action, action_completed in zip(location.actions, completed):
+        action.completed = action_completed
+
+
+def _digest(states: bytes) -> bytes:
+    """Return the hash of serialized location states.
+    """
+    return hashlib.blake2b(states, digest_size=16).digest()
+
+
+if __name__ == '__main__':
+    from argparse import ArgumentParser
+
+    argument_parser = ArgumentParser(description="Build a region file from a data directory.")
+    argument_parser.add_argument('directory', help="the data directory of the pack")
+    argument_parser.add_argument('path', help="the path of the region file to write")
+    argument_parser.add_argument('--tile-size', type=int, default=DEFAULT_TILE_SIZE,
+                                 help=f"the number of cells along each side of a tile (default: {DEFAULT_TILE_SIZE})")
+    arguments = argument_parser.parse_args()
+    tiles = build_regions(arguments.directory, arguments.path, arguments.tile_size)
+    print(f"Stored {tiles} tiles in {arguments.path}.")
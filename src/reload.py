@@ -0,0 +1,365 @@
+"""Adventure Game 1: Hot reloading of the locations and actions of a running World.
+
+The reloader remembers a content hash of every LOCATION ... END and action ... END segment of the files
+a world was loaded from. When the files change, only the segments whose hash has changed are parsed
+again, and they are patched into the running world in place. Locations and actions keep their identity,
+so any state attached to them, such as visited locations, completed actions, the items lying around and
+directions unlocked by actions, survives the reload as long as their ids still match.
+
+A reload first parses every changed segment, with a copy of the variable table of the world and a store of its
+own for the descriptions, and only patches the world once they all parsed and linked, so a file saved with a
+mistake leaves the running world unchanged: poll reports the error and keeps watching the files.
+
+Changes to the map or to the items require the game to be restarted, and locations still on the map cannot be
+removed.
+"""
+from __future__ import annotations
+import hashlib
+import os
+from dataclasses import dataclass
+
+from src.actions.action import Action, BackgroundAction, SingleAction, TriggeredAction
+from src.actions.linker import link_actions
+from src.actions.variables import VariableTable
+from src.descriptions import InMemoryDescriptions
+from src.direction import Direction
+from src.errors import (ActionScriptSyntaxError, InvalidDirection, LinkError, LocationError,
+                        UnknownExecutionCondition)
+from src.game_data import World, Item, Location
+
+# Actions are identified by their lowercase name and location id, which is -1 for background actions.
+ActionKey = tuple[str, int]
+
+# The errors raised by files saved with a mistake, which are reported by poll without ending the game.
+RELOAD_ERRORS = (OSError, ValueError, IndexError, KeyError, LocationError, InvalidDirection,
+                 UnknownExecutionCondition, ActionScriptSyntaxError, LinkError)
+
+
+@dataclass
+class ReloadReport:
+    """The number of segments patched into the world by a reload.
+    """
+    locations_changed: int = 0
+    locations_added: int = 0
+    locations_removed: int = 0
+    actions_changed: int = 0
+    actions_added: int = 0
+    actions_removed: int = 0
+
+    def __str__(self) -> str:
+        return (f"locations: {self.locations_changed} changed, {self.locations_added} added, "
+                f"{self.locations_removed} removed; actions: {self.actions_changed} changed, "
+                f"{self.actions_added} added, {self.actions_removed} removed")
+
+
+class WorldReloader:
+    """Patches a running World with the segments of its source files that have changed since it was loaded.
+
+    Instance Attributes:
+        - world: The world being patched, which must have been loaded from the given files.
+        - location_path: The path of the locations file of the world.
+        - actions_path: The path of the actions file of the world.
+        - items_path: The path of the items file of the world, used for locations added by a reload.
+    """
+    world: World
+    location_path: str
+    actions_path: str
+    items_path: str
+    _location_hashes: dict[int, bytes]
+    _location_locks: dict[int, frozenset[Direction]]
+    _action_hashes: dict[ActionKey, bytes]
+    _actions: dict[ActionKey, Action]
+    _mtimes: tuple[int, int]
+
+    def __init__(self, world: World, location_path: str, actions_path: str, items_path: str) -> None:
+        """Initialize a reloader for world, hashing the segments of its files as they are now.
+        """
+        self.world = world
+        self.location_path = location_path
+        self.actions_path = actions_path
+        self.items_path = items_path
+        self._mtimes = self._modification_times()
+
+        self._actions = {}
+        for location in world.locations.values():
+            for action in location.actions:
+                self._actions[_key_of(action)] = action
+        for action in world.background_actions:
+            self._actions[_key_of(action)] = action
+        for action in world.triggers.actions():
+            self._actions[_key_of(action)] = action
+
+        self._action_hashes = {}
+        for segment in self._read_segments(actions_path):
+            key = _action_key(segment[0])
+            self._action_hashes[key] = _digest(segment)
+            if key not in self._actions:
+                # Actions of locations missing from the world are kept for locations added later.
+                self._actions[key] = World.parse_action_segment(segment, world.variables)
+
+        self._location_hashes = {}
+        self._location_locks = {}
+        for segment in self._read_segments(location_path):
+            location_id = _location_id(segment[0])
+            self._location_hashes[location_id] = _digest(segment)
+            self._location_locks[location_id] = _locked_directions(segment)
+
+    def poll(self) -> bool:
+        """Reload the world if any of its files were modified since they were last read, returning
+        whether a reload happened.
+        """
+        mtimes = self._modification_times()
+        if mtimes == self._mtimes:
+            return False
+        self._mtimes = mtimes
+        try:
+            report = self.reload()
+        except RELOAD_ERRORS as error:
+            print(f"Could not reload, keeping the current world: {error}")
+            return False
+        print(f"Reloaded {report}.")
+        return True
+
+    def reload(self) -> ReloadReport:
+        """Parse the segments that changed since the last reload and patch them into the world. Raise one of
+        RELOAD_ERRORS, leaving the world unchanged, if a changed segment cannot be parsed, if the actions refer to
+        locations, directions or items that do not exist, or if a location still on the map was removed.
+        """
+        variables = self.world.variables.copy()
+        action_hashes, actions = self._parse_actions(variables)
+        location_hashes, locks, locations = self._parse_locations()
+        # The actions the world will hold are linked against the locations it will hold before anything is
+        # patched, since reloaded actions may refer to added locations.
+        reloaded = {key: self._actions[key] for key in action_hashes.keys() - actions.keys()} | actions
+        with open(self.items_path, 'r') as items_data:
+            link_actions(list(reloaded.values()), location_hashes.keys(), World.load_items(items_data))
+        report = ReloadReport()
+        self.world.variables.update(variables)
+        self._patch_actions(action_hashes, actions, report)
+        self._patch_locations(location_hashes, locks, locations, report)
+        return report
+
+    def _parse_actions(self, variables: VariableTable) -> tuple[dict[ActionKey, bytes], dict[ActionKey, Action]]:
+        """Return the hashes of every action segment, and the actions of the segments that changed, whose
+        variables are resolved in variables.
+        """
+        hashes, actions = {}, {}
+        for segment in self._read_segments(self.actions_path):
+            key = _action_key(segment[0])
+            hashes[key] = digest = _digest(segment)
+            if self._action_hashes.get(key) != digest:
+                actions[key] = World.parse_action_segment(segment, variables)
+        return hashes, actions
+
+    def _parse_locations(
+            self
+    ) -> tuple[dict[int, bytes], dict[int, frozenset[Direction]], dict[int, Location]]:
+        """Return the hashes and default locks of every location segment, and the locations of the segments that
+        changed, whose descriptions are kept in a store of their own until they are patched. Raise LocationError
+        if a location still on the map was removed.
+        """
+        world = self.world
+        descriptions = InMemoryDescriptions()
+        hashes, locks, locations = {}, {}, {}
+        for segment in self._read_segments(self.location_path):
+            location_id = _location_id(segment[0])
+            hashes[location_id] = digest = _digest(segment)
+            locks[location_id] = _locked_directions(segment)
+            if self._location_hashes.get(location_id) != digest:
+                locations[location_id] = World.parse_location_segment(
+                    segment, [], [], world.map, descriptions
+                )
+        for location_id in self._location_hashes.keys() - hashes.keys():
+            if self._is_mapped(location_id):
+                raise LocationError(f"Location {location_id} is still on the map, so it cannot be removed")
+        return hashes, locks, locations
+
+    def _patch_actions(
+            self,
+            hashes: dict[ActionKey, bytes],
+            actions: dict[ActionKey, Action],
+            report: ReloadReport
+    ) -> None:
+        """Patch the actions of the changed action segments into the world, updating report.
+        """
+        for key, action in actions.items():
+            old_action = self._actions.get(key)
+            if old_action is None:
+                self._actions[key] = action
+                self._attach(action)
+                report.actions_added += 1
+            elif type(old_action) is not type(action):
+                # Declaring or dropping triggers changes how the action is executed, so it is replaced.
+                self._detach(old_action)
+                self._actions[key] = action
+                self._attach(action)
+                report.actions_changed += 1
+            else:
+                # The action keeps its identity, so a completed action remains completed.
+                old_action.name = action.name
+                old_action.instructions = action.instructions
+                if isinstance(old_action, TriggeredAction):
+                    self.world.triggers.remove(old_action)
+                    old_action.triggers = action.triggers
+                    self.world.triggers.add(old_action)
+                self._reindex(old_action)
+                report.actions_changed += 1
+
+        for key in self._action_hashes.keys() - hashes.keys():
+            self._detach(self._actions.pop(key))
+            report.actions_removed += 1
+        self._action_hashes = hashes
+
+    def _patch_locations(
+            self,
+            hashes: dict[int, bytes],
+            locks: dict[int, frozenset[Direction]],
+            locations: dict[int, Location],
+            report: ReloadReport
+    ) -> None:
+        """Patch the locations of the changed location segments into the world, moving their descriptions to the
+        store of the world, and update report.
+        """
+        world = self.world
+        for location_id, parsed in locations.items():
+            descriptor = parsed.descriptor
+            texts = descriptor.short_description, descriptor.long_description
+            descriptor.store = world.descriptions
+            descriptor.short_key, descriptor.long_key = (world.descriptions.add(text) for text in texts)
+            location = world.locations.get(location_id)
+            if location is None:
+                parsed.actions = [
+                    action for action in self._actions.values()
+                    if isinstance(action, SingleAction) and action.action_location_id == location_id
+                ]
+                parsed.items = self._load_items(location_id)
+                parsed.index_actions()
+                world.locations[location_id] = parsed
+                report.locations_added += 1
+            else:
+                # The map has not changed, so the directions free on the map are the ones allowed by default,
+                # along with the ones locked by default. Anything else was unlocked by an action.
+                free = parsed.allowed_movements | locks[location_id]
+                unlocked = location.allowed_movements - (free - self._location_locks[location_id])
+                location.descriptor = parsed.descriptor
+                location.points = parsed.points
+                location.allowed_movements = parsed.allowed_movements | unlocked
+                # Directions now allowed by default are no longer unlocked by players.
+                for direction in unlocked & parsed.allowed_movements:
+                    world.state_hash.remove('unlocked', location_id, str(direction))
+                    world.changed.add(location_id)
+                report.locations_changed += 1
+
+        for location_id in self._location_hashes.keys() - hashes.keys():
+            world.locations.pop(location_id, None)
+            report.locations_removed += 1
+        self._location_hashes = hashes
+        self._location_locks = locks
+
+    def _is_mapped(self, location_id: int) -> bool:
+        """Return whether the location with the given id is on the map of the world.
+        """
+        try:
+            self.world.find_location(location_id)
+        except LocationError:
+            return False
+        return True
+
+    def _attach(self, action: Action) -> None:
+        """Make a newly parsed action available in the world.
+        """
+        if isinstance(action, BackgroundAction):
+            self.world.background_actions.append(action)
+        elif isinstance(action, TriggeredAction):
+            self.world.triggers.add(action)
+        elif isinstance(action, SingleAction):
+            location = self.world.locations.get(action.action_location_id)
+            if location is not None:
+                location.actions.append(action)
+                location.index_actions()
+
+    def _detach(self, action: Action) -> None:
+        """Remove an action from the world.
+        """
+        if isinstance(action, BackgroundAction):
+            self.world.background_actions.remove(action)
+        elif isinstance(action, TriggeredAction):
+            self.world.triggers.remove(action)
+        elif isinstance(action, SingleAction):
+            location = self.world.locations.get(action.action_location_id)
+            if location is not None and action in location.actions:
+                location.actions.remove(action)
+                location.index_actions()
+
+    def _reindex(self, action: Action) -> None:
+        """Rebuild the action table holding action, since its name may have changed.
+        """
+        if isinstance(action, SingleAction):
+            location = self.world.locations.get(action.action_location_id)
+            if location is not None:
+                location.index_actions()
+
+    def _load_items(self, location_id: int) -> list[Item]:
+        """Return the items initially lying at the location with the given id.
+        """
+        with open(self.items_path, 'r') as items_data:
+            return [item for item in World.load_items(items_data) if item.location_id == location_id]
+
+    def _modification_times(self) -> tuple[int, int]:
+        """Return the modification times of the watched files.
+        """
+        return os.stat(self.location_path).st_mtime_ns, os.stat(self.actions_path).st_mtime_ns
+
+    @staticmethod
+    def _read_segments(path: str) -> list[list[str]]:
+        """Return the segments of the file at path.
+        """
+        with open(path, 'r') as data:
+            return World.split_segments(data)
+
+
+def _digest(segment: list[str]) -> bytes:
+    """Return the content hash of a segment.
+    """
+    return hashlib.blake2b('\n'.join(segment).encode('utf-8'), digest_size=16).digest()
+
+
+def _key_of(action: Action) -> ActionKey:
+    """Return the key identifying an action already loaded into a world.
+    """
+    if isinstance(action, SingleAction):
+        return action.name.lower(), action.action_location_id
+    return action.name.lower(), -1
+
+
+def _action_key(header: str) -> ActionKey:
+    """Return the key identifying the action declared by the first line of an action segment.
+    """
+    name, _, location_id = header.rpartition(' ')
+    return name.lower(), int(location_id)
+
+
+def _location_id(header: str) -> int:
+    """Return the id of the location declared by the first line of a location segment.
+    """
+    return int(header.split(' ')[1])
+
+
+def _locked_directions(segment: list[str]) -> frozenset[Direction]:
+    """Return the directions locked by default by a location segment.
+    """
+    if len(segment) > 2 and segment[2].startswith("LOCK_DEFAULT"):
+        return frozenset(Direction.from_str(direction) for direction in segment[2].split()[1:])
+    return frozenset()
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={
+        'max-line-length': 120,
+        'extra-imports': ['hashlib', 'os', 'src.actions.action', 'src.actions.linker', 'src.actions.variables',
+                          'src.descriptions', 'src.direction', 'src.errors', 'src.game_data'],
+        'allowed-io': ['WorldReloader.poll', 'WorldReloader.reload', 'WorldReloader._load_items',
+                       'WorldReloader._read_segments']
+    })
@@ -0,0 +1,327 @@
+"""Adventure Game 1: Recording the results of completed games, and the leaderboards of every pack.
+
+Results are appended to a results file as newline-delimited JSON records, which are never rewritten. Each
+pack keeps aggregates that are updated as results are recorded: the best results by points and by fewest
+steps, kept in bounded heaps so that recording a result takes O(log k) time for leaderboards of k results,
+and histograms of points and steps from which percentiles are read. Queries never scan the results file.
+
+The aggregates are saved to a snapshot file next to the results file, along with the size of the results
+file they cover, so that opening a store only reads the results recorded since the last snapshot.
+
+Show the leaderboards and statistics of a results file with:
+
+    python -m src.results <results file> [--pack <name>] [--top <number of results>]
+"""
+from __future__ import annotations
+import heapq
+import json
+import os
+import threading
+from collections import Counter
+from dataclasses import dataclass, asdict
+from typing import Any, Optional
+
+DEFAULT_TOP = 10
+# The number of results recorded between two snapshots of the aggregates.
+DEFAULT_SNAPSHOT_INTERVAL = 1000
+SNAPSHOT_EXTENSION = '.snapshot'
+
+
+@dataclass(slots=True, frozen=True)
+class RunResult:
+    """The result of a completed game.
+
+    Instance Attributes:
+        - pack: The name of the pack played.
+        - steps: The number of steps the player took.
+        - points: The points the player finished with.
+        - victory: Whether the player won.
+        - duration: The number of seconds the game lasted.
+        - finished_at: The time the game ended, in seconds since the epoch.
+
+    Representation Invariants:
+        - self.steps >= 0
+        - self.duration >= 0
+    """
+    pack: str
+    steps: int
+    points: int
+    victory: bool
+    duration: float
+    finished_at: float
+
+
+class PackStatistics:
+    """The aggregates of the results of a pack.
+
+    Instance Attributes:
+        - top: The number of results kept in each leaderboard.
+        - runs: The number of results recorded.
+        - victories: The number of results that were victories.
+        - total_duration: The total number of seconds of the recorded games.
+        - points: The histogram of the points of the recorded results.
+        - steps: The histogram of the steps of the victories.
+
+    Representation Invariants:
+        - 0 <= self.victories <= self.runs
+        - len(self._by_points) <= self.top and len(self._by_steps) <= self.top
+    """
+    top: int
+    runs: int
+    victories: int
+    total_duration: float
+    points: Counter[int]
+    steps: Counter[int]
+    # Min-heaps whose smallest entry is the worst result of the leaderboard, so it is the one replaced.
+    # Entries are (points, -steps, sequence, result) and (-steps, points, sequence, result); sequence breaks
+    # ties in favour of the earlier result.
+    _by_points: list[tuple[int, int, int, RunResult]]
+    _by_steps: list[tuple[int, int, int, RunResult]]
+
+    def __init__(self, top: int = DEFAULT_TOP) -> None:
+        """Initialize the aggregates of a pack without results, keeping top results per leaderboard.
+        """
+        self.top = top
+        self.runs = 0
+        self.victories = 0
+        self.total_duration = 0.0
+        self.points = Counter()
+        self.steps = Counter()
+        self._by_points = []
+        self._by_steps = []
+
+    def add(self, result: RunResult) -> None:
+        """Update the aggregates with a newly recorded result.
+        """
+        sequence = -self.runs
+        self.runs += 1
+        self.total_duration += result.duration
+        self.points[result.points] += 1
+        _push(self._by_points, (result.points, -result.steps, sequence, result), self.top)
+        if result.victory:
+            # Only victories compete for the fewest steps, since losing early is not an achievement.
+            self.victories += 1
+            self.steps[result.steps] += 1
+            _push(self._by_steps, (-result.steps, result.points, sequence, result), self.top)
+
+    def best_by_points(self) -> list[RunResult]:
+        """Return the results with the most points, best first, breaking ties by fewest steps.
+        """
+        return [entry[-1] for entry in sorted(self._by_points, reverse=True)]
+
+    def best_by_steps(self) -> list[RunResult]:
+        """Return the victories with the fewest steps, best first, breaking ties by most points.
+        """
+        return [entry[-1] for entry in sorted(self._by_steps, reverse=True)]
+
+    def points_percentile(self, percentile: float) -> Optional[int]:
+        """Return the points at or below which the given percentage of results fall, or None without results.
+        """
+        return _percentile(self.points, self.runs, percentile)
+
+    def steps_percentile(self, percentile: float) -> Optional[int]:
+        """Return the steps at or below which the given percentage of victories fall, or None without victories.
+        """
+        return _percentile(self.steps, self.victories, percentile)
+
+    def mean_duration(self) -> float:
+        """Return the average number of seconds of the recorded games.
+        """
+        return self.total_duration / self.runs if self.runs != 0 else 0.0
+
+    def to_json(self) -> dict[str, Any]:
+        """Return the aggregates as an object serializable to JSON.
+        """
+        return {
+            'top': self.top,
+            'runs': self.runs,
+            'victories': self.victories,
+            'total_duration': self.total_duration,
+            'points': list(self.points.items()),
+            'steps': list(self.steps.items()),
+            'by_points': [[*entry[:-1], asdict(entry[-1])] for entry in self._by_points],
+            'by_steps': [[*entry[:-1], asdict(entry[-1])] for entry in self._by_steps],
+        }
+
+    @classmethod
+    def from_json(cls, data: dict[str, Any]) -> PackStatistics:
+        """Return the aggregates serialized by to_json.
+        """
+        statistics = cls(data['top'])
+        statistics.runs = data['runs']
+        statistics.victories = data['victories']
+        statistics.total_duration = data['total_duration']
+        statistics.points = Counter(dict(data['points']))
+        statistics.steps = Counter(dict(data['steps']))
+        statistics._by_points = [(*entry[:-1], RunResult(**entry[-1])) for entry in data['by_points']]
+        statistics._by_steps = [(*entry[:-1], RunResult(**entry[-1])) for entry in data['by_steps']]
+        return statistics
+
+
+class ResultStore:
+    """An append-only file of results, along with the aggregates of the results of every pack.
+
+    Instance Attributes:
+        - path: The path of the results file.
+        - top: The number of results kept in each leaderboard.
+        - snapshot_interval: The number of results recorded between two snapshots of the aggregates.
+    """
+    path: str
+    top: int
+    snapshot_interval: int
+    _packs: dict[str, PackStatistics]
+    _size: int
+    _unsaved: int
+    _lock: threading.Lock
+
+    def __init__(
+            self,
+            path: str,
+            top: int = DEFAULT_TOP,
+            snapshot_interval: int = DEFAULT_SNAPSHOT_INTERVAL
+    ) -> None:
+        """Open the results file at path, which is created by the first result recorded, and load the
+        aggregates of its results.
+        """
+        self.path = path
+        self.top = top
+        self.snapshot_interval = snapshot_interval
+        self._packs = {}
+        self._size = 0
+        self._unsaved = 0
+        self._lock = threading.Lock()
+        self._load_snapshot()
+        self._replay()
+
+    def record(self, result: RunResult) -> None:
+        """Append result to the results file, and update the aggregates of its pack.
+        """
+        line = json.dumps(asdict(result), separators=(',', ':')) + '\n'
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as results:
+                results.write(line)
+            self._size += len(line.encode('utf-8'))
+            self._statistics(result.pack).add(result)
+            self._unsaved += 1
+            if self._unsaved >= self.snapshot_interval:
+                self._save_snapshot()
+
+    def packs(self) -> list[str]:
+        """Return the names of the packs with recorded results.
+        """
+        return sorted(self._packs)
+
+    def statistics(self, pack: str) -> PackStatistics:
+        """Return the aggregates of the results of pack.
+        """
+        with self._lock:
+            return self._statistics(pack)
+
+    def close(self) -> None:
+        """Save the aggregates, so the next store opened on the results file starts from them.
+        """
+        with self._lock:
+            if self._unsaved != 0:
+                self._save_snapshot()
+
+    def _statistics(self, pack: str) -> PackStatistics:
+        """Return the aggregates of pack, creating them if the pack has no results yet.
+        """
+        statistics = self._packs.get(pack)
+        if statistics is None:
+            statistics = self._packs[pack] = PackStatistics(self.top)
+        return statistics
+
+    def _load_snapshot(self) -> None:
+        """Load the last snapshot of the aggregates, unless it is missing or kept a different number of
+        results per leaderboard.
+        """
+        try:
+            with open(self.path + SNAPSHOT_EXTENSION, 'r', encoding='utf-8') as snapshot_file:
+                snapshot = json.load(snapshot_file)
+        except (OSError, ValueError):
+            return
+        if snapshot['top'] == self.top:
+            self._size = snapshot['size']
+            self._packs = {pack: PackStatistics.from_json(data) for pack, data in snapshot['packs'].items()}
+
+    def _replay(self) -> None:
+        """Add the results recorded since the last snapshot to the aggregates.
+        """
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'rb') as results:
+            results.seek(self._size)
+            for line in results:
+                if not line.endswith(b'\n'):
+                    # A result whose writing was interrupted.
+                    break
+                self._size += len(line)
+                result = RunResult(**json.loads(line))
+                self._statistics(result.pack).add(result)
+                self._unsaved += 1
+
+    def _save_snapshot(self) -> None:
+        """Replace the snapshot of the aggregates with their current state.
+        """
+        snapshot = {
+            'top': self.top,
+            'size': self._size,
+            'packs': {pack: statistics.to_json() for pack, statistics in self._packs.items()},
+        }
+        temporary_path = self.path + SNAPSHOT_EXTENSION + '.tmp'
+        with open(temporary_path, 'w', encoding='utf-8') as snapshot_file:
+            json.dump(snapshot, snapshot_file, separators=(',', ':'))
+        os.replace(temporary_path, self.path + SNAPSHOT_EXTENSION)
+        self._unsaved = 0
+
+
+def _push(heap: list, entry: tuple, capacity: int) -> None:
+    """Push entry onto a min-heap holding at most capacity entries, dropping the smallest entry if it is full.
+    """
+    if len(heap) < capacity:
+        heapq.heappush(heap, entry)
+    elif entry > heap[0]:
+        heapq.heapreplace(heap, entry)
+
+
+def _percentile(histogram: Counter[int], count: int, percentile: float) -> Optional[int]:
+    """Return the smallest value such that at least percentile percent of the count values of histogram are
+    at most that value, or None if the histogram is empty.
+    """
+    if count == 0:
+        return None
+    rank = max(1, -(-count * percentile // 100))
+    seen = 0
+    for value in sorted(histogram):
+        seen += histogram[value]
+        if seen >= rank:
+            return value
+    return max(histogram)
+
+
+if __name__ == '__main__':
+    from argparse import ArgumentParser
+
+    argument_parser = ArgumentParser(description="Show the leaderboards and statistics of a results file.")
+    argument_parser.add_argument('path', help="the results file")
+    argument_parser.add_argument('--pack', help="the pack to show, instead of every pack")
+    argument_parser.add_argument('--top', type=int, default=DEFAULT_TOP, help="the number of results per leaderboard")
+    arguments = argument_parser.parse_args()
+
+    store = ResultStore(arguments.path, top=arguments.top)
+    for name in [arguments.pack] if arguments.pack is not None else store.packs():
+        pack_statistics = store.statistics(name)
+        print(f"{name}: {pack_statistics.runs} runs, {pack_statistics.victories} victories, "
+              f"{pack_statistics.mean_duration():.1f} s on average")
+        print(f"  points p50 {pack_statistics.points_percentile(50)}  p90 {pack_statistics.points_percentile(90)}  "
+              f"p99 {pack_statistics.points_percentile(99)}")
+        print(f"  steps of victories p50 {pack_statistics.steps_percentile(50)}  "
+              f"p90 {pack_statistics.steps_percentile(90)}  p99 {pack_statistics.steps_percentile(99)}")
+        print("  most points:")
+        for run in pack_statistics.best_by_points():
+            print(f"    {run.points:6} points  {run.steps:4} steps")
+        print("  fewest steps:")
+        for run in pack_statistics.best_by_steps():
+            print(f"    {run.steps:6} steps  {run.points:4} points")
+    store.close()
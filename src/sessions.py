@@ -0,0 +1,329 @@
+"""Adventure Game 1: Hosting many games of a pack in one process, keeping only the active ones in memory.
+
+Every session is the game of one player, with its own changes to the world: visited locations, items lying
+around, unlocked directions, completed actions and world variables. Sessions share a single loaded World,
+which holds the state of the session being played: when another session plays, the locations changed by the
+previous session (see World.changed) are saved into that session and reset to their state when the pack was
+loaded, and the changes of the next session are applied. A session playing several commands in a row is
+therefore never switched, and switching only costs the number of locations either session has changed.
+
+At most max_sessions sessions are kept in memory. The least recently active session is saved to a file in
+the sessions directory when another session would exceed the budget, keeping only its mutable state: its
+player, location and changes. It is loaded again, onto the shared world, the next time it plays a command.
+
+Sessions require every location of the world to be loaded, so regional worlds cannot be shared this way.
+
+The completed flags of the actions of a location are kept by action name, so that a session saved before the
+actions were reloaded still finds its own: actions removed since are ignored, and new ones start not completed.
+"""
+from __future__ import annotations
+import hashlib
+import os
+import pickle
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Hashable, Optional, TextIO
+
+from src.actions.context import STANDARD_CONSOLE, Console
+from src.adventure import arrive, play_turn
+from src.batch import CommandResult, play_batch
+from src.direction import Direction
+from src.fingerprint import StateHash
+from src.game_data import Item, Location, Player
+from src.lru import LRUCache
+from src.packs import Pack
+from src.regions import RegionalWorld
+
+DEFAULT_MAX_SESSIONS = 1000
+SESSION_EXTENSION = '.session'
+
+# The state of a location players may change: whether it was visited, its items, its allowed movements and
+# whether each of its actions was completed, in order, by action name. Background actions may share a name.
+LocationState = tuple[bool, list[Item], set[Direction], dict[str, list[bool]]]
+
+
+@dataclass(slots=True)
+class Session:
+    """The game of one player hosted by a SessionManager.
+
+    Instance Attributes:
+        - session_id: The id of the session.
+        - player: The player of the game.
+        - location: The location of the player.
+        - global_store: The values of the world variables of the game, indexed by slot.
+        - state_hash: The fingerprint of the changes the game made to the world. See World.state_hash.
+        - changes: The state of every location the game has changed, by id, as of the last time the session
+          was switched out of the world.
+    """
+    session_id: Hashable
+    player: Player
+    location: Location
+    global_store: list[int]
+    state_hash: StateHash
+    changes: dict[int, LocationState]
+
+    @property
+    def finished(self) -> bool:
+        """Whether the game is over, because the player has won or has no steps left.
+        """
+        return self.player.victory or self.player.steps >= self.player.max_steps
+
+
+class SessionManager:
+    """The sessions playing a pack, of which at most max_sessions are kept in memory.
+
+    Instance Attributes:
+        - pack: The pack played, whose world is shared by every session.
+        - directory: The directory the sessions evicted from memory are saved in.
+        - max_sessions: The maximum number of sessions kept in memory.
+        - rehydrations: The number of sessions loaded from the sessions directory.
+        - rehydration_seconds: The total number of seconds spent loading sessions from the sessions directory.
+
+    Representation Invariants:
+        - self.max_sessions > 0
+    """
+    pack: Pack
+    directory: str
+    max_sessions: int
+    rehydrations: int
+    rehydration_seconds: float
+    _sessions: LRUCache
+    _initial: dict[int, LocationState]
+    _initial_hash: int
+    _active: Optional[Session]
+    _lock: threading.RLock
+
+    def __init__(self, pack: Pack, directory: str, max_sessions: int = DEFAULT_MAX_SESSIONS) -> None:
+        """Initialize a manager of the sessions playing pack, which must not have been played yet, saving the
+        sessions evicted from memory in directory. Raise ValueError if the world of pack is a regional world.
+        """
+        if isinstance(pack.world, RegionalWorld):
+            raise ValueError("Sessions require every location to be loaded, so regional packs cannot be shared")
+        self.pack = pack
+        self.directory = directory
+        self.max_sessions = max_sessions
+        self.rehydrations = 0
+        self.rehydration_seconds = 0.0
+        os.makedirs(directory, exist_ok=True)
+        self._sessions = LRUCache(max_sessions, on_evict=self._evict)
+        world = pack.world
+        self._initial = {location_id: _capture(location) for location_id, location in world.locations.items()}
+        self._initial_hash = world.state_hash.value
+        world.changed.clear()
+        self._active = None
+        self._lock = threading.RLock()
+
+    def create(self, session_id: Hashable, console: Console = STANDARD_CONSOLE) -> Session:
+        """Start a new game in a session with the given id, showing the player its starting location on console.
+        Raise ValueError if there already is a session with that id.
+        """
+        with self._lock:
+            if session_id in self._sessions or os.path.exists(self._path(session_id)):
+                raise ValueError(f"Session {session_id!r} already exists")
+            world = self.pack.world
+            x, y = world.find_location(self.pack.starting_location_id)
+            session = Session(
+                session_id=session_id,
+                player=Player(x=x, y=y, max_steps=self.pack.max_steps),
+                location=world.get_location(x, y),
+                global_store=[],
+                state_hash=StateHash(self._initial_hash),
+                changes={}
+            )
+            self._sessions.put(session_id, session)
+            self._activate(session)
+            arrive(session.location, session.player, world, console)
+            return session
+
+    def command(
+            self, session_id: Hashable, choice: str, console: Console = STANDARD_CONSOLE
+    ) -> Optional[Location]:
+        """Play the command typed by the player of the session with the given id, where choice is already
+        stripped and lowercase, as the main loop of the game does, showing its output on console. Return the new
+        location of the player if it has changed, and None otherwise. Raise KeyError if there is no such session.
+        """
+        with self._lock:
+            session = self.get(session_id)
+            if session.finished:
+                return None
+            self._activate(session)
+            new_location = play_turn(choice, session.location, session.player, self.pack.world, console)
+            if new_location is not None:
+                session.location = new_location
+            return new_location
+
+    def batch(
+            self,
+            session_id: Hashable,
+            commands: list[str],
+            out: Optional[TextIO] = None,
+            read_answer: Callable[[], str] = input
+    ) -> list[CommandResult]:
+        """Play a batch of commands in the session with the given id, as command does for each command once
+        stripped and lowercase, and return the result of every command played. The output of the batch is
+        written to out at once, if it is given, and the answers to questions are read with read_answer. The
+        batch stops early as described in src.batch. Raise KeyError if there is no such session.
+        """
+        with self._lock:
+            session = self.get(session_id)
+            if session.finished:
+                return []
+            return play_batch(
+                commands, lambda command, console: self.command(session_id, command.strip().lower(), console),
+                lambda: session.finished, out, read_answer
+            )
+
+    def get(self, session_id: Hashable) -> Session:
+        """Return the session with the given id, loading it from the sessions directory if it was evicted
+        from memory. Raise KeyError if there is no such session.
+        """
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = self._load(session_id)
+                self._sessions.put(session_id, session)
+            return session
+
+    def end(self, session_id: Hashable) -> None:
+        """Forget the session with the given id, whether it is in memory or saved.
+        """
+        with self._lock:
+            if session_id in self._sessions:
+                if self._sessions.pop(session_id) is self._active:
+                    self._deactivate()
+            elif os.path.exists(self._path(session_id)):
+                os.remove(self._path(session_id))
+
+    def finished(self, session_id: Hashable) -> bool:
+        """Return whether the game of the session with the given id is over, without counting as a lookup if
+        the session is in memory. Raise KeyError if there is no such session.
+        """
+        with self._lock:
+            session = self._sessions.peek(session_id)
+            return (session if session is not None else self.get(session_id)).finished
+
+    def resident(self) -> int:
+        """Return the number of sessions kept in memory.
+        """
+        return len(self._sessions)
+
+    def resident_sessions(self) -> list[Session]:
+        """Return the sessions kept in memory, from the least to the most recently active.
+        """
+        with self._lock:
+            return self._sessions.values()
+
+    def hit_rate(self) -> float:
+        """Return the fraction of lookups of sessions that found them in memory.
+        """
+        lookups = self._sessions.hits + self._sessions.misses
+        return self._sessions.hits / lookups if lookups != 0 else 1.0
+
+    def mean_rehydration_latency(self) -> float:
+        """Return the average number of seconds spent loading a session from the sessions directory.
+        """
+        return self.rehydration_seconds / self.rehydrations if self.rehydrations != 0 else 0.0
+
+    def _activate(self, session: Session) -> None:
+        """Make the world hold the state of session, switching out the session it holds, if any.
+        """
+        if session is self._active:
+            return
+        if self._active is not None:
+            self._deactivate()
+        world = self.pack.world
+        for location_id, state in session.changes.items():
+            _restore(world.locations[location_id], state)
+        world.global_store = session.global_store
+        world.state_hash = session.state_hash
+        self._active = session
+
+    def _deactivate(self) -> None:
+        """Save the changes the active session made to the world into it, and reset the world to its state
+        when the pack was loaded.
+        """
+        session, world = self._active, self.pack.world
+        for location_id in world.changed:
+            session.changes[location_id] = _capture(world.locations[location_id])
+        world.changed.clear()
+        for location_id in session.changes:
+            _restore(world.locations[location_id], self._initial[location_id])
+        world.global_store = []
+        world.state_hash = StateHash(self._initial_hash)
+        self._active = None
+
+    def _evict(self, session_id: Hashable, session: Session) -> None:
+        """Save a session evicted from memory to the sessions directory.
+        """
+        if session is self._active:
+            self._deactivate()
+        state = (session.session_id, session.player, session.location.descriptor.location_id,
+                 session.global_store, session.state_hash.value, session.changes)
+        path = self._path(session_id)
+        with open(path + '.tmp', 'wb') as session_file:
+            pickle.dump(state, session_file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(path + '.tmp', path)
+
+    def _load(self, session_id: Hashable) -> Session:
+        """Load a session saved to the sessions directory, removing its file.
+        Raise KeyError if there is no such session.
+        """
+        start = time.perf_counter()
+        path = self._path(session_id)
+        try:
+            with open(path, 'rb') as session_file:
+                state = pickle.load(session_file)
+        except FileNotFoundError:
+            raise KeyError(session_id) from None
+        os.remove(path)
+        stored_id, player, location_id, global_store, state_hash, changes = state
+        session = Session(
+            session_id=stored_id,
+            player=player,
+            location=self.pack.world.locations[location_id],
+            global_store=global_store,
+            state_hash=StateHash(state_hash),
+            changes=changes
+        )
+        self.rehydrations += 1
+        self.rehydration_seconds += time.perf_counter() - start
+        return session
+
+    def _path(self, session_id: Hashable) -> str:
+        """Return the path of the file a session is saved to, named after a hash of its id.
+        """
+        name = hashlib.blake2b(repr(session_id).encode('utf-8'), digest_size=16).hexdigest()
+        return os.path.join(self.directory, name + SESSION_EXTENSION)
+
+
+def _capture(location: Location) -> LocationState:
+    """Return a copy of the state of location that players may change.
+    """
+    completed = {}
+    for action in location.actions:
+        completed.setdefault(action.name, []).append(action.completed)
+    return location.already_visited, list(location.items), set(location.allowed_movements), completed
+
+
+def _restore(location: Location, state: LocationState) -> None:
+    """Give location a copy of the state returned by _capture.
+    """
+    visited, items, allowed_movements, completed = state
+    location.already_visited = visited
+    location.items = list(items)
+    location.allowed_movements = set(allowed_movements)
+    flags = {name: iter(action_completed) for name, action_completed in completed.items()}
+    for action in location.actions:
+        action.completed = next(flags.get(action.name, iter(())), False)
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={
+        'max-line-length': 120,
+        'extra-imports': ['hashlib', 'os', 'pickle', 'threading', 'time', 'src.actions.context', 'src.adventure',
+                          'src.batch', 'src.direction', 'src.fingerprint', 'src.game_data', 'src.lru', 'src.packs',
+                          'src.regions'],
+    })
@@ -0,0 +1,179 @@
+"""Adventure Game 1: Sharing the static content of a world between forked worker processes.
+
+Workers forked after a world is loaded (see src.supervisor) start out sharing its pages, but CPython writes to
+every object it touches, to count its references and to collect cycles, so the pages holding the world are
+slowly copied into every worker. share_world moves the bulk of the content that never changes out of Python
+objects and into one flat buffer, in an anonymous shared memory map inherited by the workers, which they only
+ever read:
+
+- the map grid, which World.get_location reads through read-only memoryview rows,
+- the short and long descriptions of every location, shown by Location.visit,
+- the texts of the print instructions of every action, which become print_text instructions, as with
+  World.compress_texts.
+
+SharedDescriptions is the DescriptionStore reading texts from the buffer, keeping only recently shown text as
+strings in a bounded cache. Texts added once the world is shared, such as the descriptions of reloaded
+locations, are kept in the memory of the process adding them.
+
+What players change stays on the locations and actions: their allowed movements, items, visits and completion
+are copied into every session anyway (see src.sessions).
+"""
+from __future__ import annotations
+import mmap
+import struct
+from array import array
+from typing import TYPE_CHECKING
+
+from src.actions.instruction import PRINT_TEXT
+from src.descriptions import DEFAULT_CACHE_SIZE, DescriptionStore
+from src.lru import LRUCache
+
+if TYPE_CHECKING:
+    from src.game_data import World
+
+# The buffer starts with a header holding its magic number, the number of rows of the map and the number of
+# texts, followed by the offsets of the rows, in cells, and of the texts, in bytes, then by the cells of the map
+# and the UTF-8 encoded texts.
+_HEADER = struct.Struct('<4sQQ')
+_MAGIC = b'ASC1'
+
+
+class SharedDescriptions(DescriptionStore):
+    """A store reading the texts exported to a SharedContent buffer, without copying them until they are
+    fetched.
+
+    Instance Attributes:
+        - cache: The cache of recently fetched texts.
+
+    Representation Invariants:
+        - len(self._offsets) >= 1
+    """
+    cache: LRUCache
+    _texts: memoryview
+    _offsets: memoryview
+    _added: list[str]
+
+    def __init__(self, texts: memoryview, offsets: memoryview, cache_size: int = DEFAULT_CACHE_SIZE) -> None:
+        """Initialize a store reading the encoded texts in texts, where text i spans the bytes from offsets[i]
+        to offsets[i + 1].
+        """
+        self.cache = LRUCache(cache_size)
+        self._texts = texts
+        self._offsets = offsets
+        self._added = []
+
+    def add(self, text: str) -> int:
+        self._added.append(text)
+        return len(self._offsets) - 2 + len(self._added)
+
+    def fetch(self, key: int) -> str:
+        shared = len(self._offsets) - 1
+        if key >= shared:
+            return self._added[key - shared]
+        text = self.cache.get(key)
+        if text is None:
+            text = str(self._texts[self._offsets[key]:self._offsets[key + 1]], 'utf-8')
+            self.cache.put(key, text)
+        return text
+
+    def close(self) -> None:
+        self._texts.release()
+        self._offsets.release()
+
+
+class SharedContent:
+    """The static content of a world, exported to a flat buffer in an anonymous shared memory map.
+
+    Instance Attributes:
+        - rows: Read-only views of the rows of the map grid.
+        - descriptions: The store of the texts in the buffer.
+        - size: The number of bytes of the buffer.
+    """
+    rows: list[memoryview]
+    descriptions: SharedDescriptions
+    size: int
+    _buffer: mmap.mmap
+
+    def __init__(self, grid: list[list[int]], texts: list[str], cache_size: int = DEFAULT_CACHE_SIZE) -> None:
+        """Export grid and texts to a new buffer, whose texts are fetched from descriptions with their index.
+        """
+        row_offsets = array('Q', [0])
+        for row in grid:
+            row_offsets.append(row_offsets[-1] + len(row))
+        cells = array('i', (cell for row in grid for cell in row))
+        encoded = [text.encode('utf-8') for text in texts]
+        text_offsets = array('Q', [0])
+        for data in encoded:
+            text_offsets.append(text_offsets[-1] + len(data))
+
+        cells_start = _HEADER.size + 4 + (len(row_offsets) + len(text_offsets)) * 8
+        texts_start = cells_start + len(cells) * cells.itemsize
+        self.size = texts_start + text_offsets[-1]
+        self._buffer = mmap.mmap(-1, max(self.size, 1))
+        self._buffer.write(_HEADER.pack(_MAGIC, len(grid), len(texts)) + bytes(4))
+        self._buffer.write(row_offsets.tobytes())
+        self._buffer.write(text_offsets.tobytes())
+        self._buffer.write(cells.tobytes())
+        for data in encoded:
+            self._buffer.write(data)
+
+        view = memoryview(self._buffer).toreadonly()
+        start = _HEADER.size + 4
+        rows = view[start:start + len(row_offsets) * 8].cast('Q')
+        start += len(row_offsets) * 8
+        offsets = view[start:start + len(text_offsets) * 8].cast('Q')
+        cell_view = view[cells_start:texts_start].cast('i')
+        self.rows = [cell_view[rows[y]:rows[y + 1]] for y in range(len(grid))]
+        self.descriptions = SharedDescriptions(view[texts_start:self.size], offsets, cache_size)
+        rows.release()
+
+    def close(self) -> None:
+        """Release the views of the buffer and unmap it. The world sharing it must not be used anymore.
+        """
+        for row in self.rows:
+            row.release()
+        self.descriptions.close()
+        self._buffer.close()
+
+
+def share_world(world: World, cache_size: int = DEFAULT_CACHE_SIZE) -> SharedContent:
+    """Export the map, the descriptions and the printed texts of world to a SharedContent buffer, and make world
+    read them from it. At most cache_size texts are kept as strings. Return the buffer, which must outlive world.
+    """
+    locations = list(world.locations.values())
+    texts = [
+        text for location in locations
+        for text in (location.descriptor.short_description, location.descriptor.long_description)
+    ]
+    messages = []
+    for action in world.all_actions():
+        for instruction in action.instructions:
+            if instruction.operation == 'print':
+                messages.append(instruction)
+                texts.append(' '.join(str(argument) for argument in instruction.arguments))
+            elif instruction.operation == PRINT_TEXT:
+                messages.append(instruction)
+                texts.append(world.descriptions.fetch(instruction.arguments[0]))
+
+    content = SharedContent(world.map, texts, cache_size)
+    store = content.descriptions
+    for i, location in enumerate(locations):
+        descriptor = location.descriptor
+        descriptor.store, descriptor.short_key, descriptor.long_key = store, 2 * i, 2 * i + 1
+    for key, message in enumerate(messages, 2 * len(locations)):
+        message.operation = PRINT_TEXT
+        message.arguments = [key]
+    world.descriptions.close()
+    world.descriptions = store
+    world.map = content.rows
+    return content
+
+
+if __name__ == '__main__':
+    import python_ta
+
+    python_ta.check_all(config={
+        'max-line-length': 120,
+        'extra-imports': ['mmap', 'struct', 'array', 'src.actions.instruction', 'src.descriptions', 'src.lru',
+                          'src.game_data'],
+    })
@@ -0,0 +1,431 @@
+"""Adventure Game 1: Hosting players over TCP from several worker processes sharing one loaded pack.
+
+The supervisor loads the pack, then forks workers, which inherit the loaded world: its pages are shared copy on
+write between the workers rather than loaded once per process, and only the pages a worker writes to are copied.
+The static content of the world is first moved to shared memory (see src.shared_content), so that those pages
+are not copied as the workers read it.
+Each worker hosts the sessions of its shard in a SessionManager (see src.sessions), so regional packs, which
+never hold every location, cannot be served. A session is pinned to the
+worker crc32(id) % workers, so that every command of a player is played by the worker holding its state, and the
+supervisor relays the commands of every connection to the worker of its session over a pipe.
+
+The supervisor never plays, so its world stays as it was loaded. A worker that crashes is forked again from it
+with the same sessions directory: the sessions of other shards are unaffected, and the sessions the crashed
+worker had saved to disk are found again by its replacement, while those it held in memory are lost.
+
+Players connect with any line-based client, such as netcat, send the id of their session on the first line,
+which resumes the session if it exists, then one command or batch of commands per line. A player who quits ends
+their session, so that the same id starts a new game on the next connection. While a worker waits for the answer
+to a question asked by an action, the other sessions of its shard wait as well, so a question left unanswered for
+PROMPT_TIMEOUT seconds is answered with an empty line.
+
+Workers are created with os.fork, so the supervisor only runs on POSIX systems. Run it from the root of the
+repository with:
+
+    python -m src.supervisor [--data <pack>] [--workers <number>] [--port <port>]
+        [--sessions-directory <directory>] [--max-sessions <number per worker>]
+"""
+from __future__ import annotations
+import gc
+import io
+import os
+import signal
+import socket
+import socketserver
+import threading
+import traceback
+import warnings
+import zlib
+from argparse import ArgumentParser
+from dataclasses import dataclass
+from multiprocessing.connection import Connection, Pipe
+from typing import Callable, Optional
+
+from src import events
+from src.actions.context import Console
+from src.adventure import game_ending
+from src.batch import split_batch
+from src.packs import DEFAULT_DATA_DIRECTORY, REGIONS_EXTENSION, Pack, load_pack
+from src.regions import RegionalWorld
+from src.sessions import DEFAULT_MAX_SESSIONS, SessionManager
+from src.shared_content import SharedContent, share_world
+
+DEFAULT_PORT = 4000
+PROMPT_TIMEOUT = 60.0
+
+# The messages exchanged with workers. The supervisor sends (OPEN or PLAY, session id, text); the worker answers
+# with (PROMPT, output so far) whenever an action asks a question, which the supervisor answers with the line
+# typed by the player, and with (DONE, output, whether the game is over) once the request has been played.
+OPEN, PLAY, PROMPT, DONE = 'open', 'play', 'prompt', 'done'
+
+LOST_WORKER_MESSAGE = "The server lost the worker playing your game, which is being restarted. Please try again.\n"
+REQUEST_ERROR_MESSAGE = "\nThe server could not play your command. Please try again.\n"
+NO_SESSION_MESSAGE = "Your game has ended or was lost by the server. Reconnect to start a new one.\n"
+
+
+@dataclass(slots=True)
+class Worker:
+    """A worker process hosting the sessions of one shard.
+
+    Instance Attributes:
+        - index: The shard of the worker.
+        - pid: The process id of the worker.
+        - connection: The end of the pipe to the worker held by the supervisor.
+        - lock: The lock held while a request is relayed to the worker, since it plays one request at a time.
+    """
+    index: int
+    pid: int
+    connection: Connection
+    lock: threading.Lock
+
+
+class _RemotePlayer:
+    """The player of the request a worker plays, whose output is collected, and sent to the supervisor when an
+    action asks a question, along with the question. The answer of the player is read from the supervisor.
+    """
+    output: io.StringIO
+    sent: int
+    _connection: Connection
+
+    def __init__(self, connection: Connection) -> None:
+        """Initialize the player of the requests received on connection.
+        """
+        self._connection = connection
+        self.start(io.StringIO())
+
+    def start(self, output: io.StringIO) -> None:
+        """Start a request whose output is written to output.
+        """
+        self.output = output
+        self.sent = 0
+
+    def console(self) -> Console:
+        """Return the console showing the request to the player.
+        """
+        return Console(output=self.output, reader=self.ask)
+
+    def ask(self, question: str) -> str:
+        """Send the output of the request not yet sent followed by question, then return the answer of the player.
+        """
+        self.output.write(question)
+        return self.read_answer()
+
+    def read_answer(self) -> str:
+        """Send the output of the request not yet sent, then return the answer of the player.
+        """
+        self._connection.send((PROMPT, self.unsent()))
+        return self._connection.recv()
+
+    def unsent(self) -> str:
+        """Return the output of the request not yet sent, counting it as sent.
+        """
+        text = self.output.getvalue()
+        unsent, self.sent = text[self.sent:], len(text)
+        return unsent
+
+
+class Supervisor:
+    """The supervisor of the worker processes hosting the sessions of a pack.
+
+    Instance Attributes:
+        - pack: The pack played, loaded before the workers are forked.
+        - directory: The directory holding the sessions directory of every worker.
+        - max_sessions: The maximum number of sessions each worker keeps in memory.
+        - restarts: The number of workers forked again after they exited.
+        - content: The static content of the world shared by the workers, or None if it is not shared.
+        - sockets: The sockets of the supervisor accepting and talking to players, which workers close once
+          forked.
+
+    Representation Invariants:
+        - len(self._workers) > 0
+    """
+    pack: Pack
+    directory: str
+    max_sessions: int
+    restarts: int
+    content: Optional[SharedContent]
+    sockets: set[socket.socket]
+    _workers: list[Optional[Worker]]
+    _stopping: bool
+
+    def __init__(
+            self,
+            pack: Pack,
+            workers: int,
+            directory: str,
+            max_sessions: int = DEFAULT_MAX_SESSIONS,
+            share_content: bool = True
+    ) -> None:
+        """Initialize the supervisor of the given number of workers hosting the sessions of pack, each saving
+        its sessions in a directory of its own under directory. No worker is forked until start is called.
+        If share_content is True, the static content of the world is moved to shared memory (see
+        src.shared_content). Raise ValueError if the world of pack is a regional world.
+        """
+        if isinstance(pack.world, RegionalWorld):
+            raise ValueError("Workers need every location to be loaded, so regional packs cannot be served")
+        self.pack = pack
+        self.directory = directory
+        self.max_sessions = max_sessions
+        self.restarts = 0
+        self.content = share_world(pack.world) if share_content else None
+        self.sockets = set()
+        self._workers = [None] * workers
+        self._stopping = False
+
+    def start(self) -> None:
+        """Fork every worker.
+        """
+        for index in range(len(self._workers)):
+            self._spawn(index)
+
+    def shard(self, session_id: str) -> int:
+        """Return the index of the worker hosting the session with the given id.
+        """
+        return zlib.crc32(session_id.encode('utf-8')) % len(self._workers)
+
+    def request(self, kind: str, session_id: str, text: str, ask: Callable[[str], str]) -> tuple[str, bool]:
+        """Have the worker of the session with the given id play a request of the given kind: OPEN to create or
+        resume the session, or PLAY to play text, a command or a batch of commands. Whenever an action asks a
+        question, call ask with the output so far and send back the answer it returns. Return the rest of the
+        output and whether the game is over.
+        """
+        worker = self._workers[self.shard(session_id)]
+        if worker is None:
+            return LOST_WORKER_MESSAGE, False
+        with worker.lock:
+            try:
+                worker.connection.send((kind, session_id, text))
+                message = worker.connection.recv()
+                while message[0] == PROMPT:
+                    worker.connection.send(ask(message[1]))
+                    message = worker.connection.recv()
+            except (EOFError, OSError):
+                return LOST_WORKER_MESSAGE, False
+        _, output, finished = message
+        return output, finished
+
+    def watch(self) -> None:
+        """Wait for workers to exit, forking each of them again, until stop is called.
+        """
+        while not self._stopping:
+            try:
+                pid, _ = os.wait()
+            except ChildProcessError:
+                return
+            for worker in self._workers:
+                if worker is not None and worker.pid == pid and not self._stopping:
+                    worker.connection.close()
+                    self.restarts += 1
+                    self._spawn(worker.index)
+
+    def stop(self) -> None:
+        """Terminate every worker.
+        """
+        self._stopping = True
+        for worker in self._workers:
+            if worker is not None:
+                worker.connection.close()
+                try:
+                    os.kill(worker.pid, signal.SIGTERM)
+                except ProcessLookupError:
+                    pass
+
+    def _spawn(self, index: int) -> None:
+        """Fork the worker of the given shard.
+        """
+        # Objects alive when the worker is forked are never collected by the worker, so that collections do
+        # not write to, and copy, the pages they share with the other workers.
+        gc.freeze()
+        supervisor_end, worker_end = Pipe()
+        with warnings.catch_warnings():
+            # Workers forked again while the supervisor runs threads only use their own pipe and the world, never
+            # the locks those threads may hold.
+            warnings.simplefilter('ignore', DeprecationWarning)
+            pid = os.fork()
+        if pid == 0:
+            status = 1
+            try:
+                signal.signal(signal.SIGINT, signal.SIG_IGN)
+                signal.signal(signal.SIGTERM, signal.SIG_DFL)
+                supervisor_end.close()
+                for worker in self._workers:
+                    if worker is not None:
+                        worker.connection.close()
+                # The sockets are detached rather than closed, since the files reading them would keep them open.
+                for player_socket in list(self.sockets):
+                    descriptor = player_socket.detach()
+                    if descriptor >= 0:
+                        os.close(descriptor)
+                directory = os.path.join(self.directory, f'worker-{index}')
+                serve_worker(SessionManager(self.pack, directory, self.max_sessions), worker_end)
+                status = 0
+            except Exception:
+                traceback.print_exc()
+            finally:
+                # The worker exits without running atexit handlers, so its event log is closed here.
+                events.close_log()
+                os._exit(status)
+        worker_end.close()
+        self._workers[index] = Worker(index=index, pid=pid, connection=supervisor_end, lock=threading.Lock())
+
+
+def serve_worker(manager: SessionManager, connection: Connection) -> None:
+    """Play the requests received on connection in the sessions of manager, until the supervisor closes it.
+    """
+    remote = _RemotePlayer(connection)
+    while True:
+        try:
+            kind, session_id, text = connection.recv()
+        except EOFError:
+            return
+        remote.start(io.StringIO())
+        try:
+            finished = _play_request(manager, kind, session_id, text, remote)
+        except BaseException:
+            # Only the request fails: its player is told, and the worker keeps serving the other sessions.
+            traceback.print_exc()
+            remote.output.write(REQUEST_ERROR_MESSAGE)
+            finished = False
+        try:
+            connection.send((DONE, remote.unsent(), finished))
+        except OSError:
+            return
+
+
+def _play_request(manager: SessionManager, kind: str, session_id: str, text: str, remote: _RemotePlayer) -> bool:
+    """Play a request of the given kind in the session with the given id of manager, as Supervisor.request
+    describes, for the player remote. Return whether the game of the session is over.
+
+    Only OPEN creates a session. A player who quits ends their session, rather than the worker.
+    """
+    output = remote.output
+    try:
+        if kind == OPEN:
+            try:
+                manager.get(session_id)
+            except KeyError:
+                manager.create(session_id, remote.console())
+            else:
+                manager.command(session_id, 'look', remote.console())
+        else:
+            try:
+                manager.get(session_id)
+            except KeyError:
+                output.write(NO_SESSION_MESSAGE)
+                return True
+            manager.batch(session_id, split_batch(text), output, remote.read_answer)
+    except SystemExit:
+        manager.end(session_id)
+        return True
+    finished = manager.finished(session_id)
+    if finished:
+        output.write(game_ending(manager.get(session_id).player) + '\n')
+    return finished
+
+
+class _PlayerHandler(socketserver.StreamRequestHandler):
+    """Relays the commands of a connected player to the worker of its session."""
+    server: _PlayerServer
+
+    def handle(self) -> None:
+        """Read the id of the session, then play every line received until the game is over or the player
+        disconnects.
+        """
+        session_id = self.rfile.readline().decode('utf-8', 'replace').strip()
+        if session_id == '':
+            return
+        output, finished = self.server.supervisor.request(OPEN, session_id, '', self._ask)
+        self._write(output)
+        while not finished:
+            self._write("\nEnter action: ")
+            line = self.rfile.readline()
+            if line == b'':
+                return
+            output, finished = self.server.supervisor.request(
+                PLAY, session_id, line.decode('utf-8', 'replace').strip().lower(), self._ask
+            )
+            self._write(output)
+
+    def _ask(self, question: str) -> str:
+        """Send the output ending with question to the player, and return the answer, or an empty answer if
+        none comes within PROMPT_TIMEOUT seconds.
+        """
+        self._write(question)
+        self.connection.settimeout(PROMPT_TIMEOUT)
+        try:
+            return self.rfile.readline().decode('utf-8', 'replace').strip()
+        except TimeoutError:
+            return ''
+        finally:
+            self.connection.settimeout(None)
+
+    def _write(self, text: str) -> None:
+        """Send text to the player.
+        """
+        self.wfile.write(text.encode('utf-8'))
+
+
+class _PlayerServer(socketserver.ThreadingTCPServer):
+    """The server accepting the connections of players, each handled by a thread of the supervisor."""
+    daemon_threads = True
+    allow_reuse_address = True
+    supervisor: Supervisor
+
+    def process_request(self, request: socket.socket, client_address: tuple[str, int]) -> None:
+        """Track the socket of a connected player until it is closed, then handle it in a new thread.
+        """
+        self.supervisor.sockets.add(request)
+        super().process_request(request, client_address)
+
+    def close_request(self, request: socket.socket) -> None:
+        """Close the socket of a player, which is no longer tracked.
+        """
+        self.supervisor.sockets.discard(request)
+        super().close_request(request)
+
+
+def serve(supervisor: Supervisor, port: int, host: str = '127.0.0.1') -> None:
+    """Fork the workers of supervisor, then accept players at host:port until interrupted.
+    """
+    # Workers are first forked before any thread is started.
+    supervisor.start()
+    server = _PlayerServer((host, port), _PlayerHandler)
+    server.supervisor = supervisor
+    supervisor.sockets.add(server.socket)
+    threading.Thread(target=server.serve_forever, name='players', daemon=True).start()
+    try:
+        supervisor.watch()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+        server.server_close()
+        supervisor.stop()
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description="Host players over TCP from several worker processes.")
+    parser.add_argument('--data', default=DEFAULT_DATA_DIRECTORY, help="the pack to play")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="the number of worker processes")
+    parser.add_argument('--host', default='127.0.0.1', help="the address to accept players on")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help="the port to accept players on")
+    parser.add_argument('--sessions-directory', default='sessions', help="the directory sessions are saved in")
+    parser.add_argument('--max-sessions', type=int, default=DEFAULT_MAX_SESSIONS,
+                        help="the number of sessions each worker keeps in memory")
+    parser.add_argument('--private-content', action='store_true',
+                        help="keep the static content of the world in the objects of each worker, not in shared memory")
+    arguments = parser.parse_args()
+
+    if arguments.data.endswith(REGIONS_EXTENSION):
+        parser.error("--data cannot be a region file, since workers need every location to be loaded")
+    serve(
+        Supervisor(
+            load_pack(arguments.data),
+            arguments.workers,
+            arguments.sessions_directory,
+            arguments.max_sessions,
+            not arguments.private_content
+        ),
+        arguments.port,
+        arguments.host
+    )
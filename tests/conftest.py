@@ -0,0 +1,17 @@
+"""Adventure Game 1: Fixtures shared by the tests.
+"""
+import shutil
+from pathlib import Path
+
+import pytest
+
+GAMEDATA = Path(__file__).parent.parent / 'gamedata'
+
+
+@pytest.fixture
+def pack_directory(tmp_path: Path) -> Path:
+    """Return a copy of the data directory of the game, which a test may change.
+    """
+    directory = tmp_path / 'gamedata'
+    shutil.copytree(GAMEDATA, directory)
+    return directory
@@ -0,0 +1,100 @@
+"""Adventure Game 1: Tests of compiling and executing ActionScript.
+"""
+import io
+from pathlib import Path
+
+import pytest
+
+from src.actions.action import SingleAction
+from src.actions.context import Console, Context
+from src.actions.parser import ActionScriptParser
+from src.actions.variables import VariableSlot, VariableTable
+from src.errors import ActionScriptSyntaxError
+from src.game_data import Player, World
+from src.packs import load_directory
+
+
+@pytest.fixture
+def world(pack_directory: Path) -> World:
+    """Return the world of the game.
+    """
+    return load_directory(str(pack_directory)).world
+
+
+def run(world: World, player: Player, lines: list[str]) -> tuple[bool, str]:
+    """Compile lines into an action at the starting location of world, and run it once for player. Return whether
+    it succeeded, along with what it printed.
+    """
+    action = SingleAction('Test Action', 1, ActionScriptParser(lines, world.variables).compile())
+    output = io.StringIO()
+    context = Context(world=world, player=player, location=world.locations[1], console=Console(output=output))
+    success = action.execute(context, shallow=False)
+    return success, output.getvalue()
+
+
+def test_variables_are_assigned_slots_by_scope() -> None:
+    table = VariableTable()
+    assert table.resolve('Coins') == VariableSlot(is_global=False, index=0)
+    assert table.resolve('global.bells') == VariableSlot(is_global=True, index=0)
+    assert table.resolve('gems') == VariableSlot(is_global=False, index=1)
+    assert table.resolve('COINS') == VariableSlot(is_global=False, index=0)
+    copy = table.copy()
+    copy.resolve('global.gongs')
+    assert table.global_names == ['global.bells']
+    table.update(copy)
+    assert table.resolve('global.gongs') == copy.resolve('global.gongs')
+
+
+def test_player_variables_are_separate_and_world_variables_shared(world: World) -> None:
+    alice, bob = Player(x=0, y=0, max_steps=50), Player(x=0, y=0, max_steps=50)
+    for player in (alice, bob, alice):
+        run(world, player, ['$add_var("coins", 2)', '$add_var("global.bells", 1)'])
+    assert run(world, alice, ['$var_equals("coins", 4)'])[0]
+    assert run(world, bob, ['$var_equals("coins", 2)'])[0]
+    assert run(world, bob, ['$var_at_least("global.bells", 3)', '$var_less_than("global.bells", 4)'])[0]
+
+
+def test_failed_comparisons_run_the_failure_lines(world: World) -> None:
+    player = Player(x=0, y=0, max_steps=50)
+    success, output = run(world, player, ['$set_var("coins", 1)', '$var_at_least("coins", 3)',
+                                          '#print("You need at least 3 coins.")', '$print("Unreachable")'])
+    assert not success and output == 'You need at least 3 coins.\n'
+
+
+def test_variable_operations_need_a_name_and_an_integer(world: World) -> None:
+    with pytest.raises(ActionScriptSyntaxError):
+        ActionScriptParser(['$set_var("coins")'], world.variables).compile()
+    with pytest.raises(ActionScriptSyntaxError):
+        ActionScriptParser(['$add_var(3, 3)'], world.variables).compile()
+
+
+def test_blocks_are_compiled_to_jumps(world: World) -> None:
+    lines = ['$if has_item("Hammer")', '$print("fix")', '$else', '$print("no hammer")', '$return', '$end',
+             '$print("done")']
+    instructions = ActionScriptParser(lines, world.variables).compile()
+    assert [str(instruction) for instruction in instructions] == [
+        '$if has_item("Hammer") else jump(3)', '$print("fix")', '$jump(5)', '$print("no hammer")', '$return()',
+        '$print("done")'
+    ]
+
+
+@pytest.mark.parametrize('coins, expected', [
+    (0, 'none\nafter\n'), (1, 'one\nafter\n'), (2, 'many\n'), (5, 'many\n')
+])
+def test_nested_blocks_run_one_branch(world: World, coins: int, expected: str) -> None:
+    player = Player(x=0, y=0, max_steps=50)
+    lines = [f'$set_var("coins", {coins})',
+             '$if var_at_least("coins", 1)',
+             '$if not var_equals("coins", 1)', '$print("many")', '$return', '$else', '$print("one")', '$end',
+             '$else', '$print("none")', '$end',
+             '$print("after")']
+    assert run(world, player, lines) == (True, expected)
+
+
+@pytest.mark.parametrize('lines', [
+    ['$if has_item("Hammer")'], ['$end'], ['$if has_item("Hammer")', '$else', '$else', '$end'],
+    ['$if has_item("Hammer")', '+end'], ['#if has_item("Hammer")', '#end'], ['#return']
+])
+def test_malformed_blocks_are_rejected(world: World, lines: list[str]) -> None:
+    with pytest.raises(ActionScriptSyntaxError):
+        ActionScriptParser(lines, world.variables).compile()
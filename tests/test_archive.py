@@ -0,0 +1,46 @@
+"""Adventure Game 1: Tests of content archives.
+"""
+from pathlib import Path
+
+import pytest
+
+from src.archive import ContentArchive, pack_directory as pack_archive
+from src.packs import load_archive, load_directory
+
+DUPLICATE_ACTIONS = '''
+Hammer Deduction -1
+$has_item("Hammer")
+$take_points(2)
+END
+'''
+
+
+def action_texts(world: object) -> list[tuple[str, list[str]]]:
+    """Return the name and instructions of every action of world, in order.
+    """
+    return [(action.name, [str(i) for i in action.instructions]) for action in world.all_actions()]
+
+
+@pytest.mark.parametrize('compress', [False, True])
+def test_archives_load_the_world_they_were_packed_from(
+        pack_directory: Path, tmp_path: Path, compress: bool
+) -> None:
+    with open(pack_directory / 'actions.txt', 'a') as actions_file:
+        actions_file.write(DUPLICATE_ACTIONS)
+    pack_archive(str(pack_directory), str(tmp_path / 'campus.archive'), compress=compress)
+    expected = load_directory(str(pack_directory)).world
+    world = load_archive(str(tmp_path / 'campus.archive')).world
+    assert sorted(world.locations) == sorted(expected.locations)
+    assert action_texts(world) == action_texts(expected)
+
+
+def test_actions_sharing_a_name_are_all_kept(pack_directory: Path, tmp_path: Path) -> None:
+    with open(pack_directory / 'actions.txt', 'a') as actions_file:
+        actions_file.write(DUPLICATE_ACTIONS)
+    pack_archive(str(pack_directory), str(tmp_path / 'campus.archive'))
+    with ContentArchive(str(tmp_path / 'campus.archive')) as archive:
+        assert archive.action_keys().count(('hammer deduction', -1)) == 2
+        segments = archive.read_actions('HAMMER DEDUCTION', -1)
+        assert [segment[-1] for segment in segments] == ['$take_points(1)', '$take_points(2)']
+        with pytest.raises(KeyError):
+            archive.read_actions('Hammer Deduction', 3)
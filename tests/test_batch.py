@@ -0,0 +1,67 @@
+"""Adventure Game 1: Tests of batches of commands.
+"""
+import io
+import threading
+from pathlib import Path
+from typing import Optional
+
+from src.actions.context import Console
+from src.adventure import game_over, play_turn
+from src.batch import play_batch, split_batch
+from src.game_data import Location, Player
+from src.packs import load_directory
+from src.sessions import SessionManager
+
+FRONT_DESK = ['go west', 'go north', 'go west', 'go west', 'go south', 'go west', 'talk to the front desk', 'look']
+
+
+def test_batches_are_split_on_semicolons() -> None:
+    assert split_batch(' go west ;; look;') == ['go west', 'look']
+
+
+def test_concurrent_batches_keep_their_own_output(pack_directory: Path) -> None:
+    barrier = threading.Barrier(2)
+    results = {}
+
+    def play_game(name: str, commands: list[str]) -> None:
+        pack = load_directory(str(pack_directory))
+        world = pack.world
+        player_location = world.locations[pack.starting_location_id]
+        x, y = world.find_location(pack.starting_location_id)
+        player = Player(x=x, y=y, max_steps=pack.max_steps)
+
+        def play(command: str, console: Console) -> Optional[Location]:
+            nonlocal player_location
+            # Both batches are playing when either prints.
+            barrier.wait(timeout=5)
+            new_location = play_turn(command, player_location, player, world, console)
+            player_location = player_location if new_location is None else new_location
+            return new_location
+
+        results[name] = play_batch(commands, play, lambda: game_over(player))
+
+    threads = [threading.Thread(target=play_game, args=('score', ['score'] * 20)),
+               threading.Thread(target=play_game, args=('steps', ['steps'] * 20))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert all(result.output == 'Your score is 0!\n' for result in results['score'])
+    assert all(result.output == 'You have 0/50 steps\n' for result in results['steps'])
+
+
+def test_questions_stop_the_batch_and_are_answered(pack_directory: Path, tmp_path: Path) -> None:
+    manager = SessionManager(load_directory(str(pack_directory)), str(tmp_path / 'sessions'))
+    manager.create('alice', Console(output=io.StringIO()))
+    out = io.StringIO()
+    answers = []
+
+    def read_answer() -> str:
+        answers.append(out.getvalue())
+        return 'Bumbly'
+
+    results = manager.batch('alice', FRONT_DESK, out, read_answer)
+    assert len(results) == len(FRONT_DESK) - 1 and results[-1].prompted
+    assert len(answers) == 1 and answers[0].endswith('> ')
+    assert 'cheat sheet' in out.getvalue()[len(answers[0]):]
+    assert any(item.name == 'Cheat Sheet' for item in manager.get('alice').player.inventory)
@@ -0,0 +1,83 @@
+"""Adventure Game 1: Tests of the command table, the prefix table it is built on and direction names.
+"""
+from types import SimpleNamespace
+
+import pytest
+
+from src.actions.context import STANDARD_CONSOLE
+from src.commands import CommandTable
+from src.direction import Direction
+from src.errors import InvalidDirection
+from src.prefix_table import PrefixTable
+
+
+def make_table(actions: dict[str, str]) -> tuple[CommandTable, list[tuple[str, str]], SimpleNamespace]:
+    """Return a command table recording the commands it runs, along with the record and a context whose
+    location has the given actions, by lowercase name.
+    """
+    played = []
+    table = CommandTable(lambda action, _context: played.append(('action', action)))
+    table.register(lambda arguments, _context: played.append(('go', arguments)), 'go', takes_arguments=True)
+    for verb in ('look', 'score', 'steps', 'inventory'):
+        table.register(lambda _arguments, _context, name=verb: played.append((name, '')), verb)
+    context = SimpleNamespace(location=SimpleNamespace(action_table=PrefixTable(actions)), console=STANDARD_CONSOLE)
+    return table, played, context
+
+
+def test_prefix_table_resolves_exact_keys_before_prefixes() -> None:
+    table = PrefixTable({'north': 1, 'n': 1, 'nor': 2})
+    assert table.resolve('n') == 1
+    assert table.resolve('nor') == 2
+    assert table.resolve('no') is None
+    assert table.has_prefix('no')
+    assert not table.has_prefix('x')
+
+
+def test_verbs_resolve_exactly_then_by_prefix() -> None:
+    table, played, context = make_table({'look around': 'look around'})
+    table.dispatch('look', context)
+    table.dispatch('look around', context)
+    table.dispatch('inv', context)
+    table.dispatch('go east', context)
+    assert played == [('look', ''), ('action', 'look around'), ('inventory', ''), ('go', 'east')]
+
+
+def test_single_letters_do_not_run_actions() -> None:
+    table, played, context = make_table({'say hi to the barista': 'say', 'talk to the front desk': 'talk'})
+    table.dispatch('t', context)
+    table.dispatch('ta', context)
+    assert played == []
+    table.dispatch('tal', context)
+    assert played == [('action', 'talk')]
+
+
+def test_ambiguous_verbs_do_not_complete_actions() -> None:
+    table, played, context = make_table({'star gazing': 'star'})
+    for verb in ('start', 'stare'):
+        table.register(lambda _arguments, _context, name=verb: played.append((name, '')), verb)
+    table.dispatch('sta', context)
+    table.dispatch('star g', context)
+    assert played == []
+    table.dispatch('star gazing', context)
+    assert played == [('action', 'star')]
+
+
+def test_unknown_commands_are_reported(capsys: pytest.CaptureFixture) -> None:
+    table, played, context = make_table({})
+    table.dispatch('dance', context)
+    assert played == []
+    assert capsys.readouterr().out == 'Unknown command!\n'
+
+
+def test_from_str_only_accepts_full_names() -> None:
+    assert Direction.from_str('WEST') is Direction.WEST
+    with pytest.raises(InvalidDirection):
+        Direction.from_str('w')
+    with pytest.raises(InvalidDirection):
+        Direction.from_str('we')
+
+
+def test_resolve_accepts_aliases_and_prefixes() -> None:
+    assert Direction.resolve('w') is Direction.WEST
+    assert Direction.resolve('we') is Direction.WEST
+    assert Direction.resolve('up') is None
@@ -0,0 +1,85 @@
+"""Adventure Game 1: Tests of the stores of location descriptions.
+"""
+import io
+from pathlib import Path
+
+from src.actions.context import Console
+from src.adventure import arrive, play_turn
+from src.descriptions import MAX_DICTIONARY_SIZE, CompressedDescriptions, MappedDescriptions, train_dictionary
+from src.lru import LRUCache
+from src.game_data import Player
+from src.packs import load_directory
+
+TEXTS = ['You are in a forest.', '', 'Un café près du lac.', 'You are in a forest, again.']
+
+
+def test_lru_cache_evicts_the_least_recently_used_entry() -> None:
+    evicted = []
+    cache = LRUCache(2, on_evict=lambda key, value: evicted.append(key))
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)
+    assert evicted == ['b'] and 'b' not in cache
+    assert (cache.hits, cache.misses) == (1, 0)
+
+
+def test_mapped_descriptions_read_texts_back(tmp_path: Path) -> None:
+    store = MappedDescriptions(str(tmp_path / 'descriptions.bin'), cache_size=2)
+    keys = [store.add(text) for text in TEXTS[:2]]
+    assert store.fetch(keys[0]) == TEXTS[0]
+    # Texts added once the bundle is mapped are mapped again on their first access.
+    keys += [store.add(text) for text in TEXTS[2:]]
+    assert [store.fetch(key) for key in keys] == TEXTS
+    assert len(store.cache) == 2
+    store.close()
+
+
+def test_worlds_show_mapped_descriptions(pack_directory: Path) -> None:
+    expected = load_directory(str(pack_directory)).world
+    store = MappedDescriptions()
+    world = load_directory(str(pack_directory), store).world
+    assert world.descriptions is store
+    for location_id, location in expected.locations.items():
+        descriptor = world.locations[location_id].descriptor
+        assert descriptor.long_description == location.descriptor.long_description
+    store.close()
+
+
+def test_compressed_descriptions_read_texts_back() -> None:
+    store = CompressedDescriptions.trained_on(TEXTS, cache_size=1)
+    keys = [store.add(text) for text in TEXTS]
+    assert [store.fetch(key) for key in keys] == TEXTS
+    assert [store.fetch(key) for key in reversed(keys)] == TEXTS[::-1]
+    assert len(store.cache) == 1
+
+
+def test_dictionaries_are_bounded() -> None:
+    texts = [f'You walk down corridor number {i} of the old library, lined with dusty shelves.' for i in range(500)]
+    dictionary = train_dictionary(texts, size=2 * MAX_DICTIONARY_SIZE)
+    assert 0 < len(dictionary) <= sum(len(text) for text in texts) // 8
+    assert b'dusty shelves' in dictionary
+    assert train_dictionary([]) == b''
+
+
+def test_compressed_worlds_play_the_same(pack_directory: Path) -> None:
+    outputs = []
+    for compress in (False, True):
+        pack = load_directory(str(pack_directory))
+        world = pack.world
+        plain_size = sum(len(text.encode('utf-8')) for location in world.locations.values()
+                         for text in (location.descriptor.short_description, location.descriptor.long_description))
+        store = world.compress_texts() if compress else None
+        location = world.locations[pack.starting_location_id]
+        x, y = world.find_location(pack.starting_location_id)
+        player = Player(x=x, y=y, max_steps=pack.max_steps)
+        output = io.StringIO()
+        console = Console(output=output)
+        arrive(location, player, world, console)
+        for command in ('go west', 'go north', 'go west', 'buy a coffee', 'look'):
+            location = play_turn(command, location, player, world, console) or location
+        outputs.append(output.getvalue())
+        if store is not None:
+            # Printed messages are compressed as well.
+            assert store.compressed_size() < plain_size
+    assert outputs[0] == outputs[1]
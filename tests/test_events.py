@@ -0,0 +1,108 @@
+"""Adventure Game 1: Tests of the structured gameplay event log.
+"""
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from src import events
+from src.events import EventLog
+
+
+class StuckFile:
+    """A file whose writes wait until it is released."""
+    released: threading.Event
+    data: list[bytes]
+
+    def __init__(self) -> None:
+        """Initialize a file that is not released yet.
+        """
+        self.released = threading.Event()
+        self.data = []
+
+    def write(self, data: bytes) -> int:
+        """Wait until the file is released, then keep data.
+        """
+        self.released.wait()
+        self.data.append(data)
+        return len(data)
+
+    def close(self) -> None:
+        """Close nothing.
+        """
+
+
+def read_records(path: Path) -> list[dict]:
+    """Return the records of the event log at path.
+    """
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def test_events_are_written_as_json_lines(tmp_path: Path) -> None:
+    log = EventLog(str(tmp_path / 'events.log'), batch_size=2)
+    for steps in range(5):
+        log.emit('command', {'command': 'look', 'steps': steps})
+    log.emit('broken', {'value': object()})
+    log.close()
+    records = read_records(tmp_path / 'events.log')
+    assert [record['steps'] for record in records] == list(range(5))
+    assert all(record['event'] == 'command' and 't' in record for record in records)
+    assert (log.written, log.failed, log.dropped) == (5, 1, 0)
+    assert isinstance(log.error, TypeError)
+
+
+def test_close_does_not_wait_for_a_stuck_writer(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(events, 'CLOSE_TIMEOUT', 0.2)
+    log = EventLog(str(tmp_path / 'events.log'), max_pending=4, batch_size=1, block_when_full=False)
+    stuck = StuckFile()
+    log._file.close()
+    log._file = stuck
+    for steps in range(20):
+        log.emit('command', {'steps': steps})
+    start = time.perf_counter()
+    log.close()
+    assert time.perf_counter() - start < 2
+    stuck.released.set()
+    log._thread.join(1)
+    assert log.written + log.dropped == 20
+
+
+def test_drops_are_counted_across_threads(tmp_path: Path) -> None:
+    log = EventLog(str(tmp_path / 'events.log'), max_pending=8, block_when_full=False)
+    stuck = StuckFile()
+    log._file.close()
+    log._file = stuck
+
+    def emit_many() -> None:
+        for steps in range(2000):
+            log.emit('command', {'steps': steps})
+
+    threads = [threading.Thread(target=emit_many) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    stuck.released.set()
+    log.close()
+    assert log.written + log.dropped == 8 * 2000
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason="requires os.fork")
+def test_forked_processes_log_to_the_same_file(tmp_path: Path) -> None:
+    path = tmp_path / 'events.log'
+    events.open_log(str(path))
+    try:
+        events.emit('parent', before=True)
+        pid = os.fork()
+        if pid == 0:
+            events.emit('child')
+            events.close_log()
+            os._exit(0)
+        os.waitpid(pid, 0)
+        events.emit('parent', before=False)
+    finally:
+        events.close_log()
+    assert sorted(record['event'] for record in read_records(path)) == ['child', 'parent', 'parent']
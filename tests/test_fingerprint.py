@@ -0,0 +1,68 @@
+"""Adventure Game 1: Tests of the incremental fingerprints of game state.
+"""
+import io
+from pathlib import Path
+
+from src.actions.context import Console
+from src.adventure import arrive, play_turn
+from src.fingerprint import StateHash, combine, fact_key
+from src.game_data import Item, Player, World
+from src.packs import load_directory
+
+
+def play(directory: Path, commands: list[str]) -> tuple[World, Player]:
+    """Return the world and player of a new game of the pack in directory, once commands are played.
+    """
+    pack = load_directory(str(directory))
+    world = pack.world
+    x, y = world.find_location(pack.starting_location_id)
+    player = Player(x=x, y=y, max_steps=pack.max_steps)
+    location = world.get_location(x, y)
+    console = Console(output=io.StringIO())
+    arrive(location, player, world, console)
+    for command in commands:
+        location = play_turn(command, location, player, world, console) or location
+    return world, player
+
+
+def test_fingerprints_do_not_depend_on_the_order_of_changes() -> None:
+    first, second = StateHash(), StateHash()
+    first.add('visited', 1)
+    first.add('lies', 3, 'Hammer', 3)
+    second.add('lies', 3, 'Hammer', 3)
+    second.add('visited', 1)
+    assert first.value == second.value
+    second.remove('visited', 1)
+    assert second.value == fact_key('lies', 3, 'Hammer', 3)
+
+
+def test_repeated_facts_are_counted() -> None:
+    state = StateHash()
+    state.add('holds', 'Hammer', 3)
+    state.add('holds', 'Hammer', 3)
+    state.remove('holds', 'Hammer', 3)
+    assert state.value == fact_key('holds', 'Hammer', 3)
+    state.replace('steps', 0, 0)
+    assert state.value == fact_key('holds', 'Hammer', 3)
+
+
+def test_players_in_equal_states_have_equal_fingerprints() -> None:
+    first, second = Player(x=0, y=0, max_steps=50), Player(x=1, y=0, max_steps=50)
+    hammer = Item.intern('Hammer', 3)
+    first.add_item(hammer)
+    first.steps = 2
+    second.x = 0
+    second.steps += 2
+    second.add_item(hammer)
+    assert first.fingerprint() == second.fingerprint()
+    second.points = 5
+    assert first.fingerprint() != second.fingerprint()
+
+
+def test_worlds_in_equal_states_have_equal_fingerprints(pack_directory: Path) -> None:
+    walked, _ = play(pack_directory, ['go west', 'go north'])
+    dropped, _ = play(pack_directory, ['go west', 'go north', 'grab hammer', 'drop hammer'])
+    grabbed, player = play(pack_directory, ['go west', 'go north', 'grab hammer'])
+    assert walked.fingerprint() == dropped.fingerprint()
+    assert grabbed.fingerprint() != walked.fingerprint()
+    assert grabbed.fingerprint(player) == combine(grabbed.fingerprint(), player.fingerprint())
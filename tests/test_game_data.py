@@ -0,0 +1,29 @@
+"""Adventure Game 1: Tests of the compact representations of the game data.
+"""
+import pickle
+from pathlib import Path
+
+import pytest
+
+from src.game_data import Item, Player
+from src.packs import load_directory
+
+
+def test_items_are_shared_by_name_and_location() -> None:
+    item = Item.intern('Test Lantern', 3)
+    assert Item.intern('Test Lantern', 3) is item
+    assert Item.intern('Test Lantern', None) is not item
+    assert pickle.loads(pickle.dumps(item)) is item
+    assert (str(item), repr(item)) == ('Test Lantern', 'test lantern')
+
+
+def test_game_objects_have_no_instance_dictionaries(pack_directory: Path) -> None:
+    world = load_directory(str(pack_directory)).world
+    location = next(iter(world.locations.values()))
+    action = next(iter(world.all_actions()))
+    objects = [location, location.descriptor, action, action.instructions[0], Player(x=0, y=0, max_steps=1)]
+    objects += [item for other in world.locations.values() for item in other.items]
+    for game_object in objects:
+        assert not hasattr(game_object, '__dict__'), type(game_object).__name__
+        with pytest.raises(AttributeError):
+            game_object.unexpected_attribute = 1
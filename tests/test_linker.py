@@ -0,0 +1,54 @@
+"""Adventure Game 1: Tests of linking the references of ActionScript to the world.
+"""
+from pathlib import Path
+
+import pytest
+
+from src.direction import Direction
+from src.errors import LinkError
+from src.game_data import Item
+from src.packs import load_directory
+
+BROKEN_ACTIONS = '''
+Broken Action 1
+$has_item("Unicorn")
+$unlock_direction_at_point(999, "WEST")
+$unlock_direction_at_point(14, "UP")
+END
+
+Broken Trigger -1
+@item_acquired("Dragon")
+$print("Never")
+END
+'''
+
+
+def instructions_of(directory: Path, operation: str) -> list:
+    """Return the instructions with the given operation in the world of the pack in directory.
+    """
+    world = load_directory(str(directory)).world
+    return [instruction for action in world.all_actions() for instruction in action.instructions
+            if instruction.operation == operation]
+
+
+def test_references_are_linked_once_loaded(pack_directory: Path) -> None:
+    assert all(instruction.link == 'hammer' for instruction in instructions_of(pack_directory, 'has_item')
+               if instruction.arguments == ['Hammer'])
+    unlocks = instructions_of(pack_directory, 'unlock_direction_at_point')
+    assert (14, Direction.from_str('WEST')) in [instruction.link for instruction in unlocks]
+    added = instructions_of(pack_directory, 'add_item')
+    assert any(instruction.link is Item.intern('Cheat Sheet', None) for instruction in added)
+    assert all(instruction.link == frozenset(str(argument).lower() for argument in instruction.arguments)
+               for instruction in instructions_of(pack_directory, 'prompt'))
+
+
+def test_every_unresolved_reference_is_reported(pack_directory: Path) -> None:
+    with open(pack_directory / 'actions.txt', 'a') as actions_file:
+        actions_file.write(BROKEN_ACTIONS)
+    with pytest.raises(LinkError) as error:
+        load_directory(str(pack_directory))
+    message = str(error.value)
+    assert message.startswith('4 unresolved references')
+    for problem in ('unknown item "Unicorn"', 'unknown location 999', 'unknown direction "UP"',
+                    'unknown item "dragon" in @item_acquired'):
+        assert problem in message
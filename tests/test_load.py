@@ -0,0 +1,38 @@
+"""Adventure Game 1: Tests of the load generator.
+"""
+import re
+
+import pytest
+
+from benchmarks.load import random_commands, run, scripted_commands
+from src.packs import DEFAULT_DATA_DIRECTORY, load_pack
+
+FRONT_DESK = ['go west', 'go north', 'go west', 'go west', 'go south', 'go west', 'talk to the front desk', 'Bumbly',
+              'inventory']
+
+
+def report_value(report: str, label: str) -> float:
+    """Return the first number on the line of report starting with label.
+    """
+    line = next(line for line in report.splitlines() if line.startswith(label))
+    return float(re.search(r'[\d.]+', line[len(label):]).group())
+
+
+def test_every_session_plays_every_turn(capsys: pytest.CaptureFixture) -> None:
+    run(load_pack(DEFAULT_DATA_DIRECTORY), sessions=12, turns=15, threads=3, script=FRONT_DESK, max_sessions=4, seed=0)
+    report = capsys.readouterr().out
+    assert report.startswith('12 sessions, 3 threads, 180 turns in ')
+    assert report_value(report, 'session hits') < 100
+    assert report_value(report, 'latency p50') <= report_value(report, 'latency p99')
+    # Game output is discarded rather than printed amid the report.
+    assert 'Robarts' not in report
+
+
+def test_commands_are_scripted_or_drawn_from_the_pack() -> None:
+    script = scripted_commands(['look', 'score'])
+    assert [next(script) for _ in range(5)] == ['look', 'score', 'look', 'score', 'look']
+    pack = load_pack(DEFAULT_DATA_DIRECTORY)
+    first, second = random_commands(pack, 7), random_commands(pack, 7)
+    commands = [next(first) for _ in range(50)]
+    assert commands == [next(second) for _ in range(50)]
+    assert any(command.startswith('go ') for command in commands)
@@ -0,0 +1,34 @@
+"""Adventure Game 1: Tests of the memory report of packs.
+"""
+import json
+from pathlib import Path
+
+from benchmarks.memory import graph_size, report, write_report
+from src.game_data import Item
+
+
+def test_graph_sizes_count_each_object_once() -> None:
+    shared = ['a shared list of text']
+    seen = set()
+    size = graph_size([shared, shared, (shared,)], seen)
+    assert size > 0 and id(shared) in seen
+    assert graph_size(shared, seen) == 0
+    # Items are components of their own, only counted from themselves.
+    item = Item.intern('Test Compass', None)
+    assert graph_size([item], set()) == graph_size([], set()) + 8
+
+
+def test_reports_split_the_retained_memory_by_component(pack_directory: Path, tmp_path: Path) -> None:
+    data = report(str(pack_directory), top=3)
+    assert data['pack'] == 'gamedata'
+    components = data['components']
+    assert set(components) == {'map', 'items', 'descriptions', 'locations', 'actions', 'background_actions',
+                               'triggered_actions', 'other'}
+    assert all(size >= 0 for size in components.values()) and components['locations'] > 0
+    assert data['counts']['locations'] == 20
+    assert len(data['heaviest_locations']) == 3 and len(data['heaviest_actions']) == 3
+    sizes = [location['bytes'] for location in data['heaviest_locations']]
+    assert sizes == sorted(sizes, reverse=True)
+
+    write_report(data, str(tmp_path / 'report.json'))
+    assert json.loads((tmp_path / 'report.json').read_text()) == data
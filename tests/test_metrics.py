@@ -0,0 +1,51 @@
+"""Adventure Game 1: Tests of the operational metrics of the engine.
+"""
+import gc
+import threading
+
+import pytest
+
+from src.metrics import Counter, Histogram, MetricsRegistry
+
+
+def run_threads(count: int, target: object) -> None:
+    """Run count threads with the given target, and wait until they all exit.
+    """
+    threads = [threading.Thread(target=target) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def test_cells_of_exited_threads_are_folded() -> None:
+    counter = Counter()
+
+    def increment() -> None:
+        for _ in range(1000):
+            counter.inc()
+
+    for _ in range(5):
+        run_threads(20, increment)
+    gc.collect()
+    assert counter.value() == 100 * 1000
+    assert counter._cells._cells == []
+
+
+def test_histograms_count_values_in_cumulative_buckets() -> None:
+    histogram = Histogram((1.0, 2.0))
+    run_threads(4, lambda: [histogram.observe(value) for value in (0.5, 1.5, 3.0)])
+    value = histogram.value()
+    assert value['counts'] == [4, 8, 12] and value['count'] == 12
+    assert value['sum'] == pytest.approx(20.0)
+
+
+def test_registry_exposes_labelled_metrics() -> None:
+    registry = MetricsRegistry()
+    commands = registry.counter('adventure_test_total', "Commands.", labels=('command',))
+    commands.labels('look').inc(2)
+    text = registry.to_prometheus()
+    assert '# TYPE adventure_test_total counter' in text
+    assert 'adventure_test_total{command="look"} 2' in text
+    with pytest.raises(ValueError):
+        registry.counter('adventure_test_total', "Again.")
@@ -0,0 +1,91 @@
+"""Adventure Game 1: Tests of the registry of content packs and of the flyweight items they share.
+"""
+import gc
+import shutil
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from src import game_data, packs
+from src.game_data import Item
+from src.packs import PackRegistry, compile_bundle
+
+GAMEDATA = Path(__file__).parent.parent / 'gamedata'
+
+
+@pytest.fixture
+def packs_root(tmp_path: Path) -> Path:
+    """Return a directory holding the data directory of the game, as pack "campus", and two bundles of it,
+    as packs "first" and "second".
+    """
+    shutil.copytree(GAMEDATA, tmp_path / 'campus')
+    compile_bundle(str(GAMEDATA), str(tmp_path / 'first.bundle'))
+    shutil.copy(tmp_path / 'first.bundle', tmp_path / 'second.bundle')
+    return tmp_path
+
+
+def count_loads(monkeypatch: pytest.MonkeyPatch, delay: float = 0.0) -> list[str]:
+    """Make every pack loaded in this process wait delay seconds, and return the list of their sources.
+    """
+    loaded = []
+    load_pack = packs.load_pack
+
+    def counting_load_pack(source: str, *args, **kwargs) -> packs.Pack:
+        loaded.append(Path(source).name)
+        time.sleep(delay)
+        return load_pack(source, *args, **kwargs)
+
+    monkeypatch.setattr(packs, 'load_pack', counting_load_pack)
+    return loaded
+
+
+def test_packs_are_discovered_by_name(packs_root: Path) -> None:
+    registry = PackRegistry(str(packs_root))
+    assert registry.names() == ['campus', 'first', 'second']
+    with pytest.raises(KeyError):
+        registry.get('missing')
+
+
+def test_concurrent_gets_load_a_pack_once(packs_root: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    loaded = count_loads(monkeypatch, delay=0.2)
+    registry = PackRegistry(str(packs_root))
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(registry.get('first'))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert loaded == ['first.bundle']
+    assert len(results) == 4 and all(pack is results[0] for pack in results)
+
+
+def test_load_all_skips_loaded_and_loading_packs(packs_root: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    loaded = count_loads(monkeypatch, delay=0.3)
+    registry = PackRegistry(str(packs_root))
+    first = registry.get('first')
+    getter = threading.Thread(target=registry.get, args=('second',))
+    getter.start()
+    time.sleep(0.1)
+    everything = registry.load_all(['first', 'second'])
+    getter.join()
+    assert loaded == ['first.bundle', 'second.bundle']
+    assert everything['first'] is first
+    assert everything['second'] is registry.get('second')
+
+
+def test_load_all_parses_directories_in_workers(packs_root: Path) -> None:
+    registry = PackRegistry(str(packs_root), workers=2)
+    everything = registry.load_all()
+    assert sorted(everything) == ['campus', 'first', 'second']
+    assert registry.is_loaded('campus')
+    assert len(everything['campus'].world.locations) == len(everything['first'].world.locations)
+
+
+def test_items_are_shared_only_while_they_are_used() -> None:
+    item = Item.intern('Test Trophy', 42)
+    assert Item.intern('Test Trophy', 42) is item
+    del item
+    gc.collect()
+    assert ('Test Trophy', 42) not in game_data._ITEM_REGISTRY
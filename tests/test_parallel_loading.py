@@ -0,0 +1,36 @@
+"""Adventure Game 1: Tests of parsing the segments of a pack in worker processes.
+"""
+from pathlib import Path
+
+from src.game_data import World
+from src.packs import load_directory
+
+
+def add_counting_actions(directory: Path, count: int) -> None:
+    """Append count background actions to the pack in directory, using variables in an order that differs
+    from one chunk of segments to the next.
+    """
+    with open(directory / 'actions.txt', 'a') as actions_file:
+        for i in range(count):
+            actions_file.write(f'\nCount {i} -1\n$add_var("counter{(count - i) % 7}", 1)\n'
+                               f'$if var_less_than("global.tally{i % 5}", {i})\n$print("{i}")\n$end\nEND\n')
+
+
+def layout(world: World) -> tuple[list, list, list]:
+    """Return the locations, the instructions of every action along with their slots, and the variables
+    of world.
+    """
+    locations = [(location_id, location.descriptor.long_description, [item.name for item in location.items],
+                  sorted(str(direction) for direction in location.allowed_movements))
+                 for location_id, location in sorted(world.locations.items())]
+    actions = [(action.name, [(str(instruction), instruction.slot) for instruction in action.instructions])
+               for action in world.all_actions()]
+    return locations, actions, [world.variables.player_names, world.variables.global_names]
+
+
+def test_parallel_loads_are_identical_to_serial_loads(pack_directory: Path) -> None:
+    add_counting_actions(pack_directory, 60)
+    serial = load_directory(str(pack_directory)).world
+    parallel = load_directory(str(pack_directory), workers=2).world
+    assert layout(parallel) == layout(serial)
+    assert len(parallel.background_actions) >= 60
@@ -0,0 +1,53 @@
+"""Adventure Game 1: Tests of worlds loading the tiles of their map on demand.
+"""
+import io
+from pathlib import Path
+
+import pytest
+
+from src.actions.context import Console
+from src.adventure import arrive, play_turn
+from src.game_data import Player
+from src.packs import load_directory
+from src.regions import RegionalWorld, build_regions
+
+
+@pytest.fixture
+def region_file(pack_directory: Path, tmp_path: Path) -> Path:
+    """Return a region file of the game, with tiles of 2 by 2 cells.
+    """
+    build_regions(str(pack_directory), str(tmp_path / 'campus.regions'), tile_size=2)
+    return tmp_path / 'campus.regions'
+
+
+def test_every_cell_is_found_in_its_tile(pack_directory: Path, region_file: Path) -> None:
+    expected = load_directory(str(pack_directory)).world
+    world = RegionalWorld(str(region_file), radius=0, max_tiles=1)
+    for y, row in enumerate(expected.map):
+        for x, location_id in enumerate(row):
+            location = world.get_location(x, y)
+            assert (location is None) == (location_id == -1)
+            if location is not None:
+                expected_location = expected.locations[location_id]
+                assert location.descriptor.long_description == expected_location.descriptor.long_description
+                assert location.items == expected_location.items
+    assert world.loaded_tiles() == 1
+    with pytest.raises(AttributeError):
+        _ = world.map
+    world.close()
+
+
+def test_evicted_tiles_keep_the_changes_of_players(region_file: Path) -> None:
+    world = RegionalWorld(str(region_file), radius=0, max_tiles=1)
+    x, y = world.find_location(1)
+    player = Player(x=x, y=y, max_steps=50)
+    console = Console(output=io.StringIO())
+    location = world.get_location(x, y)
+    arrive(location, player, world, console)
+    for command in ('go west', 'go north', 'grab hammer', 'go west', 'go west', 'go south', 'go west'):
+        location = play_turn(command, location, player, world, console) or location
+    assert location.descriptor.location_id == 7 and world.loaded_tiles() == 1
+    rom = world.location_by_id(3)
+    assert rom.already_visited
+    assert all(item.key != 'hammer' for item in rom.items)
+    world.close()
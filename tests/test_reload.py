@@ -0,0 +1,93 @@
+"""Adventure Game 1: Tests of the hot reloading of locations and actions.
+"""
+from pathlib import Path
+
+import pytest
+
+from src.errors import LinkError, LocationError
+from src.packs import load_directory
+from src.reload import RELOAD_ERRORS, WorldReloader
+
+BROKEN_ACTION = '''
+Count the Bells 1
+$add_var("global.bell_rings", 1)
+$unlock_direction_at_point(999, "WEST")
+END
+'''
+
+
+def make_reloader(directory: Path) -> WorldReloader:
+    """Return a reloader of the world loaded from directory.
+    """
+    world = load_directory(str(directory)).world
+    return WorldReloader(
+        world, str(directory / 'locations.txt'), str(directory / 'actions.txt'), str(directory / 'items.txt')
+    )
+
+
+def replace_in(path: Path, old: str, new: str) -> None:
+    """Replace the first occurrence of old with new in the file at path.
+    """
+    text = path.read_text()
+    assert old in text
+    path.write_text(text.replace(old, new, 1))
+
+
+def instructions(reloader: WorldReloader) -> list[tuple[str, list[str]]]:
+    """Return the instructions of every action of the world of reloader.
+    """
+    return [(action.name, [str(i) for i in action.instructions]) for action in reloader.world.all_actions()]
+
+
+def test_changed_segments_are_patched_in_place(pack_directory: Path) -> None:
+    reloader = make_reloader(pack_directory)
+    world = reloader.world
+    location = world.locations[1]
+    location.already_visited = True
+    replace_in(pack_directory / 'locations.txt', 'The ROM is to the West', 'The museum is to the West')
+    replace_in(pack_directory / 'actions.txt', '$add_points(5)', '$add_points(6)')
+    report = reloader.reload()
+    assert (report.locations_changed, report.actions_changed) == (1, 1)
+    assert world.locations[1] is location and location.already_visited
+    assert 'The museum is to the West' in location.descriptor.short_description
+    assert any('add_points(6)' in text for _, texts in instructions(reloader) for text in texts)
+
+
+def test_syntax_errors_leave_the_world_unchanged(pack_directory: Path) -> None:
+    reloader = make_reloader(pack_directory)
+    before = instructions(reloader)
+    replace_in(pack_directory / 'actions.txt', '$add_points(5)', '$add_points(five)')
+    with pytest.raises(RELOAD_ERRORS):
+        reloader.reload()
+    assert instructions(reloader) == before
+
+
+def test_unresolved_references_leave_the_world_unchanged(pack_directory: Path) -> None:
+    reloader = make_reloader(pack_directory)
+    world = reloader.world
+    before = instructions(reloader)
+    texts = len(world.descriptions.texts)
+    global_names = list(world.variables.global_names)
+    replace_in(pack_directory / 'locations.txt', 'The ROM is to the West', 'The museum is to the West')
+    with open(pack_directory / 'actions.txt', 'a') as actions_file:
+        actions_file.write(BROKEN_ACTION)
+    with pytest.raises(LinkError):
+        reloader.reload()
+    assert instructions(reloader) == before
+    assert len(world.descriptions.texts) == texts
+    assert world.variables.global_names == global_names
+    assert 'The ROM is to the West' in world.locations[1].descriptor.short_description
+
+    replace_in(pack_directory / 'actions.txt', '999', '14')
+    reloader.reload()
+    assert world.variables.global_names == global_names + ['global.bell_rings']
+
+
+def test_mapped_locations_cannot_be_removed(pack_directory: Path) -> None:
+    reloader = make_reloader(pack_directory)
+    path = pack_directory / 'locations.txt'
+    segments = path.read_text().split('END')
+    path.write_text('END'.join(segment for segment in segments if not segment.strip().startswith('LOCATION 3\n')))
+    with pytest.raises(LocationError):
+        reloader.reload()
+    assert 3 in reloader.world.locations
@@ -0,0 +1,58 @@
+"""Adventure Game 1: Tests of the results of completed games and the leaderboards of packs.
+"""
+from pathlib import Path
+
+from src.results import SNAPSHOT_EXTENSION, PackStatistics, ResultStore, RunResult
+
+
+def result(steps: int, points: int, victory: bool = True, pack: str = 'campus') -> RunResult:
+    """Return the result of a game of pack lasting a second.
+    """
+    return RunResult(pack=pack, steps=steps, points=points, victory=victory, duration=1.0, finished_at=0.0)
+
+
+def summary(statistics: PackStatistics) -> tuple:
+    """Return what the leaderboards and aggregates of statistics show.
+    """
+    return (statistics.runs, statistics.victories, statistics.best_by_points(), statistics.best_by_steps(),
+            statistics.points_percentile(50), statistics.steps_percentile(90), statistics.mean_duration())
+
+
+def test_leaderboards_keep_the_best_results() -> None:
+    statistics = PackStatistics(top=2)
+    first, tied, best, loss = result(30, 50), result(30, 50), result(20, 80), result(5, 90, victory=False)
+    for run in (first, tied, best, loss):
+        statistics.add(run)
+    assert statistics.best_by_points() == [loss, best]
+    # Ties go to the earlier result, and only victories compete for the fewest steps.
+    assert statistics.best_by_steps() == [best, first]
+    assert statistics.best_by_steps()[1] is first
+
+
+def test_percentiles_are_read_from_histograms() -> None:
+    statistics = PackStatistics()
+    assert statistics.points_percentile(50) is None
+    for points in range(1, 101):
+        statistics.add(result(points, points, victory=points % 2 == 0))
+    assert statistics.points_percentile(50) == 50
+    assert statistics.points_percentile(100) == 100
+    assert statistics.steps_percentile(50) == 50
+    assert statistics.victories == 50
+
+
+def test_snapshots_cover_the_results_recorded_before_them(tmp_path: Path) -> None:
+    path = tmp_path / 'results.jsonl'
+    store = ResultStore(str(path), top=3, snapshot_interval=4)
+    for steps in range(10):
+        store.record(result(steps + 1, steps * 10, victory=steps % 3 != 0))
+    store.record(result(7, 7, pack='museum'))
+    expected = {pack: summary(store.statistics(pack)) for pack in store.packs()}
+    assert (path.parent / (path.name + SNAPSHOT_EXTENSION)).exists()
+
+    # A result whose writing was interrupted is ignored.
+    with open(path, 'a') as results:
+        results.write('{"pack": "campus"')
+    reopened = ResultStore(str(path), top=3)
+    assert {pack: summary(reopened.statistics(pack)) for pack in reopened.packs()} == expected
+    # A snapshot keeping a different number of results per leaderboard is ignored, and every result replayed.
+    assert summary(ResultStore(str(path), top=5).statistics('campus'))[:2] == expected['campus'][:2]
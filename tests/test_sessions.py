@@ -0,0 +1,80 @@
+"""Adventure Game 1: Tests of the sessions sharing the world of a pack.
+"""
+from pathlib import Path
+
+import pytest
+
+from src.packs import load_directory, load_pack
+from src.regions import build_regions
+from src.sessions import SessionManager
+
+COFFEE = 'buy a coffee'
+MUFFIN_ACTION = '''
+Buy a Muffin 4
+$add_points(1)
+END
+'''
+
+
+def make_manager(directory: Path, sessions_directory: Path, max_sessions: int = 1) -> SessionManager:
+    """Return a manager of the sessions playing the pack in directory, keeping max_sessions in memory.
+    """
+    return SessionManager(load_directory(str(directory)), str(sessions_directory), max_sessions)
+
+
+def buy_coffee(manager: SessionManager, session_id: str) -> None:
+    """Walk the player of the session with the given id to the coffee shop, and buy a coffee.
+    """
+    manager.batch(session_id, ['go west', 'go north', 'go west', COFFEE])
+
+
+def coffee_completed(manager: SessionManager) -> bool:
+    """Return whether the coffee action is completed in the world as the active session sees it.
+    """
+    location = manager.pack.world.locations[4]
+    return next(action for action in location.actions if action.name.lower() == COFFEE).completed
+
+
+def test_sessions_are_evicted_and_restored(pack_directory: Path, tmp_path: Path) -> None:
+    manager = make_manager(pack_directory, tmp_path / 'sessions')
+    manager.create('alice')
+    buy_coffee(manager, 'alice')
+    points = manager.get('alice').player.points
+    manager.create('bob')
+    assert manager.resident() == 1
+    assert not coffee_completed(manager)
+    session = manager.get('alice')
+    assert manager.rehydrations == 1
+    assert session.player.points == points and session.location.descriptor.location_id == 4
+    manager.command('alice', 'look')
+    assert coffee_completed(manager)
+
+
+def test_completed_actions_are_restored_by_name(pack_directory: Path, tmp_path: Path) -> None:
+    with open(pack_directory / 'actions.txt', 'a') as actions_file:
+        actions_file.write(MUFFIN_ACTION)
+    manager = make_manager(pack_directory, tmp_path / 'sessions')
+    manager.create('alice')
+    buy_coffee(manager, 'alice')
+    manager.create('bob')
+    # The actions of the location change order while alice is saved, as a reload may do.
+    manager.pack.world.locations[4].actions.reverse()
+    manager.command('alice', 'look')
+    assert coffee_completed(manager)
+    assert [action.completed for action in manager.pack.world.locations[4].actions].count(True) == 1
+
+
+def test_batch_commands_are_normalised(pack_directory: Path, tmp_path: Path) -> None:
+    manager = make_manager(pack_directory, tmp_path / 'sessions')
+    manager.create('alice')
+    results = manager.batch('alice', ['  Go West ', 'LOOK'])
+    assert results[0].location_id == 2
+    assert all('Unknown command' not in result.output for result in results)
+
+
+def test_regional_packs_are_rejected(tmp_path: Path) -> None:
+    build_regions(str(Path(__file__).parent.parent / 'gamedata'), str(tmp_path / 'campus.regions'))
+    pack = load_pack(str(tmp_path / 'campus.regions'))
+    with pytest.raises(ValueError):
+        SessionManager(pack, str(tmp_path / 'sessions'))
+    pack.world.close()
@@ -0,0 +1,68 @@
+"""Adventure Game 1: Tests of sharing the static content of a world with forked workers.
+"""
+import io
+import os
+from pathlib import Path
+
+import pytest
+
+from src.actions.context import Console
+from src.adventure import arrive, play_turn
+from src.game_data import Player, World
+from src.packs import load_directory
+from src.shared_content import SharedContent, share_world
+
+COMMANDS = ['go west', 'go north', 'grab hammer', 'go west', 'buy a coffee', 'go west', 'go south', 'go west',
+            'talk to the front desk', 'Bumbly', 'look']
+
+
+def play(world: World, starting_location_id: int) -> str:
+    """Return the output of COMMANDS played in a new game of world.
+    """
+    x, y = world.find_location(starting_location_id)
+    player = Player(x=x, y=y, max_steps=50)
+    location = world.get_location(x, y)
+    output = io.StringIO()
+    answers = iter(COMMANDS)
+    console = Console(output=output, reader=lambda _question: next(answers))
+    arrive(location, player, world, console)
+    for command in answers:
+        location = play_turn(command.lower(), location, player, world, console) or location
+    return output.getvalue()
+
+
+def test_shared_worlds_play_the_same(pack_directory: Path) -> None:
+    expected_pack = load_directory(str(pack_directory))
+    pack = load_directory(str(pack_directory))
+    expected_map = [list(row) for row in pack.world.map]
+    content = share_world(pack.world, cache_size=2)
+    assert [list(row) for row in pack.world.map] == expected_map
+    assert play(pack.world, pack.starting_location_id) == play(expected_pack.world, expected_pack.starting_location_id)
+    key = pack.world.descriptions.add('A text added once the world is shared.')
+    assert pack.world.descriptions.fetch(key) == 'A text added once the world is shared.'
+    assert content.size > 0
+
+
+def test_content_is_exported_to_a_flat_buffer() -> None:
+    content = SharedContent([[1, -1], [2, 3, 4]], ['', 'Café', 'A room.'], cache_size=1)
+    assert [list(row) for row in content.rows] == [[1, -1], [2, 3, 4]]
+    assert [content.descriptions.fetch(key) for key in (2, 1, 0)] == ['A room.', 'Café', '']
+    content.close()
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason="requires os.fork")
+def test_forked_processes_read_the_shared_content(pack_directory: Path) -> None:
+    pack = load_directory(str(pack_directory))
+    share_world(pack.world)
+    expected = pack.world.locations[1].descriptor.long_description
+    read_end, write_end = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_end)
+        os.write(write_end, pack.world.locations[1].descriptor.long_description.encode('utf-8'))
+        os._exit(0)
+    os.close(write_end)
+    with os.fdopen(read_end, 'rb') as child_output:
+        text = child_output.read().decode('utf-8')
+    os.waitpid(pid, 0)
+    assert text == expected
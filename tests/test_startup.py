@@ -0,0 +1,50 @@
+"""Adventure Game 1: Tests of loading packs from any data directory or compiled bundle, without importing
+what the start of the game does not need.
+"""
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from src.adventure import build_argument_parser, pack_name, prepare_world
+from src.packs import DEFAULT_DATA_DIRECTORY, compile_bundle
+
+ROOT = Path(__file__).parent.parent
+
+CHECK_IMPORTS = '''
+import sys
+from src.adventure import prepare_world
+prepare_world(sys.argv[1])
+print(sorted(name for name in ('src.actions.parser', 'src.reload', 'tempfile') if name in sys.modules))
+'''
+
+
+def test_the_default_pack_does_not_depend_on_the_working_directory(
+        tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.chdir(tmp_path)
+    assert build_argument_parser().parse_args([]).data == DEFAULT_DATA_DIRECTORY
+    world, player, location = prepare_world()
+    assert location.descriptor.location_id == 1 and player.max_steps == 50
+    assert pack_name(DEFAULT_DATA_DIRECTORY) == 'gamedata'
+
+
+def test_bundles_load_the_same_world(tmp_path: Path) -> None:
+    compile_bundle(DEFAULT_DATA_DIRECTORY, str(tmp_path / 'campus.bundle'))
+    world, _, location = prepare_world(str(tmp_path / 'campus.bundle'))
+    expected, _, expected_location = prepare_world()
+    assert sorted(world.locations) == sorted(expected.locations)
+    assert location.descriptor.long_description == expected_location.descriptor.long_description
+    assert pack_name(str(tmp_path / 'campus.bundle')) == 'campus'
+
+
+def test_bundles_start_without_the_parser(tmp_path: Path) -> None:
+    compile_bundle(DEFAULT_DATA_DIRECTORY, str(tmp_path / 'campus.bundle'))
+    environment = dict(os.environ, PYTHONPATH=str(ROOT))
+    output = subprocess.run(
+        [sys.executable, '-c', CHECK_IMPORTS, str(tmp_path / 'campus.bundle')],
+        capture_output=True, text=True, check=True, cwd=tmp_path, env=environment
+    ).stdout
+    assert output.strip() == '[]'
@@ -0,0 +1,31 @@
+"""Adventure Game 1: Tests of the supervisor hosting players from forked workers.
+"""
+import os
+from pathlib import Path
+
+import pytest
+
+from src.packs import load_directory, load_pack
+from src.regions import build_regions
+from src.supervisor import OPEN, PLAY, Supervisor
+
+
+def test_regional_packs_are_rejected(pack_directory: Path, tmp_path: Path) -> None:
+    build_regions(str(pack_directory), str(tmp_path / 'campus.regions'))
+    pack = load_pack(str(tmp_path / 'campus.regions'))
+    with pytest.raises(ValueError):
+        Supervisor(pack, 2, str(tmp_path / 'sessions'))
+    pack.world.close()
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason="requires os.fork")
+def test_workers_play_the_commands_of_their_sessions(pack_directory: Path, tmp_path: Path) -> None:
+    supervisor = Supervisor(load_directory(str(pack_directory)), 2, str(tmp_path / 'sessions'))
+    supervisor.start()
+    try:
+        output, finished = supervisor.request(OPEN, 'alice', '', lambda question: '')
+        assert 'Victoria College' in output and not finished
+        output, _ = supervisor.request(PLAY, 'alice', 'go west; look', lambda question: '')
+        assert 'inside the ROM' in output
+    finally:
+        supervisor.stop()
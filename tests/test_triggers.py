@@ -0,0 +1,94 @@
+"""Adventure Game 1: Tests of the index of triggered actions.
+"""
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Callable
+
+import pytest
+
+from src.actions.context import Context
+from src.actions.triggers import ITEM_ACQUIRED, POINTS_REACHED, TriggerIndex
+from src.adventure import play_turn, prepare_world
+
+WELCOME_ACTION = '''
+Welcome to the ROM -1
+@location_entered(2)
+$print("The ROM welcomes you.")
+END
+'''
+
+
+class FakeAction:
+    """A triggered action recording the contexts it is executed in, then running a callback."""
+    triggers: list[tuple[str, str | int]]
+    executions: list[Context]
+    callback: Callable[[Context], None]
+
+    def __init__(self, triggers: list[tuple[str, str | int]], callback: Callable[[Context], None]) -> None:
+        """Initialize an action subscribed to triggers, running callback whenever it is executed.
+        """
+        self.triggers = triggers
+        self.executions = []
+        self.callback = callback
+
+    def execute(self, context: Context, _shallow: bool = False) -> bool:
+        """Record context, then run the callback.
+        """
+        self.executions.append(context)
+        self.callback(context)
+        return True
+
+
+def make_context(points: int = 0) -> Context:
+    """Return a context of its own, for a player with the given points.
+    """
+    return Context(world=None, player=SimpleNamespace(points=points), location=None)
+
+
+def test_actions_do_not_trigger_themselves() -> None:
+    index = TriggerIndex([])
+    action = FakeAction([(ITEM_ACQUIRED, 'hammer')], lambda context: index.fire(context, ITEM_ACQUIRED, 'hammer'))
+    index.add(action)
+    context = make_context()
+    index.fire(context, ITEM_ACQUIRED, 'hammer')
+    assert action.executions == [context]
+    assert context.running == set()
+
+
+def test_players_do_not_skip_each_other_triggers() -> None:
+    index = TriggerIndex([])
+    other = make_context()
+    # While the action runs for one player, the same event happens to another player sharing the world.
+    action = FakeAction(
+        [(ITEM_ACQUIRED, 'hammer')],
+        lambda context: index.fire(other, ITEM_ACQUIRED, 'hammer') if context is not other else None
+    )
+    index.add(action)
+    context = make_context()
+    index.fire(context, ITEM_ACQUIRED, 'hammer')
+    assert action.executions == [context, other]
+
+
+def test_points_thresholds_fire_once_crossed() -> None:
+    index = TriggerIndex([])
+    reached = []
+    for threshold in (10, 20, 30):
+        index.add(FakeAction([(POINTS_REACHED, threshold)], lambda _context, t=threshold: reached.append(t)))
+    index.points_changed(make_context(points=25), before=5)
+    assert reached == [10, 20]
+    index.remove(index.actions()[0])
+    index.points_changed(make_context(points=40), before=0)
+    assert reached == [10, 20, 20, 30]
+
+
+def test_location_entered_fires_once_the_location_is_shown(
+        pack_directory: Path, capsys: pytest.CaptureFixture
+) -> None:
+    with open(pack_directory / 'actions.txt', 'a') as actions_file:
+        actions_file.write(WELCOME_ACTION)
+    world, player, location = prepare_world(str(pack_directory))
+    capsys.readouterr()
+    play_turn('go west', location, player, world)
+    output = capsys.readouterr().out
+    assert 'The ROM welcomes you.' in output
+    assert output.index('You are inside the ROM') < output.index('The ROM welcomes you.')